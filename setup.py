@@ -49,10 +49,13 @@ setup(name='ubench',
           'lxml',
           'pandas',
           'setuptools<=44.0.0'],
+      python_requires='>=3.8',
+      extras_require={
+          'columnar': ['pyarrow']},
       url='https://github.com/edf-hpc/unclebench',
       author=__author__,
       author_email='dsp-cspito-ccn-hpc@edf.fr',
-      scripts=['bin/ubench'],
+      scripts=['bin/ubench', 'bin/ubench-local-submit', 'bin/ubench-pack-submit'],
       license='GPLv3',
       packages=['ubench',
                 'ubench.core',
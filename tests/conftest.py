@@ -20,6 +20,7 @@ import os
 import pytest
 import tempbench
 import collections
+import ubench.config
 
 @pytest.fixture(scope="module")
 def init_env(pytestconfig):
@@ -54,4 +55,27 @@ def data_dir(pytestconfig):
     return TestFiles(root_data,
                      os.path.join(root_data, 'campaign_metadata.yaml'),
                      os.path.join(root_data, 'mock_jube_info-bad.csv'),
-                     os.path.join(root_data, 'bench_results.yaml'))
\ No newline at end of file
+                     os.path.join(root_data, 'bench_results.yaml'))
+
+@pytest.fixture(autouse=True)
+def results_cache_dir(tmpdir, monkeypatch):
+    """ Keep parsed results cache of each test in its temporary directory """
+    cache_dir = str(tmpdir.join('results_cache'))
+    monkeypatch.setattr(ubench.config, 'RESULTS_CACHE_DIR', cache_dir)
+    return cache_dir
+
+@pytest.fixture(autouse=True)
+def results_index_dir(tmpdir, monkeypatch):
+    """ Keep result file indexes of each test in its temporary directory """
+    index_dir = str(tmpdir.join('results_indexes'))
+    monkeypatch.setattr(ubench.config, 'RESULTS_INDEX_DIR', index_dir)
+    return index_dir
+
+@pytest.fixture(autouse=True)
+def job_state_cache_file(tmpdir, monkeypatch):
+    """ Keep scheduler job state cache of each test in its temporary directory """
+    import ubench.scheduler_interfaces.slurm_interface as slurm_i
+    cache_file = str(tmpdir.join('job_states.json'))
+    monkeypatch.setattr(ubench.config, 'JOB_STATE_CACHE_FILE', cache_file)
+    monkeypatch.setattr(slurm_i.SlurmInterface, '_job_state_cache', None)
+    return cache_file
@@ -0,0 +1,104 @@
+##############################################################################
+#  This file is part of the UncleBench benchmarking tool.                    #
+#        Copyright (C) 2019 EDF SA                                           #
+#                                                                            #
+#  UncleBench is free software: you can redistribute it and/or modify        #
+#  it under the terms of the GNU General Public License as published by      #
+#  the Free Software Foundation, either version 3 of the License, or         #
+#  (at your option) any later version.                                       #
+#                                                                            #
+#  UncleBench is distributed in the hope that it will be useful,             #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the              #
+#  GNU General Public License for more details.                              #
+#                                                                            #
+#  You should have received a copy of the GNU General Public License         #
+#  along with UncleBench. If not, see <http://www.gnu.org/licenses/>.        #
+#                                                                            #
+##############################################################################
+""" Tests of concurrent commands of BenchmarkManagerSet """
+
+# pylint: disable=missing-docstring,redefined-outer-name
+import threading
+import time
+import pytest
+import ubench.benchmark_managers.benchmark_manager_set as bms
+
+
+class FakeManager(object):
+
+    barrier = None
+
+    def __init__(self, benchmark, platform='platform', delay=0):
+        self.benchmark = benchmark
+        self.platform = platform
+        self.delay = delay
+        self.result_array = []
+
+    def _wait(self):
+        if self.barrier:
+            self.barrier.wait(timeout=5)
+        time.sleep(self.delay)
+
+    def print_log(self, idb):
+        self._wait()
+        if idb == 3:
+            raise OSError('missing run')
+        print('log {} {}'.format(self.benchmark, idb))
+
+    def list_runs(self, since, status, offset, limit):
+        self._wait()
+        print('runs {}'.format(self.benchmark))
+
+    def result(self, idb, force=False):
+        self._wait()
+        print('result {} {}'.format(self.benchmark, idb))
+        self.result_array = [[self.benchmark, str(idb)]]
+
+    def print_result_array(self, output_file):
+        print('array ' + ' '.join(self.result_array[0]))
+
+
+@pytest.fixture
+def bm_set(mocker):
+    mocker.patch('ubench.benchmark_managers.jube_benchmark_manager.JubeBenchmarkManager',
+                 side_effect=FakeManager)
+    bm_set = bms.BenchmarkManagerSet([], 'platform')
+    # the first benchmark is the slowest
+    bm_set.benchmark_manager_list = [FakeManager('b1', delay=0.2), FakeManager('b2')]
+    yield bm_set
+    FakeManager.barrier = None
+
+
+@pytest.mark.parametrize('jobs', [1, 4])
+def test_print_logs(bm_set, capsys, jobs):
+    bm_set.print_logs([1, 3], jobs)
+    assert capsys.readouterr().out.splitlines() == [
+        'log b1 1', 'log b2 1', '',
+        '    No run was found for b1 benchmark with id 3: ', '    missing run',
+        '    No run was found for b2 benchmark with id 3: ', '    missing run', '']
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_list_runs(bm_set, capsys, jobs):
+    bm_set.list_runs(jobs=jobs)
+    assert capsys.readouterr().out.splitlines() == ['runs b1', '', 'runs b2', '']
+
+
+def test_results_concurrent(bm_set, capsys):
+    # every result is extracted at once or the barrier is broken
+    FakeManager.barrier = threading.Barrier(4)
+    bm_set.results(['1', '2'], jobs=4)
+    assert capsys.readouterr().out.splitlines() == [
+        'result b1 1', 'result b2 1', 'array b1 1', 'array b2 1',
+        'result b1 2', 'result b2 2', 'array b1 2', 'array b2 2']
+
+
+def test_results_error(bm_set, capsys):
+    bm_set.benchmark_manager_list[1].result = lambda idb, force: 1 / 0
+    with pytest.raises(ZeroDivisionError):
+        bm_set.results(['1'], jobs=2)
+    assert capsys.readouterr().out.splitlines() == ['result b1 1']
+    # standard output is restored
+    print('done')
+    assert capsys.readouterr().out == 'done\n'
@@ -0,0 +1,124 @@
+""" ComparisonWriter tests """
+
+# pylint: disable=missing-docstring
+import io
+import json
+import pandas
+from ubench.data_management import comparison_writer
+from ubench.data_management.comparison_writer import ComparisonWriter
+
+
+def _sessions(n_sessions, rows=40):
+    """ Return session pandas with IMB like contexts, rows are shuffled differently """
+    pandas_list = []
+    for idx in range(n_sessions):
+        panda = pandas.DataFrame({
+            'nodes': [str(i % 4 + 1) for i in range(rows)],
+            'msg_size': [str(2 ** (i // 4)) for i in range(rows)],
+            'imb_results': ['bw' if i % 2 else 'lat' for i in range(rows)],
+            'result': [str((i + 1) * (idx + 1) * 1.5) for i in range(rows)],
+        }).drop_duplicates(['nodes', 'msg_size', 'imb_results'])
+        pandas_list.append(panda.sample(frac=0.9, random_state=idx))
+    return pandas_list
+
+
+def test_compare_pandas_join(mocker):
+    """ Indexed join of sessions gives the same comparison than chained merges """
+    context = ['nodes', 'msg_size', 'imb_results']
+    for session_list in [None, ['s0', 's1', 's2', 's3']]:
+        for threshold in [None, '10']:
+            cwriter = ComparisonWriter(threshold)
+            joined = cwriter.compare_pandas(_sessions(4), (list(context), None), session_list)
+
+            merge = mocker.patch.object(ComparisonWriter, '_join_sessions', return_value=None)
+            merged = cwriter.compare_pandas(_sessions(4), (list(context), None), session_list)
+            mocker.stop(merge)
+
+            pandas.testing.assert_frame_equal(joined, merged)
+
+    assert joined['nodes'].dtype.kind == 'i'
+    assert 's3 vs s0(%)' in joined.columns
+    assert (joined['s1 vs s0(%)'] == 100.0).all()
+
+
+def test_compare_pandas_duplicated_contexts():
+    """ Sessions with duplicated contexts are compared by merging them """
+    pandas_list = _sessions(2)
+    pandas_list = [pandas.concat([panda, panda]) for panda in pandas_list]
+    context = ['nodes', 'msg_size', 'imb_results']
+    assert ComparisonWriter._join_sessions(pandas_list, context, ['result']) is None
+
+    compared = ComparisonWriter().compare_pandas(pandas_list, (context, None))
+    assert len(compared) == 4 * len(_sessions(2)[0].merge(_sessions(2)[1], on=context))
+
+
+def _comparison():
+    """ Return a comparison of 4 sessions with varying differences """
+    context = ['nodes', 'msg_size', 'imb_results']
+    pandas_list = _sessions(4)
+    pandas_list[2]['result'] = [str(-float(value)) for value in pandas_list[2]['result']]
+    return ComparisonWriter().compare_pandas(pandas_list, (context, None))
+
+
+def test_top_differences():
+    """ Top rows are those with the largest absolute difference """
+    compared = _comparison()
+    top = ComparisonWriter.top_differences(compared, 5)
+    diff_columns = [column for column in compared.columns if column.endswith('(%)')]
+    max_diff = compared[diff_columns].abs().max(axis=1)
+
+    assert len(top) == 5
+    assert list(top[diff_columns].abs().max(axis=1)) == sorted(max_diff, reverse=True)[:5]
+
+
+def test_print_comparison_formats(mocker):
+    """ Chunked outputs hold every row of the comparisons """
+    compared = _comparison()
+    mocker.patch.object(comparison_writer, 'PRINT_CHUNK_SIZE', 7)
+    mocker.patch.object(ComparisonWriter, 'iter_compare',
+                        side_effect=lambda *args, **kwargs: iter([compared, compared]))
+    cwriter = ComparisonWriter()
+
+    output = io.StringIO()
+    cwriter.print_comparison('bench', ['d1', 'd2'], output_format='csv', output=output)
+    output.seek(0)
+    from_csv = pandas.read_csv(output)
+    assert len(from_csv) == 2 * len(compared)
+    assert list(from_csv.columns) == list(compared.columns)
+
+    output = io.StringIO()
+    cwriter.print_comparison('bench', ['d1', 'd2'], output_format='json', output=output, top=3)
+    rows = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert len(rows) == 6
+    assert set(rows[0]) == set(compared.columns)
+
+    output = io.StringIO()
+    cwriter.print_comparison('bench', ['d1', 'd2'], output=output)
+    lines = [line for line in output.getvalue().splitlines() if line]
+    assert len(lines) == 2 * (len(compared) + 1)
+    assert len(set(len(line) for line in lines)) == 1
+
+
+def test_compare_statistics():
+    """ Only significant differences are kept """
+    context = ['nodes', 'msg_size', 'imb_results']
+    pandas_list = []
+    for shift in [0, 1]:
+        panda = pandas.concat([_sessions(1)[0]] * 5, ignore_index=True)
+        noise = [(i % 5) * 0.01 for i in range(len(panda))]
+        values = panda['result'].astype(float) + noise
+        values[panda['nodes'] == '1'] *= 1 + 0.5 * shift
+        panda['result'] = [str(value) for value in values]
+        pandas_list.append(panda)
+
+    compared = ComparisonWriter(alpha=0.05).compare_pandas(pandas_list, (list(context), None))
+    assert len(compared) > 0
+    assert (compared['nodes'] == 1).all()
+    assert (compared['result_diff_0(%)'].round() == 50).all()
+    assert (compared['result_diff_0_p_value'] < 0.05).all()
+    assert 'result_pre_ci_low' in compared.columns
+
+    compared = ComparisonWriter(threshold='60', alpha=0.05).compare_pandas(
+        pandas_list, (list(context), None), ['ref', 'new'])
+    assert compared.empty
+    assert 'new vs ref(%)' in compared.columns
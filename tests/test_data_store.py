@@ -1,4 +1,13 @@
+import copy
+import datetime
+import os
+import shutil
+import pandas
+import pytest
 from ubench.data_management.data_store_yaml import DataStoreYAML
+from ubench.data_management.results_cache import ResultsCache
+from ubench.data_management import yaml_io
+from ubench.data_management.data_store_columnar import DataStoreColumnar, get_data_store
 
 
 def test_result_filter(data_dir):
@@ -22,3 +31,207 @@ def test_result_filter_opts(data_dir):
                                       data_dir.bench_results)
 
     assert d_filter == {'comp_version': 'gnu', 'host_p': 'Hostname_id', 'mpi_version': 'OpenMPI-2.0.2'}
+
+
+def _results_dir(tmpdir, data_dir):
+    """ Build a YAML results directory from test data """
+    yaml_dir = tmpdir.mkdir('yaml_results')
+    shutil.copy(data_dir.bench_results, str(yaml_dir.mkdir('simple')))
+    return str(yaml_dir)
+
+
+def test_columnar_import(tmpdir, data_dir):
+    """ Columnar store must give the same dataframe than YAML files """
+    pytest.importorskip('pyarrow')
+    yaml_dir = _results_dir(tmpdir, data_dir)
+    store_dir = str(tmpdir.join('store'))
+
+    store = DataStoreColumnar(store_dir)
+    assert store.import_yaml_tree(yaml_dir) == 1
+    assert isinstance(get_data_store(store_dir), DataStoreColumnar)
+    assert isinstance(get_data_store(yaml_dir), DataStoreYAML)
+
+    _, yaml_df, yaml_ctx, yaml_sub = DataStoreYAML().dir_to_pandas(yaml_dir, 'simple', (None, None))
+    _, col_df, col_ctx, col_sub = store.dir_to_pandas(store_dir, 'simple', (None, None))
+
+    assert not col_df.empty
+    assert sorted(yaml_ctx[0]) == sorted(col_ctx[0])
+    assert yaml_sub == col_sub
+    pandas.testing.assert_frame_equal(yaml_df[sorted(yaml_df.columns)].reset_index(drop=True),
+                                      col_df[sorted(col_df.columns)].reset_index(drop=True))
+
+
+def test_columnar_pushdown(tmpdir, data_dir):
+    """ Partitions and rows not matching the request are not read """
+    pytest.importorskip('pyarrow')
+    store_dir = str(tmpdir.join('store'))
+    store = DataStoreColumnar(store_dir)
+    store.import_yaml_tree(_results_dir(tmpdir, data_dir))
+
+    assert not list(store._list_data_files(store_dir, 'hpl'))
+    assert not list(store._list_data_files(store_dir, 'simple',
+                                           (datetime.datetime(2021, 1, 1), None)))
+    assert len(list(store._list_data_files(store_dir, 'simple',
+                                           (datetime.datetime(2020, 4, 6), None)))) == 1
+
+    run_file = list(store._list_data_files(store_dir, 'simple'))[0]
+    _, runs = store.load_results(run_file, ['p_pat_max'], ['host_p'])
+    for run in runs.values():
+        assert list(run['results_bench'].keys()) == ['p_pat_max']
+        assert 'cflags' not in run
+
+    _, df, _, _ = store.dir_to_pandas(store_dir, 'simple', (None, None),
+                                      result_filter={'simple': ['p_pat_max']})
+    assert df['simple_results'].unique().tolist() == ['p_pat_max']
+
+
+def test_columnar_unknown_date(tmpdir, data_dir):
+    """ Runs without a date are kept by both stores whatever the date bounds """
+    pytest.importorskip('pyarrow')
+    metadata, runs_info = DataStoreYAML().load(data_dir.bench_results)
+    del metadata['Date']
+    yaml_dir = tmpdir.mkdir('yaml_results')
+    DataStoreYAML().write(metadata, runs_info, str(yaml_dir.join('bench_results.yaml')))
+    store_dir = str(tmpdir.join('store'))
+    store = DataStoreColumnar(store_dir)
+    store.add_run(metadata, runs_info)
+
+    date_interval = (datetime.datetime(2020, 1, 1), datetime.datetime(2020, 2, 1))
+    assert len(list(store._list_data_files(store_dir, 'simple', date_interval))) == 1
+    _, yaml_df, _, _ = DataStoreYAML().dir_to_pandas(str(yaml_dir), 'simple', date_interval)
+    _, col_df, _, _ = store.dir_to_pandas(store_dir, 'simple', date_interval)
+    assert not yaml_df.empty
+    assert len(col_df) == len(yaml_df)
+
+
+def test_results_index(tmpdir, data_dir, results_index_dir, mocker):
+    """ Result files are selected from the index and refreshed when they change """
+    yaml_dir = _results_dir(tmpdir, data_dir)
+    tmpdir.join('yaml_results', 'simple', 'notes.txt').write('not a result file')
+    data = DataStoreYAML()
+    load = mocker.spy(data, 'load')
+
+    index = data.get_index(yaml_dir)
+    result_file = str(tmpdir.join('yaml_results', 'simple', 'bench_results.yaml'))
+    assert index.select('simple') == [result_file]
+    assert index.select('hpl') == []
+    assert index.select('simple', (datetime.datetime(2021, 1, 1), None)) == []
+    assert index.lookup([result_file])[result_file]['platform'] is not None
+    index.close()
+    # Only YAML files are parsed and the results directory is not written
+    assert load.call_count == 1
+    assert sorted(os.listdir(os.path.join(yaml_dir, 'simple'))) == ['bench_results.yaml',
+                                                                   'notes.txt']
+    assert len(os.listdir(results_index_dir)) == 1
+
+    renamed = tmpdir.join('yaml_results', 'simple', 'bench_results.yaml')
+    renamed.write(renamed.read().replace('Benchmark_name: simple', 'Benchmark_name: other'))
+    assert list(data._list_data_files(yaml_dir, 'simple')) == []
+    assert list(data._list_data_files(yaml_dir, 'other')) == [result_file]
+
+    renamed.remove()
+    assert list(data._list_data_files(yaml_dir, 'other')) == []
+
+
+def test_dir_to_pandas_workers(tmpdir, data_dir):
+    """ Files loaded by a process pool give the same dataframe, in the same order """
+    yaml_dir = tmpdir.mkdir('many_results')
+    for i in range(4):
+        shutil.copy(data_dir.bench_results, str(yaml_dir.mkdir('run_{}'.format(i))))
+
+    data = DataStoreYAML()
+    _, serial_df, serial_ctx, _ = data.dir_to_pandas(str(yaml_dir), 'simple')
+    _, parallel_df, parallel_ctx, _ = data.dir_to_pandas(str(yaml_dir), 'simple', workers=2)
+    pandas.testing.assert_frame_equal(serial_df, parallel_df)
+    assert serial_ctx == parallel_ctx
+
+    frames = [frame for _, frame, _, _ in data.iter_dir_pandas(str(yaml_dir), 'simple')]
+    assert len(frames) == 4
+    assert sum(len(frame) for frame in frames) == len(serial_df)
+
+
+def test_report_frame_by_column(data_dir):
+    """ Column wise frame construction gives the same frames than the row by row one """
+    data = DataStoreYAML()
+    _, runs = data.load(data_dir.bench_results)
+
+    imb_runs = copy.deepcopy(runs)
+    for run in imb_runs.values():
+        run['results_bench'] = {'msg_size': ['0', '1', '1024', 'max'],
+                                'bw': ['1.5', '2.5', '3', '4'],
+                                't_avg': [1.0, 2, 3.5, 4]}
+
+    cases = [(runs, (['host_p', 'comp_version'], None)),
+             (runs, (['host_p'], 'mpi_version')),
+             (imb_runs, (['host_p', 'msg_size'], None)),
+             (imb_runs, (['host_p'], 'msg_size'))]
+    for run_data, context in cases:
+        full_context = context[0] + ([context[1]] if context[1] else [])
+        by_column = data._build_report_frame(run_data, context, full_context, 'simple_results')
+        by_row = data._build_report_frame_by_row(run_data, context, full_context,
+                                                 'simple_results', 'simple')
+        assert by_column is not None
+        pandas.testing.assert_frame_equal(by_column, by_row)
+
+
+def test_results_cache(tmpdir, data_dir, mocker):
+    """ Unchanged files are not parsed again and cache size is bounded """
+    result_file = tmpdir.join('bench_results.yaml')
+    shutil.copy(data_dir.bench_results, str(result_file))
+    yaml_load = mocker.spy(yaml_io, 'load')
+    data = DataStoreYAML(ResultsCache(str(tmpdir.join('cache'))))
+
+    metadata, runs = data.load(str(result_file))
+    assert data.load(str(result_file)) == (metadata, runs)
+    assert yaml_load.call_count == 1
+    assert data.cache.hits == 1
+
+    result_file.write(result_file.read() + '\n')
+    assert data.load(str(result_file)) == (metadata, runs)
+    assert yaml_load.call_count == 2
+
+    stats = data.cache.stats()
+    assert stats['entries'] == 2
+    for entry in tmpdir.join('cache').listdir():
+        os.utime(str(entry), (0, 0))
+    small_cache = ResultsCache(str(tmpdir.join('cache')), stats['size'] // 2 + 1)
+    small_cache.put(str(data_dir.bench_results), (metadata, runs))
+    assert small_cache.stats()['entries'] == 1
+    assert small_cache.get(str(data_dir.bench_results)) == (metadata, runs)
+    assert small_cache.clear() == 1
+
+
+def test_results_cache_stats(tmpdir, data_dir):
+    """ Non result files are not cached and hit and miss counts are saved """
+    cache_dir = str(tmpdir.join('cache'))
+    other_file = tmpdir.join('other.yaml')
+    other_file.write('key: value\n')
+    data = DataStoreYAML(ResultsCache(cache_dir))
+
+    assert data.load(str(other_file)) == (None, None)
+    assert data.cache.stats()['entries'] == 0
+    data.load(str(data_dir.bench_results))
+    data.load(str(data_dir.bench_results))
+    data.cache.save_stats()
+
+    stats = ResultsCache(cache_dir).stats()
+    assert stats['entries'] == 1
+    assert (stats['hits'], stats['misses']) == (1, 2)
+    assert ResultsCache(cache_dir).clear() == 1
+    assert (ResultsCache(cache_dir).stats()['hits'], ResultsCache(cache_dir).stats()['misses']) \
+        == (0, 0)
+
+
+def test_runs_to_pandas(tmpdir, data_dir):
+    """ Dataframes built from runs loaded once are the same than those read from files """
+    yaml_dir = _results_dir(tmpdir, data_dir)
+    data = DataStoreYAML()
+    dir_runs = data.load_dir(yaml_dir)
+    assert list(dir_runs.keys()) == ['simple']
+
+    date_interval = (datetime.datetime(2020, 1, 1), datetime.datetime(2021, 1, 1))
+    for context in [(None, None), (['host_p'], 'mpi_version')]:
+        from_dir = data.dir_to_pandas(yaml_dir, 'simple', date_interval, context)
+        from_runs = data.runs_to_pandas(dir_runs['simple'], 'simple', date_interval, context)
+        pandas.testing.assert_frame_equal(from_dir[1], from_runs[1])
+        assert from_dir[2] == from_runs[2]
@@ -0,0 +1,96 @@
+""" HistoryStore tests """
+
+# pylint: disable=missing-docstring
+import datetime
+import numpy
+from ubench.data_management import yaml_io
+from ubench.data_management.history_store import (HistoryStore, change_points,
+                                                  series_change_points)
+
+
+def _write_runs(bench_results, result_dir, values):
+    """ Write a copy of bench_results per value, one day apart, with p_pat_avg set to value """
+    with open(bench_results, 'r') as rfile:
+        data = yaml_io.load(rfile)
+
+    start = datetime.datetime(2020, 1, 1, 12)
+    for day, value in enumerate(values):
+        data['Date'] = (start + datetime.timedelta(days=day)).strftime('%a %b %d %H:%M:%S %Y')
+        for run in data['runs'].values():
+            run['results_bench']['p_pat_avg'] = str(value)
+        run_dir = result_dir.mkdir('{:03d}'.format(day))
+        with open(str(run_dir.join('bench_results.yaml')), 'w') as wfile:
+            yaml_io.dump(data, wfile, default_flow_style=False)
+
+
+def test_history_add_and_query(data_dir, tmpdir):
+    history = HistoryStore(str(tmpdir.join('history', 'history.sqlite')))
+    assert history.add_file(data_dir.bench_results, 'campaign-a') == 3
+    assert history.add_file(data_dir.bench_results, 'campaign-b') == 0
+
+    results = history.query('simple')
+    assert sorted(results['metric']) == ['p_pat_avg', 'p_pat_max', 'p_pat_min']
+    assert (results['platform'] == 'l470').all()
+    assert (results['campaign'] == 'campaign-a').all()
+    assert results['date'][0] == datetime.datetime(2020, 4, 6, 15, 11, 34)
+
+    assert history.query('simple', metric='p_pat_max')['value'].tolist() == [99]
+    assert history.query('simple', platform='other').empty
+    assert history.query('simple', since=datetime.datetime(2021, 1, 1)).empty
+    assert len(history.query('simple', context={'comp_version': 'gnu'})) == 3
+    assert history.query('simple', context={'comp_version': 'intel'}).empty
+
+
+def test_history_rewritten_file(data_dir, tmpdir):
+    """ Rows of a rewritten result file replace the ones previously added """
+    history = HistoryStore(str(tmpdir.join('history.sqlite')))
+    result_dir = tmpdir.mkdir('results')
+    _write_runs(data_dir.bench_results, result_dir, [10])
+    result_file = str(result_dir.join('000', 'bench_results.yaml'))
+    assert history.add_file(result_file) == 3
+
+    result_dir.join('000').remove()
+    _write_runs(data_dir.bench_results, result_dir, [20])
+    assert history.add_file(result_file) == 3
+    assert history.add_file(result_file) == 0
+
+    results = history.query('simple', metric='p_pat_avg')
+    assert results['value'].tolist() == [20]
+    assert len(history.query('simple')) == 3
+
+
+def test_history_change_points(data_dir, tmpdir):
+    rng = numpy.random.RandomState(0)
+    values = list(100 + rng.normal(0, 1, 12)) + list(80 + rng.normal(0, 1, 8))
+    _write_runs(data_dir.bench_results, tmpdir.mkdir('results'), values)
+
+    history = HistoryStore(str(tmpdir.join('history.sqlite')))
+    assert history.add_dir(str(tmpdir.join('results'))) == 3 * len(values)
+    assert history.add_dir(str(tmpdir.join('results'))) == 0
+
+    series = history.series('simple', metric='p_pat_avg')
+    assert len(series) == len(values)
+    numpy.testing.assert_allclose(series['value'], values)
+
+    changes = series_change_points(history.series('simple'))
+    assert len(changes) == 1
+    assert changes['metric'][0] == 'p_pat_avg'
+    assert changes['date'][0] == datetime.datetime(2020, 1, 13, 12)
+    assert round(changes['shift(%)'][0]) == -20
+
+
+def test_change_points():
+    rng = numpy.random.RandomState(1)
+    values = numpy.concatenate([10 + rng.normal(0, 0.1, 15), 12 + rng.normal(0, 0.1, 10),
+                                11 + rng.normal(0, 0.1, 10)])
+    assert change_points(values) == [15, 25]
+    assert change_points(10 + rng.normal(0, 0.1, 40)) == []
+    assert change_points([1, 1, 1, 1]) == []
+    assert change_points([1, 2, 3]) == []
+
+
+def test_change_points_repeated_values():
+    # isolated outliers of rounded metrics are not level shifts
+    assert change_points([100, 100, 100, 100, 100.5, 100, 100, 100, 100, 100]) == []
+    assert change_points([100, 100, 100, 101, 100, 100, 100, 100]) == []
+    assert change_points([100] * 5 + [110] * 5) == [5]
@@ -0,0 +1,104 @@
+##############################################################################
+#  This file is part of the UncleBench benchmarking tool.                    #
+#        Copyright (C) 2019 EDF SA                                           #
+#                                                                            #
+#  UncleBench is free software: you can redistribute it and/or modify        #
+#  it under the terms of the GNU General Public License as published by      #
+#  the Free Software Foundation, either version 3 of the License, or         #
+#  (at your option) any later version.                                       #
+#                                                                            #
+#  UncleBench is distributed in the hope that it will be useful,             #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the              #
+#  GNU General Public License for more details.                              #
+#                                                                            #
+#  You should have received a copy of the GNU General Public License         #
+#  along with UncleBench. If not, see <http://www.gnu.org/licenses/>.        #
+#                                                                            #
+##############################################################################
+""" Tests of JobStateCache """
+
+# pylint: disable=missing-docstring
+import os
+import time
+from ubench.scheduler_interfaces.job_state_cache import JobStateCache
+
+
+def test_ttl(mocker):
+    cache = JobStateCache('', ttl={'RUNNING': 10, 'PENDING': 30})
+    cache.put({'1': 'RUNNING', '2': 'PENDING', '3': 'COMPLETED'})
+    assert cache.get(['1', '2', '3', '4']) == ({'1': 'RUNNING', '2': 'PENDING',
+                                                '3': 'COMPLETED'}, ['4'])
+
+    mocker.patch('ubench.scheduler_interfaces.job_state_cache.time.time',
+                 return_value=time.time() + 20)
+    assert cache.get(['1', '2', '3']) == ({'2': 'PENDING', '3': 'COMPLETED'}, ['1'])
+
+    mocker.patch('ubench.scheduler_interfaces.job_state_cache.time.time',
+                 return_value=time.time() + 1e5)
+    assert cache.get(['1', '2', '3']) == ({'3': 'COMPLETED'}, ['1', '2'])
+    assert (cache.hits, cache.misses) == (6, 4)
+
+    # job ids may be reused by the scheduler
+    mocker.patch('ubench.scheduler_interfaces.job_state_cache.time.time',
+                 return_value=time.time() + 1e6)
+    assert cache.get(['3']) == ({}, ['3'])
+
+
+def test_eviction(mocker):
+    cache = JobStateCache('', max_entries=3, ttl={'RUNNING': 10})
+    cache.put({'1': 'COMPLETED', '2': 'COMPLETED', '3': 'RUNNING'})
+    # 1 is used, 2 becomes the least recently used entry
+    cache.get(['1'])
+    cache.put({'4': 'COMPLETED'})
+    assert cache.get(['1', '2', '3', '4'])[1] == ['2']
+
+    # expired entries are evicted first
+    mocker.patch('ubench.scheduler_interfaces.job_state_cache.time.time',
+                 return_value=time.time() + 20)
+    cache.put({'5': 'COMPLETED'})
+    assert cache.get(['1', '3', '4', '5'])[1] == ['3']
+
+
+def test_shared_file(tmpdir):
+    cache_file = str(tmpdir.join('cache', 'job_states.json'))
+    first = JobStateCache(cache_file)
+    second = JobStateCache(cache_file)
+
+    first.put({'1': 'RUNNING'})
+    assert second.get(['1']) == ({'1': 'RUNNING'}, [])
+    second.put({'1': 'COMPLETED', '2': 'FAILED'})
+    assert first.get(['1', '2']) == ({'1': 'COMPLETED', '2': 'FAILED'}, [])
+    assert first.stats()['entries'] == 2
+
+    assert first.clear() == 2
+    assert not os.path.exists(cache_file)
+    assert JobStateCache(cache_file).get(['1']) == ({}, ['1'])
+
+
+def test_bad_file(tmpdir):
+    cache_file = str(tmpdir.join('job_states.json'))
+    with open(cache_file, 'w') as cfile:
+        cfile.write('not json')
+
+    cache = JobStateCache(cache_file)
+    assert cache.get(['1']) == ({}, ['1'])
+    cache.put({'1': 'COMPLETED'})
+    assert JobStateCache(cache_file).get(['1']) == ({'1': 'COMPLETED'}, [])
+
+
+def test_clusters(tmpdir):
+    cache_file = str(tmpdir.join('job_states.json'))
+    JobStateCache(cache_file, cluster='cluster1').put({'1': 'COMPLETED'})
+    assert JobStateCache(cache_file, cluster='cluster2').get(['1']) == ({}, ['1'])
+    assert JobStateCache(cache_file, cluster='cluster1').get(['1']) == ({'1': 'COMPLETED'}, [])
+
+
+def test_legacy_file(tmpdir, mocker):
+    """ terminal states of old cache files used to never expire """
+    cache_file = tmpdir.join('job_states.json')
+    cache_file.write('{"1": ["COMPLETED", null, %f]}' % time.time())
+    assert JobStateCache(str(cache_file)).get(['1']) == ({'1': 'COMPLETED'}, [])
+    mocker.patch('ubench.scheduler_interfaces.job_state_cache.time.time',
+                 return_value=time.time() + 1e6)
+    assert JobStateCache(str(cache_file)).get(['1']) == ({}, ['1'])
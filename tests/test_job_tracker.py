@@ -0,0 +1,63 @@
+""" JobTracker tests """
+
+# pylint: disable=missing-docstring
+from ubench.scheduler_interfaces.job_tracker import JobTracker
+
+
+class ScriptedScheduler(object):
+    """ Scheduler returning job states from a list of ticks """
+
+    def __init__(self, ticks):
+        self.ticks = ticks
+        self.queries = []
+
+    def get_jobs_state(self, job_ids):
+        self.queries.append(list(job_ids))
+        states = self.ticks[min(len(self.queries), len(self.ticks)) - 1]
+        return {job_id: state for job_id, state in states.items() if job_id in job_ids}
+
+
+def test_job_tracker_batches_and_callbacks():
+    scheduler = ScriptedScheduler([
+        {'1': 'PENDING', '2': 'PENDING', '3': 'PENDING'},
+        {'1': 'RUNNING', '2': 'PENDING', '3': 'RUNNING'},
+        {'1': 'COMPLETED', '2': 'RUNNING', '3': 'FAILED'},
+        {'2': 'TIMEOUT'},
+    ])
+    finished = []
+    done = []
+    tracker = JobTracker(scheduler, min_interval=1, max_interval=60)
+    tracker.track(['1', '2'], on_finish=lambda job, state: finished.append((job, state)),
+                  on_done=done.append)
+    tracker.track([3], on_done=done.append)
+
+    sleeps = []
+    tracker.wait(sleep=sleeps.append)
+
+    # One query per tick for jobs of every group, finished jobs are not queried again
+    assert scheduler.queries == [['1', '2', '3'], ['1', '2', '3'], ['1', '2', '3'], ['2']]
+    assert finished == [('1', 'COMPLETED'), ('2', 'TIMEOUT')]
+    assert done == [{'3': 'FAILED'}, {'1': 'COMPLETED', '2': 'TIMEOUT'}]
+    assert tracker.states() == {'1': 'COMPLETED', '2': 'TIMEOUT', '3': 'FAILED'}
+    assert len(sleeps) == 3
+    assert not tracker.unfinished()
+
+
+def test_job_tracker_backoff():
+    scheduler = ScriptedScheduler([{'1': 'PENDING', '2': 'PENDING'}])
+    tracker = JobTracker(scheduler, min_interval=2, max_interval=30)
+    tracker.track(['1', '2'])
+
+    tracker.poll()
+    assert tracker.interval == 2
+    intervals = []
+    for _ in range(5):
+        tracker.poll()
+        intervals.append(tracker.interval)
+    # Pending jobs: interval grows up to its maximum
+    assert intervals == [4, 8, 16, 30, 30]
+
+    # A state change shrinks the interval
+    scheduler.ticks.append({'1': 'RUNNING', '2': 'PENDING'})
+    tracker.poll()
+    assert tracker.interval == 15
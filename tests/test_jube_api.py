@@ -21,6 +21,8 @@
 
 import time
 import csv
+import hashlib
+import types
 import pytest
 import ubench.benchmarking_tools_interfaces.jube_benchmarking_api as jba
 from fake_data import MockFile
@@ -98,6 +100,41 @@ def test_run(mocker, mock_os_methods):
     assert isinstance(j_job.jubeid, int)
 
 
+def test_reserve_id(tmpdir):
+    output_dir = str(tmpdir.join('benchmark_runs'))
+    assert jba.JubeRun.reserve_id(output_dir) == 0
+    for numdir in ['000003', 'result']:
+        tmpdir.join('benchmark_runs', numdir).mkdir()
+    tmpdir.join('benchmark_runs', jba.LAST_ID_FILE).remove()
+    assert jba.JubeRun.reserve_id(output_dir) == 4
+    assert jba.JubeRun.reserve_id(output_dir) == 5
+    # run started without ubench
+    tmpdir.join('benchmark_runs', '000006').mkdir()
+    assert jba.JubeRun.reserve_id(output_dir) == 7
+
+
+def test_jube_run_handshake(tmpdir, monkeypatch):
+    bin_dir = tmpdir.mkdir('bin')
+    jube = bin_dir.join('jube')
+    jube.write('#!/bin/bash\necho "$@" > $FAKE_JUBE_OUT/args\nsleep 0.1\n'
+               'mkdir $FAKE_JUBE_OUT/$(printf "%06d" "${@: -1}")\nsleep 0.5\n')
+    jube.chmod(0o755)
+    output_dir = tmpdir.mkdir('benchmark_runs')
+    output_dir.mkdir('000002')
+    monkeypatch.setenv('PATH', os.pathsep.join([str(bin_dir), os.environ['PATH']]))
+    monkeypatch.setenv('FAKE_JUBE_OUT', str(output_dir))
+
+    j_job = jba.JubeRun('bench', 'platform')
+    start = time.time()
+    j_job.run(str(output_dir), str(tmpdir))
+    assert time.time() - start < 0.5
+    assert j_job.jubeid == 3
+    assert j_job.result_path == str(output_dir.join('000003'))
+    assert output_dir.join('args').read().split() == ['run', '--hide-animation', 'bench.xml',
+                                                      '--tag', 'platform', '--id', '3']
+    assert j_job.jube_process.wait() == 0
+
+
 def test_bench_datagen(jube_info_files):
     file_path = os.path.join(jube_info_files, 'mock_jube_info.cvs')
     with open(file_path, 'r') as csvfile:
@@ -145,4 +182,77 @@ def test_result(mocker, mock_os_methods, jube_info_files):
     assert '1' in context
     assert 'results_bench' in context['1']
     assert context['1']['results_bench'] == {'p_pat_min': '9', 'p_pat_max': '11', 'p_pat_avg': '10'}
-    assert context['5']['results_bench'] == {'p_pat_min': '45', 'p_pat_max': '51', 'p_pat_avg': '50'}
\ No newline at end of file
+    assert context['5']['results_bench'] == {'p_pat_min': '45', 'p_pat_max': '51', 'p_pat_avg': '50'}
+
+def test_result_incremental(mocker, mock_os_methods, jube_info_files):
+    """Incremental extraction only reads job information of new workpackages"""
+    mock_file = MockFile(jube_info_files)
+    opened = []
+
+    def results_file(f_name, mode=None):
+        opened.append(f_name)
+        return mock_file.results_file(f_name, mode)
+
+    mocker.patch(".".join(MOCK_XML),
+                 side_effect=mockxmlparser)
+    mocker.patch(".".join(MOCK_JAPI+["JubeBenchmarkingAPI", "_analyse"]))
+    mocker.patch(".".join(MOCK_JAPI+["JubeBenchmarkingAPI", "_extract_results"]))
+    mock_data_write = mocker.patch(".".join(MOCK_DATA+["DataStoreYAML", "write"]))
+    mocker.patch("tempfile.TemporaryFile", side_effect=mock_file.jube_file)
+    mocker.patch(".".join(MOCK_JAPI+["Popen"]))
+    mocker.patch(".".join(MOCK_JAPI+["open"]), side_effect=results_file)
+    # every workpackage is done
+    mocker.patch(".".join(MOCK_JAPI+["JubeBenchmarkingAPI", "_workpackage_done"]),
+                 return_value=True)
+
+    jube_api = jba.JubeBenchmarkingAPI('test', 'platform')
+    jube_api.result(0, output=False, incremental=True)
+    _, full_context, _ = mock_data_write.call_args.args
+    first_reads = len([f_name for f_name in opened if 'stdout' in f_name])
+    failed = [exec_id for exec_id, row in full_context.items()
+              if row['results_bench'] == 'failed']
+    assert first_reads == len(full_context)
+    assert len(failed) < len(full_context)
+
+    del opened[:]
+    jube_api.result(0, output=False, incremental=True)
+    _, context, _ = mock_data_write.call_args.args
+    assert len([f_name for f_name in opened if 'stdout' in f_name]) == len(failed)
+    assert context == full_context
+
+
+def test_result_incremental_running(mocker, tmpdir):
+    """Results of a workpackage whose job was running are read again once it completes"""
+    work_dir = tmpdir.mkdir('benchmark_runs').mkdir('000000').mkdir('000001_execute').mkdir('work')
+    work_dir.join('stdout').write('Submitted batch job 42\n')
+    results = {'value': 'partial'}
+    key = hashlib.md5('a'.encode('utf-8')).hexdigest()
+    mocker.patch.object(jba.JubeBenchmarkingAPI, 'jube_files',
+                        types.SimpleNamespace(get_bench_outputdir=lambda: 'benchmark_runs'))
+    mocker.patch.object(jba.JubeBenchmarkingAPI, '_get_execution_context',
+                        side_effect=lambda benchmark_id: (['p'], {'1': {
+                            'jube_wp_id': '1', 'jube_wp_abspath': str(work_dir), 'p': 'a'}}))
+    mocker.patch.object(jba.JubeBenchmarkingAPI, '_get_results',
+                        side_effect=lambda rundir, names: ({key: results['value']}, ['p', 'r']))
+    scheduler = mocker.patch(".".join(MOCK_JAPI+["get_scheduler_interface"])).return_value
+    scheduler.get_jobs_info.return_value = {}
+    scheduler.get_jobs_state.return_value = {'42': 'RUNNING'}
+    jube_api = jba.JubeBenchmarkingAPI('test', 'platform')
+    jube_api.benchmark_path = str(tmpdir)
+
+    assert jube_api._write_bench_data(0, incremental=True) == {'000001_execute': 'partial'}
+    results['value'] = 'full'
+    scheduler.get_jobs_state.return_value = {'42': 'COMPLETED'}
+    assert jube_api._write_bench_data(0, incremental=True) == {'000001_execute': 'full'}
+    results['value'] = 'changed'
+    assert jube_api._write_bench_data(0, incremental=True) == {'000001_execute': 'full'}
+
+    # rows of bench_results.yaml are only reused once the workpackage is done
+    jube_api = jba.JubeBenchmarkingAPI('test', 'platform')
+    jube_api.benchmark_path = str(tmpdir)
+    assert jube_api._write_bench_data(0, incremental=True) == {'000001_execute': 'changed'}
+    tmpdir.join('benchmark_runs', '000000', '000001_execute', 'done').write('')
+    results['value'] = 'other'
+    jube_api = jba.JubeBenchmarkingAPI('test', 'platform')
+    jube_api.benchmark_path = str(tmpdir)
+    assert jube_api._write_bench_data(0, incremental=True) == {'000001_execute': 'changed'}
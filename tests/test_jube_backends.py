@@ -0,0 +1,127 @@
+##############################################################################
+#  This file is part of the UncleBench benchmarking tool.                    #
+#        Copyright (C) 2019 EDF SA                                           #
+#                                                                            #
+#  UncleBench is free software: you can redistribute it and/or modify        #
+#  it under the terms of the GNU General Public License as published by      #
+#  the Free Software Foundation, either version 3 of the License, or         #
+#  (at your option) any later version.                                       #
+#                                                                            #
+#  UncleBench is distributed in the hope that it will be useful,             #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the              #
+#  GNU General Public License for more details.                              #
+#                                                                            #
+#  You should have received a copy of the GNU General Public License         #
+#  along with UncleBench. If not, see <http://www.gnu.org/licenses/>.        #
+#                                                                            #
+##############################################################################
+""" Tests of JUBE backends """
+
+# pylint: disable=missing-docstring,redefined-outer-name
+import os
+import sys
+import threading
+import types
+import pytest
+import ubench.benchmarking_tools_interfaces.jube_backends as jube_backends
+import ubench.benchmarking_tools_interfaces.jube_benchmarking_api as jba
+from ubench.benchmarking_tools_interfaces.jube_backends import (JubeInProcessBackend,
+                                                                jube_backend)
+
+
+def fake_main(command):
+    """ jube2.main.main printing its working directory and arguments """
+    print(os.getcwd())
+    print(' '.join(command))
+    if command[0] == 'fail':
+        print('jube error', file=sys.stderr)
+        sys.exit(1)
+    if command[0] == 'crash':
+        raise KeyError('step')
+
+
+@pytest.fixture
+def fake_jube():
+    return types.SimpleNamespace(main=fake_main)
+
+
+def test_jube_backend(monkeypatch, fake_jube, capsys):
+    assert jube_backend('subprocess') is None
+    monkeypatch.setattr(jube_backends, 'jube_main', None)
+    assert jube_backend('inprocess') is None
+    monkeypatch.setattr(jube_backends, 'jube_main', fake_jube)
+    assert isinstance(jube_backend('inprocess'), JubeInProcessBackend)
+    assert jube_backend('jube3') is None
+    assert 'unknown JUBE backend jube3' in capsys.readouterr().out
+
+
+def test_inprocess_backend(tmpdir, fake_jube, capsys):
+    """ Commands do not change the working directory of the process """
+    backend = JubeInProcessBackend(fake_jube)
+    cwd = os.getcwd()
+    runs_dir = str(tmpdir.join('benchmark_runs'))
+    assert backend.run(['analyse', runs_dir, '--id', '3']) == \
+        (0, [cwd, 'analyse {} --id 3'.format(runs_dir)], [])
+    assert backend.run(['fail']) == (1, [cwd, 'fail'], ['jube error'])
+    assert backend.run(['crash']) == (1, [cwd, 'crash'], ["KeyError: 'step'"])
+    assert os.getcwd() == cwd
+    assert capsys.readouterr() == ('', '')
+
+
+def test_inprocess_backend_threads(tmpdir, capsys):
+    """ Output printed by other threads during a command is not kept """
+    started = threading.Event()
+    printed = threading.Event()
+
+    def main(command):
+        print('jube')
+        started.set()
+        printed.wait(timeout=5)
+
+    def other_thread():
+        started.wait(timeout=5)
+        print('other')
+        printed.set()
+
+    thread = threading.Thread(target=other_thread)
+    thread.start()
+    assert JubeInProcessBackend(types.SimpleNamespace(main=main)).run(['run']) \
+        == (0, ['jube'], [])
+    thread.join()
+    assert capsys.readouterr().out == 'other\n'
+
+
+def test_api_backend(mocker, monkeypatch, fake_jube):
+    run_cmd = mocker.patch('ubench.utils.run_cmd', return_value=(0, [], []))
+    monkeypatch.setattr(jube_backends, 'jube_main', None)
+    jube_api = jba.JubeBenchmarkingAPI('bench', 'platform')
+    jube_api._run_jube(['analyse', 'benchmark_runs', '--id', '0'])
+    run_cmd.assert_called_with('jube analyse benchmark_runs --id 0', jube_api.benchmark_path)
+
+    monkeypatch.setattr(jube_backends, 'jube_main', fake_jube)
+    jube_api = jba.JubeBenchmarkingAPI('bench', 'platform')
+    assert jube_api._run_jube(['analyse', '/benchmark_runs'])[1][1] == 'analyse /benchmark_runs'
+    assert run_cmd.call_count == 1
+
+
+def test_api_status_info(mocker, tmpdir):
+    """ jube info of every step is run by the JUBE backend with absolute paths """
+    jube_api = jba.JubeBenchmarkingAPI('bench', 'platform')
+    jube_api.benchmark_path = str(tmpdir)
+    mocker.patch.object(jba.JubeBenchmarkingAPI, 'jube_files',
+                        types.SimpleNamespace(get_bench_outputdir=lambda: 'benchmark_runs',
+                                              get_bench_steps=lambda: ['compile', 'execute']))
+    run_jube = mocker.patch.object(jube_api, '_run_jube', return_value=(
+        0, ['   id | started | done | workdir', '    0 |    true | true | ./000000_compile'], []))
+    cwd = os.getcwd()
+
+    status = jube_api.get_status_info(1)
+    assert status['execute'] == [{'id': '0', 'started': 'true', 'done': 'true',
+                                  'workdir': './000000_compile'}]
+    runs_dir = str(tmpdir.join('benchmark_runs'))
+    assert [call[0][0] for call in run_jube.call_args_list] == [
+        ['continue', '--hide-animation', runs_dir, '--id', '1'],
+        ['info', runs_dir, '--id', '1', '--step', 'compile'],
+        ['info', runs_dir, '--id', '1', '--step', 'execute']]
+    assert os.getcwd() == cwd
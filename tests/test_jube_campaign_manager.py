@@ -20,10 +20,12 @@
 # pylint: disable=line-too-long,missing-docstring,unused-variable,unused-import
 
 import os
+import time
 import pytest
 import fake_data
 from ubench.benchmark_managers.campaign_benchmark_manager import CampaignManager
 from ubench.benchmarking_tools_interfaces.jube_benchmarking_api import JubeBenchmarkingAPI
+from ubench.scheduler_interfaces.job_tracker import JobTracker
 
 MOCK_JUBE_BENCH_API = ["ubench",
                        "benchmarking_tools_interfaces",
@@ -94,8 +96,8 @@ def test_campaign_run(mocker, init_env, mock_benchs, run_dir, data_dir):
     random job states"""
 
     mock_api = mocker.patch("fake_data.FakeAPI2.result")
-    mocker.patch(".".join(MOCK_CM+["SlurmInterface"]),
-                 side_effect=fake_data.FakeSlurm)
+    mocker.patch(".".join(MOCK_CM+["get_scheduler_interface"]),
+                 side_effect=lambda platform: fake_data.FakeSlurm())
     mocker.patch(".".join(MOCK_JUBE_BENCH_API),
                  side_effect=fake_data.FakeAPI2)
 
@@ -107,4 +109,156 @@ def test_campaign_run(mocker, init_env, mock_benchs, run_dir, data_dir):
     if sys.version_info[0:2]<=(3,5): return
     mock_api.assert_called()
 
-#====> todo print_campaign_status test
\ No newline at end of file
+#====> todo print_campaign_status test
+
+class FakeLaunchRun:
+    def __init__(self):
+        self.jube_returncode = None
+
+
+class FakeLaunchAPI:
+    """Fakes JubeBenchmarkingAPI whose launches take some time"""
+    def __init__(self, benchmark, launches):
+        self.benchmark = benchmark
+        self.launches = launches
+
+    def run(self, opts):
+        start = time.time()
+        time.sleep(0.2)
+        self.launches[self.benchmark] = (start, time.time())
+        return FakeLaunchRun(), []
+
+
+def launched_campaign(data_dir, concurrency):
+    campaign = CampaignManager(data_dir.campaign, concurrency=concurrency)
+    launches = {}
+    for b_name in ['bench_2', 'bench_1', 'bench_3', 'bench_4']:
+        campaign.benchmarks[b_name] = FakeLaunchAPI(b_name, launches)
+        campaign.campaign_status[b_name] = {'status': 'INIT'}
+    return campaign, launches
+
+
+def wait_launches(campaign):
+    while campaign.launch_benchmarks() and campaign._launching:
+        time.sleep(0.05)
+    return sorted(campaign.exec_info)
+
+
+def test_campaign_launch(init_env, mock_benchs, run_dir, data_dir):
+    """benchmarks are launched concurrently by order, compiling benchmarks hold a slot"""
+    campaign, launches = launched_campaign(data_dir, 2)
+    assert wait_launches(campaign) == ['bench_1', 'bench_2']
+    assert launches['bench_1'][0] < launches['bench_2'][1]
+    assert launches['bench_2'][0] < launches['bench_1'][1]
+    assert campaign.campaign_status['bench_3']['status'] == 'INIT'
+
+    campaign.exec_info['bench_2'][0].jube_returncode = 0
+    assert wait_launches(campaign) == ['bench_1', 'bench_2', 'bench_3']
+    for j_job, _ in campaign.exec_info.values():
+        j_job.jube_returncode = 0
+    assert wait_launches(campaign) == ['bench_1', 'bench_2', 'bench_3', 'bench_4']
+    assert not campaign.launch_benchmarks()
+
+
+def test_campaign_launch_strict_order(init_env, mock_benchs, run_dir, data_dir):
+    """benchmarks are launched once lower order benchmarks have been compiled"""
+    campaign, _ = launched_campaign(data_dir, 4)
+    campaign.strict_order = True
+    assert wait_launches(campaign) == ['bench_2']
+    campaign.exec_info['bench_2'][0].jube_returncode = 0
+    assert wait_launches(campaign) == ['bench_1', 'bench_2']
+
+
+class FakeTrackedRun:
+    def __init__(self, job_ids):
+        self.jube_returncode = 0
+        self.job_ids = job_ids
+        self.exec_dir = {'00000{}_execute'.format(idx): job_id
+                         for idx, job_id in enumerate(job_ids)}
+
+
+class FakeStates:
+    def __init__(self):
+        self.queries = []
+
+    def get_jobs_state(self, job_ids):
+        self.queries.append(sorted(job_ids))
+        return {job_id: 'RUNNING' for job_id in job_ids}
+
+
+def test_campaign_compiled_jobs_polled(init_env, mock_benchs, run_dir, data_dir):
+    """jobs of a benchmark compiled since the last tick are read in the same tick"""
+    campaign = CampaignManager(data_dir.campaign)
+    scheduler = FakeStates()
+    campaign.job_tracker = JobTracker(scheduler)
+    campaign.exec_info['bench_1'] = (FakeTrackedRun(['11', '12']), [])
+    campaign.campaign_status['bench_1'] = {'status': 'CONFIGURING'}
+
+    campaign.update_campaign_status()
+    assert scheduler.queries == [['11', '12']]
+    status = campaign.campaign_status['bench_1']
+    assert status['num_jobs'] == 2
+    assert [job['status'] for job in status['jobs']] == ['RUNNING', 'RUNNING']
+
+
+class FakePacker(FakeStates):
+    def __init__(self, states):
+        FakeStates.__init__(self)
+        self.states = states
+
+    def submit_command(self):
+        return 'ubench-pack-submit'
+
+    def allocate(self):
+        return False
+
+    def dispatch(self):
+        return []
+
+    def get_jobs_state(self, job_ids):
+        self.queries.append(sorted(job_ids))
+        return {job_id: self.states[job_id] for job_id in job_ids if job_id in self.states}
+
+
+class FakeMixedAPI:
+    """Fakes JubeBenchmarkingAPI of a benchmark with one job"""
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.opts = None
+        self.results_file = None
+
+    def run(self, opts):
+        self.opts = dict(opts)
+        return FakeTrackedRun([self.job_id]), []
+
+    def result(self, *args, **kwargs):
+        pass
+
+
+def test_campaign_pack_custom_nodes(init_env, mock_benchs, run_dir, data_dir):
+    """benchmarks run with custom nodes are tracked by the scheduler in pack mode"""
+    campaign = CampaignManager(data_dir.campaign, pack=True)
+    # slurm and spool job ids are independent
+    scheduler = FakeStates()
+    campaign.job_tracker = JobTracker(scheduler)
+    campaign.node_packer = FakePacker({'1': 'COMPLETED'})
+    campaign.packed_job_tracker = JobTracker(campaign.node_packer)
+    campaign.campaign['benchmarks']['bench_1']['parameters']['w'] = ['2']
+    for b_name, job_id in [('bench_1', '1'), ('bench_2', '1')]:
+        campaign.benchmarks[b_name] = FakeMixedAPI(job_id)
+        campaign.campaign_status[b_name] = {'status': 'INIT'}
+        campaign.exec_info[b_name] = campaign._launch_benchmark(b_name)
+
+    assert 'pack_submit' not in campaign.benchmarks['bench_1'].opts
+    assert campaign.benchmarks['bench_2'].opts['pack_submit'] == 'ubench-pack-submit'
+    assert campaign.packed_benchmarks == {'bench_2'}
+
+    campaign.update_campaign_status()
+    assert scheduler.queries == [['1']]
+    assert campaign.node_packer.queries == [['1']]
+    assert campaign.campaign_status['bench_1']['status'] == 'RUNNING'
+    assert campaign.campaign_status['bench_2']['status'] == 'FINISHED'
+
+    scheduler.get_jobs_state = lambda job_ids: {job_id: 'COMPLETED' for job_id in job_ids}
+    campaign.update_campaign_status()
+    assert not campaign.non_finished()
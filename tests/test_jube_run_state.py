@@ -0,0 +1,125 @@
+##############################################################################
+#  This file is part of the UncleBench benchmarking tool.                    #
+#        Copyright (C) 2019 EDF SA                                           #
+#                                                                            #
+#  UncleBench is free software: you can redistribute it and/or modify        #
+#  it under the terms of the GNU General Public License as published by      #
+#  the Free Software Foundation, either version 3 of the License, or         #
+#  (at your option) any later version.                                       #
+#                                                                            #
+#  UncleBench is distributed in the hope that it will be useful,             #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the              #
+#  GNU General Public License for more details.                              #
+#                                                                            #
+#  You should have received a copy of the GNU General Public License         #
+#  along with UncleBench. If not, see <http://www.gnu.org/licenses/>.        #
+#                                                                            #
+##############################################################################
+""" Tests of change detection of JUBE runs """
+
+# pylint: disable=missing-docstring,redefined-outer-name,protected-access
+import os
+import pytest
+import ubench.benchmarking_tools_interfaces.jube_benchmarking_api as jba
+from ubench.benchmarking_tools_interfaces.jube_run_state import (run_state, read_result_state,
+                                                                 write_result_state)
+
+CONFIGURATION = """<jube>
+  <benchmark name="bench" outpath="benchmark_runs">
+    <analyser name="analyse">
+      <analyse step="execute"><file>${outlogfile}</file></analyse>
+    </analyser>
+    <result><table name="result" style="csv"><column>p</column></table></result>
+  </benchmark>
+</jube>
+"""
+
+
+def touch(path, text='', mtime=None):
+    path.write(text, ensure=True)
+    if mtime:
+        os.utime(str(path), (mtime, mtime))
+
+
+@pytest.fixture
+def run_dir(tmpdir):
+    run_dir = tmpdir.join('benchmark_runs', '000000')
+    run_dir.join('configuration.xml').write(CONFIGURATION, ensure=True)
+    touch(run_dir.join('000000_compile', 'done'), mtime=1000)
+    touch(run_dir.join('000000_compile', 'work', 'a.out'), mtime=1000)
+    touch(run_dir.join('000001_execute', 'work', 'job.out'), 'running', mtime=1000)
+    touch(run_dir.join('000001_execute', 'work', 'job.err'), mtime=1000)
+    return run_dir
+
+
+def test_run_state(run_dir):
+    # files of unfinished workpackages and analysed files of finished ones
+    state = run_state(str(run_dir), ['*.log'])
+    assert sorted(state) == [os.path.join('000000_compile', 'done'),
+                             os.path.join('000001_execute', 'work', 'job.err'),
+                             os.path.join('000001_execute', 'work', 'job.out')]
+    # parameters of analysed file names match any name
+    assert os.path.join('000000_compile', 'work', 'a.out') in \
+        run_state(str(run_dir), ['${outlogfile}'])
+
+    touch(run_dir.join('000000_compile', 'work', 'a.out'), 'binary')
+    assert run_state(str(run_dir), ['*.log']) == state
+
+    # the job ended
+    touch(run_dir.join('000001_execute', 'work', 'ready'))
+    assert run_state(str(run_dir), ['*.log']) != state
+
+
+def test_result_state(run_dir):
+    state = run_state(str(run_dir), [])
+    write_result_state(str(run_dir), state)
+    # result files are missing
+    assert read_result_state(str(run_dir)) is None
+    touch(run_dir.join('bench_results.yaml'))
+    touch(run_dir.join('result', 'ubench_results.dat'))
+    assert read_result_state(str(run_dir)) == state
+    run_dir.join('.ubench_result_state').write('{')
+    assert read_result_state(str(run_dir)) is None
+
+
+def test_result_unchanged_run(mocker, tmpdir, run_dir):
+    jube_files = mocker.patch.object(jba.JubeBenchmarkingAPI, 'jube_files',
+                                     new_callable=mocker.PropertyMock)
+    jube_files.return_value.get_bench_outputdir.return_value = 'benchmark_runs'
+    jube_commands = []
+
+    def run_jube(args):
+        jube_commands.append(args[0])
+        if args[0] == 'result':
+            touch(run_dir.join('result', 'result.dat'), 'p\n1\n')
+            return 0, ['p', '1'], []
+        if args[0] == 'continue':
+            touch(run_dir.join('000001_execute', 'done'))
+        return 0, [], []
+
+    def write_bench_data(benchmark_id, incremental):
+        touch(run_dir.join('bench_results.yaml'))
+
+    mocker.patch.object(jba.JubeBenchmarkingAPI, '_run_jube', side_effect=run_jube)
+    mocker.patch.object(jba.JubeBenchmarkingAPI, '_write_bench_data',
+                        side_effect=write_bench_data)
+    jube_api = jba.JubeBenchmarkingAPI('bench', 'platform')
+    jube_api.benchmark_path = str(tmpdir)
+
+    assert jube_api.result(0, output=False) == [['p'], ['1']]
+    assert jube_commands == ['continue', 'analyse', 'result']
+    assert run_dir.join('result', 'ubench_results.dat').check()
+
+    del jube_commands[:]
+    assert jube_api.result(0, output=False) == [['p'], ['1']]
+    assert jube_api.results_file == str(run_dir.join('bench_results.yaml'))
+    assert jube_commands == []
+
+    jube_api.result(0, output=False, force=True)
+    assert jube_commands == ['continue', 'analyse', 'result']
+
+    del jube_commands[:]
+    touch(run_dir.join('000001_execute', 'work', 'job.out'), 'finished')
+    jube_api.result(0, output=False)
+    assert jube_commands == ['continue', 'analyse', 'result']
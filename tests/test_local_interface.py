@@ -0,0 +1,147 @@
+##############################################################################
+#  This file is part of the UncleBench benchmarking tool.                    #
+#        Copyright (C) 2019 EDF SA                                           #
+#                                                                            #
+#  UncleBench is free software: you can redistribute it and/or modify        #
+#  it under the terms of the GNU General Public License as published by      #
+#  the Free Software Foundation, either version 3 of the License, or         #
+#  (at your option) any later version.                                       #
+#                                                                            #
+#  UncleBench is distributed in the hope that it will be useful,             #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the              #
+#  GNU General Public License for more details.                              #
+#                                                                            #
+#  You should have received a copy of the GNU General Public License         #
+#  along with UncleBench. If not, see <http://www.gnu.org/licenses/>.        #
+#                                                                            #
+##############################################################################
+""" Tests of the local scheduler """
+
+# pylint: disable=missing-docstring,redefined-outer-name
+import os
+import re
+import signal
+import time
+import pytest
+import ubench.config
+from ubench.scheduler_interfaces.job_tracker import JobTracker
+from ubench.scheduler_interfaces.local_interface import LocalSchedulerInterface, main
+from ubench.scheduler_interfaces.scheduler_interface import (get_scheduler_interface,
+                                                             platform_scheduler)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+JOB_SCRIPT = """
+grep Cpus_allowed_list /proc/self/status > cpus_$1
+sleep 0.3
+exit $2
+"""
+
+
+@pytest.fixture
+def spool_dir(tmpdir, monkeypatch):
+    """ Keep local jobs in the test temporary directory, job runners import ubench """
+    monkeypatch.setenv('PYTHONPATH', os.pathsep.join([ROOT_DIR, os.environ.get('PYTHONPATH', '')]))
+    spool = str(tmpdir.join('spool'))
+    monkeypatch.setattr(ubench.config, 'LOCAL_SCHEDULER_DIR', spool)
+    return spool
+
+
+def write_script(tmpdir, name, exit_code):
+    script = tmpdir.join(name)
+    script.write(JOB_SCRIPT.replace('$1', name).replace('$2', str(exit_code)))
+    return str(script)
+
+
+def test_local_jobs(tmpdir, spool_dir):
+    cpu = sorted(os.sched_getaffinity(0))[0]
+    interface = LocalSchedulerInterface(cpus=[cpu])
+    job_ids = [interface.submit(write_script(tmpdir, 'job1', 0), cwd=str(tmpdir)),
+               interface.submit(write_script(tmpdir, 'job2', 3), cwd=str(tmpdir), cpus=4,
+                                job_name='second')]
+    assert job_ids == ['1', '2']
+
+    tracker = JobTracker(interface, min_interval=0.1, max_interval=0.5)
+    tracker.track(job_ids)
+    tracker.wait()
+    assert tracker.states() == {'1': 'COMPLETED', '2': 'FAILED'}
+
+    # jobs were bound to the only CPU, so they ran one after the other
+    for name in ['job1', 'job2']:
+        assert tmpdir.join('cpus_' + name).read().split()[-1] == str(cpu)
+    infos = interface.get_jobs_info(job_ids)
+    assert infos['2'][0]['job_name'] == 'second'
+    # runners of both jobs compete for the CPU, any of them may run first
+    first, second = sorted([interface._read_job(job_id) for job_id in job_ids],
+                           key=lambda job: job['start_time'])
+    assert first['end_time'] <= second['start_time']
+    assert re.match(r'^\d\d:\d\d:\d\d$', infos['1'][0]['job_elasped'])
+    assert interface.get_jobs_state(['3']) == {}
+
+    assert interface.purge(-1) == 2
+    assert LocalSchedulerInterface().submit(write_script(tmpdir, 'job3', 0), str(tmpdir)) == '3'
+
+
+def _wait_state(interface, job_id, state, timeout=10):
+    deadline = time.time() + timeout
+    while interface.get_jobs_state([job_id])[job_id] != state:
+        assert time.time() < deadline
+        time.sleep(0.05)
+
+
+def test_local_killed_runner(tmpdir, spool_dir):
+    cpu = sorted(os.sched_getaffinity(0))[0]
+    interface = LocalSchedulerInterface(cpus=[cpu])
+    script = write_script(tmpdir, 'job1', 0)
+    tmpdir.join('job1').write(tmpdir.join('job1').read().replace('sleep 0.3', 'sleep 1'))
+    job_id = interface.submit(script, cwd=str(tmpdir))
+    runner_pid = interface._read_job(job_id)['pid']
+    assert runner_pid is not None
+    _wait_state(interface, job_id, 'RUNNING')
+
+    # the job script still runs and holds its CPU once its runner is killed
+    os.kill(runner_pid, signal.SIGKILL)
+    os.waitpid(runner_pid, 0)
+    other_id = interface.submit(write_script(tmpdir, 'job2', 0), cwd=str(tmpdir))
+    time.sleep(0.3)
+    assert interface.get_jobs_state([job_id, other_id]) == {job_id: 'RUNNING',
+                                                            other_id: 'PENDING'}
+    _wait_state(interface, job_id, 'NODE_FAIL')
+    _wait_state(interface, other_id, 'COMPLETED')
+
+    # a runner dying before the job starts is detected
+    pending_id = interface.submit(write_script(tmpdir, 'job3', 0), cwd=str(tmpdir))
+    runner_pid = interface._read_job(pending_id)['pid']
+    os.kill(runner_pid, signal.SIGKILL)
+    os.waitpid(runner_pid, 0)
+    assert interface.get_jobs_state([pending_id]) == {pending_id: 'NODE_FAIL'}
+
+
+def test_local_submit_command(tmpdir, spool_dir, capsys, monkeypatch):
+    monkeypatch.chdir(str(tmpdir))
+    assert main(['-c', '1', write_script(tmpdir, 'job', 0)]) == 0
+    # output is read as sbatch one by JubeRun.extract_job_ids
+    assert re.match(r'^\w+\s\w+\s\w+\s(\d+)$', capsys.readouterr().out.strip())
+
+
+def test_local_submit_too_many_cpus(tmpdir, spool_dir, capsys):
+    cpu = sorted(os.sched_getaffinity(0))[0]
+    interface = LocalSchedulerInterface(cpus=[cpu])
+    job_id = interface.submit(write_script(tmpdir, 'job', 0), cwd=str(tmpdir), cpus=4)
+    assert '!!Warning: job asks for 4 CPUs, only 1 CPUs' in capsys.readouterr().err
+    assert interface._read_job(job_id)['ncpus'] == 1
+    tracker = JobTracker(interface, min_interval=0.1, max_interval=0.5)
+    tracker.track([job_id])
+    tracker.wait()
+    assert tracker.states() == {job_id: 'COMPLETED'}
+
+
+def test_platform_scheduler(spool_dir, monkeypatch):
+    platform_dir = os.path.join(ROOT_DIR, 'platform')
+    # L470 execute set is initialized with bash.xml
+    assert platform_scheduler('l470', platform_dir) == 'local'
+    assert platform_scheduler('unknown', platform_dir) == ubench.config.SCHEDULER
+
+    monkeypatch.setenv('UBENCH_PLATFORM_DIR', platform_dir)
+    assert isinstance(get_scheduler_interface('Zbook15'), LocalSchedulerInterface)
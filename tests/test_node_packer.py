@@ -0,0 +1,151 @@
+##############################################################################
+#  This file is part of the UncleBench benchmarking tool.                    #
+#        Copyright (C) 2019 EDF SA                                           #
+#                                                                            #
+#  UncleBench is free software: you can redistribute it and/or modify        #
+#  it under the terms of the GNU General Public License as published by      #
+#  the Free Software Foundation, either version 3 of the License, or         #
+#  (at your option) any later version.                                       #
+#                                                                            #
+#  UncleBench is distributed in the hope that it will be useful,             #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the              #
+#  GNU General Public License for more details.                              #
+#                                                                            #
+#  You should have received a copy of the GNU General Public License         #
+#  along with UncleBench. If not, see <http://www.gnu.org/licenses/>.        #
+#                                                                            #
+##############################################################################
+""" Tests of node packing of campaign jobs """
+
+# pylint: disable=missing-docstring,redefined-outer-name
+import os
+import time
+import pytest
+from ubench.scheduler_interfaces.job_tracker import JobTracker
+from ubench.scheduler_interfaces.node_packer import (NodePacker, pack_jobs, parse_timelimit,
+                                                     size_allocation, main)
+
+JOB_SCRIPT = """
+echo "$SLURM_JOB_ID $SLURM_NNODES $SLURM_EXCLUSIVE" > env_$1
+date +%s.%N > start_$1
+sleep 0.5
+date +%s.%N > end_$1
+"""
+
+
+class FakeSlurm(object):
+
+    def __init__(self):
+        self.states = {}
+
+    def get_jobs_state(self, job_ids):
+        return {job_id: self.states[job_id] for job_id in job_ids if job_id in self.states}
+
+
+@pytest.fixture
+def fake_slurm(tmpdir, monkeypatch):
+    """ salloc and scancel commands logging their arguments """
+    bin_dir = tmpdir.mkdir('bin')
+    for cmd, output in [('salloc', 'echo "salloc: Granted job allocation 42"'),
+                        ('scancel', '')]:
+        script = bin_dir.join(cmd)
+        script.write('#!/bin/bash\necho "$@" >> {}\n{}\n'.format(tmpdir.join(cmd + '.log'),
+                                                                 output))
+        script.chmod(0o755)
+    monkeypatch.setenv('PATH', os.pathsep.join([str(bin_dir), os.environ['PATH']]))
+    return FakeSlurm()
+
+
+@pytest.mark.parametrize('value,seconds', [
+    ('30', 1800),
+    ('05:30', 330),
+    ('01:00:00', 3600),
+    ('1-02', 93600),
+    ('1-00:30:10', 88210),
+    ('', 3600),
+    ('$timelimit', 3600),
+])
+def test_parse_timelimit(value, seconds):
+    assert parse_timelimit(value) == seconds
+
+
+def test_pack_jobs():
+    jobs = [('a', 2, 100), ('b', 1, 100), ('c', 1, 100), ('d', 1, 50)]
+    assert pack_jobs(jobs, 2) == ([('a', 0), ('b', 100), ('c', 100), ('d', 200)], 250)
+    assert pack_jobs(jobs, 1) is None
+
+    # every job runs at once on 5 nodes
+    _, makespan = pack_jobs(jobs, 5)
+    assert makespan == 100
+
+
+def test_size_allocation():
+    jobs = [('a', 2, 100), ('b', 1, 100), ('c', 1, 100)]
+    # same node time, the fastest allocation is chosen
+    assert size_allocation(jobs) == (4, 100)
+    assert size_allocation(jobs, max_nodes=3) == (2, 200)
+    assert size_allocation([('a', 1, 100), ('b', 1, 100)]) == (2, 100)
+    assert size_allocation([('a', 3, 100)], max_nodes=1) == (3, 100)
+
+
+def test_node_packer(tmpdir, fake_slurm, monkeypatch):
+    monkeypatch.chdir(tmpdir)
+    packer = NodePacker(str(tmpdir.join('spool')), max_nodes=2, scheduler_interface=fake_slurm)
+    for name in ['job1', 'job2', 'job3']:
+        tmpdir.join(name).write(JOB_SCRIPT.replace('$1', name))
+    job_ids = [packer.submit('job1', str(tmpdir), nnodes=2, timelimit='10'),
+               packer.submit('job2', str(tmpdir), nnodes=1, timelimit='10'),
+               packer.submit('job3', str(tmpdir), nnodes=1, timelimit='10')]
+    assert packer.get_jobs_state(job_ids) == {'1': 'PENDING', '2': 'PENDING', '3': 'PENDING'}
+
+    assert packer.allocate()
+    assert not packer.allocate()
+    assert packer.dispatch() == []
+    fake_slurm.states['42'] = 'RUNNING'
+
+    tracker = JobTracker(packer, min_interval=0.1, max_interval=0.2)
+    tracker.track(job_ids)
+    tracker.wait(progress=lambda tracker: packer.dispatch())
+    assert tracker.states() == {'1': 'COMPLETED', '2': 'COMPLETED', '3': 'COMPLETED'}
+    assert tmpdir.join('salloc.log').read().split() == ['--no-shell', '--nodes=2',
+                                                        '--time=22', '--job-name=ubench-pack']
+    assert tmpdir.join('env_job1').read().split() == ['42', '2', '1']
+    assert tmpdir.join('env_job2').read().split() == ['42', '1', '1']
+
+    # the 2 nodes job ran alone, 1 node jobs ran together
+    times = {name: (float(tmpdir.join('start_' + name).read()),
+                    float(tmpdir.join('end_' + name).read()))
+             for name in ['job1', 'job2', 'job3']}
+    assert times['job1'][1] <= min(times['job2'][0], times['job3'][0])
+    assert times['job2'][0] < times['job3'][1] and times['job3'][0] < times['job2'][1]
+
+    packer.release()
+    assert tmpdir.join('scancel.log').read().split() == ['42']
+
+
+def test_node_packer_allocation_end(tmpdir, fake_slurm):
+    packer = NodePacker(str(tmpdir.join('spool')), max_nodes=1, scheduler_interface=fake_slurm)
+    tmpdir.join('job').write('sleep 30\n')
+    job_ids = [packer.submit('job', str(tmpdir), nnodes=1, timelimit='1') for _ in range(2)]
+    packer.allocate()
+    fake_slurm.states['42'] = 'RUNNING'
+    while packer.allocation_id is None:
+        time.sleep(0.1)
+        packer.dispatch()
+    assert packer.get_jobs_state(job_ids) == {'1': 'RUNNING', '2': 'PENDING'}
+
+    fake_slurm.states['42'] = 'TIMEOUT'
+    assert packer.dispatch() == []
+    assert packer.get_jobs_state(job_ids) == {'1': 'CANCELLED', '2': 'CANCELLED'}
+
+
+def test_pack_submit(tmpdir, capsys):
+    spool = str(tmpdir.join('spool'))
+    assert main(['--spool-dir', spool, '-N', '4', '--time=02:00:00', '-J', 'hpl',
+                 str(tmpdir.join('job'))]) == 0
+    assert capsys.readouterr().out == 'Submitted batch job 1\n'
+    job = NodePacker(spool, scheduler_interface=FakeSlurm())._read_job('1')
+    assert (job['name'], job['nnodes'], job['timelimit']) == ('hpl', 4, 7200)
+    assert 'ubench-pack-submit --spool-dir {} '.format(spool) in \
+        NodePacker(spool, scheduler_interface=FakeSlurm()).submit_command()
@@ -0,0 +1,107 @@
+""" Report tests """
+
+# pylint: disable=missing-docstring
+import os
+import shutil
+from ubench.data_management.report import Report
+from ubench.data_management import yaml_io
+from ubench.data_management.data_store_yaml import DataStoreYAML
+import ubench.config
+
+METADATA = """
+author: 'Pepito'
+title: 'Report'
+version: '1'
+introduction: ''
+conclusion: ''
+sessions:
+    - default:
+        platform: 'l470'
+        tester: 'Pepito'
+        date_start: '2020-01-01 00:00:00'
+        date_end: '2021-01-01 00:00:00'
+    - 'before':
+        dir: '{0}/before'
+    - 'after':
+        dir: '{0}/after'
+contexts:
+    - default:
+        row_headers:
+            - 'host_p'
+        column_headers: 'mpi_version'
+        compare_array: True
+        compare_graph: False
+benchmarks:
+    - default:
+        result: 'ok'
+        comment: ''
+    - 'simple':
+        'before':
+        'after':
+    - 'other':
+        'before':
+        'after':
+"""
+
+
+def _write_sessions(tmpdir, data_dir):
+    """ Write two sessions with results of two benchmarks and report metadata """
+    for session in ['before', 'after']:
+        shutil.copy(data_dir.bench_results, str(tmpdir.mkdir(session).mkdir('simple')))
+        with open(data_dir.bench_results, 'r') as results:
+            tmpdir.join(session).mkdir('other').join('bench_results.yaml').write(
+                results.read().replace('Benchmark_name: simple', 'Benchmark_name: other'))
+        DataStoreYAML().get_index(str(tmpdir.join(session))).close()
+    tmpdir.join('metadata.yaml').write(METADATA.format(str(tmpdir)))
+
+
+def _report(tmpdir, data_dir, workers=1):
+    templates = os.path.join(os.path.dirname(data_dir.root), '..', 'templates')
+    return Report(str(tmpdir.join('metadata.yaml')),
+                  os.path.join(templates, 'bench.html'),
+                  os.path.join(templates, 'compare.html'),
+                  os.path.join(templates, 'report.html'),
+                  workers)
+
+
+def test_report_loads_files_once(tmpdir, data_dir, mocker, monkeypatch):
+    """ Each result file is parsed once whatever the number of benchmarks and sessions """
+    monkeypatch.setattr(ubench.config, 'RESULTS_CACHE_MAX_SIZE', 0)
+    _write_sessions(tmpdir, data_dir)
+    report = _report(tmpdir, data_dir)
+    yaml_load = mocker.spy(yaml_io, 'load')
+    report.write(str(tmpdir.join('report')), 'report')
+
+    assert yaml_load.call_count == 4
+    for benchmark in ['simple', 'other']:
+        comparison = tmpdir.join('report', benchmark + '_comparison.asc').read()
+        assert 'after vs before(%)' in comparison
+
+
+def test_report_parallel_sections(tmpdir, data_dir):
+    """ Sections written by worker processes give the same report files """
+    _write_sessions(tmpdir, data_dir)
+    _report(tmpdir, data_dir).write(str(tmpdir.join('serial')), 'report')
+    _report(tmpdir, data_dir, 2).write(str(tmpdir.join('parallel')), 'report')
+
+    serial_files = sorted(os.listdir(str(tmpdir.join('serial'))))
+    assert serial_files == sorted(os.listdir(str(tmpdir.join('parallel'))))
+    for fname in serial_files:
+        assert tmpdir.join('serial', fname).read() == tmpdir.join('parallel', fname).read()
+
+
+def test_report_prefetch_benchmark_dir(tmpdir, data_dir):
+    """ Session directories set in benchmark sections are loaded before workers are started """
+    _write_sessions(tmpdir, data_dir)
+    shutil.copytree(str(tmpdir.join('after')), str(tmpdir.join('after_other')))
+    tmpdir.join('metadata.yaml').write(
+        tmpdir.join('metadata.yaml').read().replace(
+            "    - 'other':\n        'before':\n        'after':\n",
+            "    - 'other':\n        'before':\n        'after':\n"
+            "            dir: '{}/after_other'\n".format(str(tmpdir))))
+    report = _report(tmpdir, data_dir, 2)
+
+    report.write(str(tmpdir.join('report')), 'report')
+    # Runs loaded by worker processes are not kept by the report
+    assert sorted(report.session_runs) == [str(tmpdir.join(session))
+                                           for session in ['after', 'after_other', 'before']]
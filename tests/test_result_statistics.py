@@ -0,0 +1,118 @@
+""" Result statistics tests """
+
+# pylint: disable=missing-docstring
+import itertools
+import math
+import numpy
+import pandas
+from ubench.data_management import result_statistics
+
+
+def _mann_whitney_reference(ref, post):
+    """ Mann-Whitney U test computed with explicit loops """
+    values = sorted(ref + post)
+    ranks = {value: numpy.mean([i + 1 for i, val in enumerate(values) if val == value])
+             for value in values}
+    n_ref, n_post, total = len(ref), len(post), len(values)
+    u_stat = sum(ranks[value] for value in post) - n_post * (n_post + 1) / 2.
+    ties = sum(values.count(value) ** 3 - values.count(value) for value in set(values))
+    sigma = math.sqrt(n_ref * n_post / 12. * ((total + 1) - ties / float(total * (total - 1))))
+    if sigma == 0:
+        return u_stat, 1.0
+    if not ties and max(n_ref, n_post) <= result_statistics.EXACT_MAX_SAMPLES:
+        # Enumerate every assignment of ranks to the compared samples
+        bound = min(u_stat, n_ref * n_post - u_stat)
+        u_values = [sum(ranks) - n_post * (n_post + 1) / 2.
+                    for ranks in itertools.combinations(range(1, total + 1), n_post)]
+        return u_stat, min(1.0, 2. * sum(u <= bound for u in u_values) / len(u_values))
+    z_val = max(abs(u_stat - n_ref * n_post / 2.) - 0.5, 0) / sigma
+    return u_stat, math.erfc(z_val / math.sqrt(2))
+
+
+def _repetitions(shift, contexts=12, repetitions=8, seed=0):
+    """ Return a result dataframe with noisy repetitions of each context """
+    rng = numpy.random.RandomState(seed)
+    rows = []
+    for ctx in range(contexts):
+        for _ in range(repetitions):
+            value = 100 + ctx + rng.normal(0, 1) + (shift if ctx % 3 == 0 else 0)
+            rows.append({'nodes': str(ctx % 4 + 1), 'size': str(ctx), 'result': str(value)})
+    return pandas.DataFrame(rows)
+
+
+def test_student_quantile():
+    quantiles = result_statistics.student_quantile(0.975, [0, 1, 2, 4, 9, 30])
+    assert numpy.isnan(quantiles[0])
+    numpy.testing.assert_allclose(quantiles[1:], [12.706, 4.303, 2.776, 2.262, 2.042], rtol=5e-3)
+
+
+def test_mann_whitney_vectorized():
+    """ Grouped test gives the same result than a per context computation """
+    ref = _repetitions(0, seed=1)
+    post = _repetitions(5, seed=2)
+    post.loc[post['size'] == '1', 'result'] = ref.loc[ref['size'] == '1', 'result'].values
+    context = ['nodes', 'size']
+    tested = result_statistics.mann_whitney(result_statistics.samples(ref, context),
+                                            result_statistics.samples(post, context), context)
+
+    assert len(tested) == 12
+    for _, row in tested.iterrows():
+        ref_values = [float(val) for val in ref[ref['size'] == row['size']]['result']]
+        post_values = [float(val) for val in post[post['size'] == row['size']]['result']]
+        u_stat, p_value = _mann_whitney_reference(ref_values, post_values)
+        assert row['u'] == u_stat
+        assert abs(row['p_value'] - p_value) < 1e-12
+
+
+def test_mann_whitney_small_samples():
+    """ Exact distribution is used for few repetitions without ties """
+    ref = pandas.DataFrame({'nodes': ['1'] * 4, 'result': ['1.0', '2.0', '3.0', '4.0']})
+    post = pandas.DataFrame({'nodes': ['1'] * 4, 'result': ['5.0', '6.0', '7.0', '8.0']})
+    tested = result_statistics.mann_whitney(result_statistics.samples(ref[:3], ['nodes']),
+                                            result_statistics.samples(post[:3], ['nodes']),
+                                            ['nodes'])
+    assert tested['u'][0] == 9
+    assert abs(tested['p_value'][0] - 0.1) < 1e-12
+    assert abs(tested['p_min'][0] - 0.1) < 1e-12
+
+    tested = result_statistics.mann_whitney(result_statistics.samples(ref, ['nodes']),
+                                            result_statistics.samples(post, ['nodes']),
+                                            ['nodes'])
+    assert abs(tested['p_value'][0] - 2 / 70.) < 1e-12
+
+
+def test_compare_sessions_unreachable_alpha(capsys):
+    """ Too few repetitions to reach alpha are reported """
+    ref = pandas.DataFrame({'nodes': ['1'] * 3, 'result': ['1.0', '2.0', '3.0']})
+    post = pandas.DataFrame({'nodes': ['1'] * 3, 'result': ['5.0', '6.0', '7.0']})
+    compared = result_statistics.compare_sessions([ref, post], ['nodes'])
+    assert not compared['significant_1'][0]
+    assert '!!Warning: 1 of 1 contexts of session 1' in capsys.readouterr().out
+
+    compared = result_statistics.compare_sessions([ref, post], ['nodes'], alpha=0.2)
+    assert compared['significant_1'][0]
+    assert 'Warning' not in capsys.readouterr().out
+
+
+def test_compare_sessions():
+    context = ['nodes', 'size']
+    compared = result_statistics.compare_sessions([_repetitions(0, seed=1),
+                                                   _repetitions(5, seed=2)], context)
+
+    assert len(compared) == 12
+    assert (compared['count_0'] == 8).all()
+    assert (compared['ci_low_0'] < compared['mean_0']).all()
+    assert (compared['mean_0'] < compared['ci_high_0']).all()
+    shifted = compared['size'].astype(int) % 3 == 0
+    assert compared['significant_1'][shifted].all()
+    assert not compared['significant_1'][~shifted].any()
+
+
+def test_list_valued_samples():
+    """ List valued results give one sample per value """
+    panda = pandas.DataFrame({'nodes': ['1', '2'], 'result': [['1.0', '2.0', 'x'], '3.5']})
+    samples = result_statistics.samples(panda, ['nodes'])
+    assert samples['value'].tolist() == [1.0, 2.0, 3.5]
+    stats = result_statistics.describe(samples, ['nodes'])
+    assert stats['median'].tolist() == [1.5, 3.5]
+    assert numpy.isnan(stats['ci_low'][1])
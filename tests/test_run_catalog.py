@@ -0,0 +1,177 @@
+##############################################################################
+#  This file is part of the UncleBench benchmarking tool.                    #
+#        Copyright (C) 2019 EDF SA                                           #
+#                                                                            #
+#  UncleBench is free software: you can redistribute it and/or modify        #
+#  it under the terms of the GNU General Public License as published by      #
+#  the Free Software Foundation, either version 3 of the License, or         #
+#  (at your option) any later version.                                       #
+#                                                                            #
+#  UncleBench is distributed in the hope that it will be useful,             #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the              #
+#  GNU General Public License for more details.                              #
+#                                                                            #
+#  You should have received a copy of the GNU General Public License         #
+#  along with UncleBench. If not, see <http://www.gnu.org/licenses/>.        #
+#                                                                            #
+##############################################################################
+""" Tests of the run catalog """
+
+# pylint: disable=missing-docstring,redefined-outer-name
+import datetime
+import pytest
+import fake_data
+import ubench.benchmark_managers.jube_benchmark_manager as jbm
+from ubench.data_management.run_catalog import RunCatalog
+
+UBENCH_LOG = """Benchmark_name  : bench
+Platform        : platform
+ID              : {0}
+Date            : Tue May 15 17:15:08 2018
+Run_directory   : /somewhere/{0:06d}
+cmdline         : ubench run -b bench -p platform
+"""
+
+
+@pytest.fixture
+def catalog(tmpdir):
+    catalog = RunCatalog(str(tmpdir.join('ubench_runs.jsonl')))
+    for run_id, day in [(0, 1), (1, 2), (2, 3)]:
+        catalog.add({'id': run_id, 'date': '2020-01-0{}T12:00:00'.format(day),
+                     'status': 'SUBMITTED', 'result_path': str(run_id)})
+    return catalog
+
+
+def test_catalog(catalog):
+    assert catalog.exists()
+    catalog.update(1, {'status': 'COMPLETED'})
+    catalog.update('2', {'status': 'FAILED'})
+    assert catalog.get(1)['status'] == 'COMPLETED'
+    assert catalog.get(1)['result_path'] == '1'
+    assert catalog.get(5) is None
+    assert catalog.last()['id'] == 2
+
+    assert [run['id'] for run in catalog.runs()] == [0, 1, 2]
+    assert [run['id'] for run in catalog.runs(since=datetime.datetime(2020, 1, 2))] == [1, 2]
+    assert [run['id'] for run in catalog.runs(status='completed')] == [1]
+    assert [run['id'] for run in catalog.runs(offset=1, limit=1)] == [1]
+
+    # another process appends a run
+    RunCatalog(catalog.catalog_file).add({'id': 3, 'status': 'SUBMITTED'})
+    assert catalog.last()['id'] == 3
+
+
+def test_catalog_bad_lines(catalog):
+    with open(catalog.catalog_file, 'a') as cfile:
+        cfile.write('{"id": 4, "stat\n[]\n')
+    assert [run['id'] for run in RunCatalog(catalog.catalog_file).runs()] == [0, 1, 2]
+
+
+def test_import_logs(tmpdir):
+    runs_dir = tmpdir.mkdir('benchmark_runs')
+    for run_id in [0, 3]:
+        runs_dir.mkdir('{:06d}'.format(run_id)).join('ubench.log').write(UBENCH_LOG.format(run_id))
+    runs_dir.mkdir('000004')
+    catalog = RunCatalog(str(tmpdir.join('ubench_runs.jsonl')))
+    catalog.add({'id': 3, 'status': 'COMPLETED'})
+
+    assert catalog.import_logs(str(runs_dir)) == 1
+    assert catalog.import_logs(str(runs_dir)) == 0
+    run = catalog.get(0)
+    assert run['date'] == '2018-05-15T17:15:08'
+    assert run['result_path'] == str(runs_dir.join('000000'))
+    assert run['cmdline'] == 'ubench run -b bench -p platform'
+    assert run['status'] == 'UNKNOWN'
+    assert catalog.get(3)['status'] == 'COMPLETED'
+
+
+def test_list_runs(mocker, catalog, capsys):
+    mocker.patch('ubench.benchmarking_tools_interfaces.jube_xml_parser.JubeXMLParser',
+                 side_effect=lambda *args: fake_data.FakeXML())
+    mocker.patch('ubench.benchmark_managers.standard_benchmark_manager.'
+                 'StandardBenchmarkManager._init_run_dir')
+    bench_m = jbm.JubeBenchmarkManager('bench', 'platform')
+    bench_m.run_catalog = catalog
+    mocker.patch.object(bench_m.benchmarking_api, 'get_run_job_ids', return_value=[])
+    listdir = mocker.patch('os.listdir')
+
+    bench_m.list_runs(status='SUBMITTED', limit=2)
+    output = capsys.readouterr().out.splitlines()
+    assert output[-4].split()[:4] == ['ID', '|', 'Date', '|']
+    assert [line.split()[0] for line in output[-2:]] == ['0', '1']
+    listdir.assert_not_called()
+
+    bench_m.list_runs(status='FAILED')
+    assert 'no benchmark run found' in capsys.readouterr().out
+
+
+def test_list_runs_status(mocker, catalog, capsys):
+    mocker.patch('ubench.benchmarking_tools_interfaces.jube_xml_parser.JubeXMLParser',
+                 side_effect=lambda *args: fake_data.FakeXML())
+    mocker.patch('ubench.benchmark_managers.standard_benchmark_manager.'
+                 'StandardBenchmarkManager._init_run_dir')
+    bench_m = jbm.JubeBenchmarkManager('bench', 'platform')
+    bench_m.run_catalog = catalog
+    catalog.update(2, {'status': 'UNKNOWN'})
+    catalog.add({'id': 3, 'status': 'COMPLETED'})
+    run_job_ids = {0: ['10', '11'], 1: ['12'], 2: ['13', '14'], 3: ['15']}
+    get_run_job_ids = mocker.patch.object(bench_m.benchmarking_api, 'get_run_job_ids',
+                                          side_effect=lambda run_id: run_job_ids[run_id])
+    scheduler = mocker.patch('ubench.benchmark_managers.standard_benchmark_manager.'
+                             'get_scheduler_interface').return_value
+    scheduler.get_jobs_state.return_value = {'10': 'COMPLETED', '11': 'COMPLETED',
+                                             '12': 'RUNNING', '13': 'COMPLETED',
+                                             '14': 'TIMEOUT'}
+
+    bench_m.list_runs(status='COMPLETED')
+    assert [line.split()[0] for line in capsys.readouterr().out.splitlines()[-2:]] == ['0', '3']
+    assert [run['status'] for run in catalog.runs()] == ['COMPLETED', 'RUNNING', 'FAILED',
+                                                         'COMPLETED']
+    # finished runs are not read again
+    assert sorted(call[0][0] for call in get_run_job_ids.call_args_list) == [0, 1, 2]
+    get_run_job_ids.reset_mock()
+    bench_m.list_runs()
+    assert [call[0][0] for call in get_run_job_ids.call_args_list] == [1]
+
+    # status of a run is refreshed when its results are extracted
+    scheduler.get_jobs_state.return_value = {'12': 'COMPLETED'}
+    mocker.patch.object(bench_m.benchmarking_api, 'result', return_value=[])
+    bench_m.benchmarking_api.results_file = '/somewhere/000001/bench_results.yaml'
+    bench_m.result(1)
+    assert catalog.get(1)['status'] == 'COMPLETED'
+
+
+def test_list_runs_unresolvable(mocker, catalog, capsys):
+    mocker.patch('ubench.benchmarking_tools_interfaces.jube_xml_parser.JubeXMLParser',
+                 side_effect=lambda *args: fake_data.FakeXML())
+    mocker.patch('ubench.benchmark_managers.standard_benchmark_manager.'
+                 'StandardBenchmarkManager._init_run_dir')
+    bench_m = jbm.JubeBenchmarkManager('bench', 'platform')
+    bench_m.run_catalog = catalog
+    catalog.add({'id': 3, 'date': '2020-01-04T12:00:00', 'status': 'SUBMITTED'})
+
+    def run_job_ids(run_id):
+        if run_id == 0:
+            raise OSError('run directory removed')
+        return {1: ['10'], 2: [], 3: ['11']}[run_id]
+
+    get_run_job_ids = mocker.patch.object(bench_m.benchmarking_api, 'get_run_job_ids',
+                                          side_effect=run_job_ids)
+    scheduler = mocker.patch('ubench.benchmark_managers.standard_benchmark_manager.'
+                             'get_scheduler_interface').return_value
+    # jobs of run 1 were purged by the scheduler
+    scheduler.get_jobs_state.return_value = {'11': 'RUNNING'}
+
+    # only runs of the listed window are refreshed
+    bench_m.list_runs(offset=1, limit=2)
+    assert sorted(call[0][0] for call in get_run_job_ids.call_args_list) == [1, 2]
+    bench_m.list_runs()
+    assert [run['status'] for run in catalog.runs()] == ['UNKNOWN', 'UNKNOWN', 'SUBMITTED',
+                                                         'RUNNING']
+
+    # unresolvable runs and runs checked recently are not read again
+    get_run_job_ids.reset_mock()
+    bench_m.list_runs()
+    assert [call[0][0] for call in get_run_job_ids.call_args_list] == [3]
+    capsys.readouterr()
@@ -0,0 +1,146 @@
+##############################################################################
+#  This file is part of the UncleBench benchmarking tool.                    #
+#        Copyright (C) 2019 EDF SA                                           #
+#                                                                            #
+#  UncleBench is free software: you can redistribute it and/or modify        #
+#  it under the terms of the GNU General Public License as published by      #
+#  the Free Software Foundation, either version 3 of the License, or         #
+#  (at your option) any later version.                                       #
+#                                                                            #
+#  UncleBench is distributed in the hope that it will be useful,             #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the              #
+#  GNU General Public License for more details.                              #
+#                                                                            #
+#  You should have received a copy of the GNU General Public License         #
+#  along with UncleBench. If not, see <http://www.gnu.org/licenses/>.        #
+#                                                                            #
+##############################################################################
+""" Tests of Slurm JSON and slurmrestd backends """
+
+# pylint: disable=missing-docstring,redefined-outer-name
+import datetime
+import http.server
+import json
+import os
+import threading
+import pytest
+from six.moves import urllib
+import fake_data
+import ubench.scheduler_interfaces.slurm_interface as slurm_i
+from ubench.scheduler_interfaces.slurm_backends import (SlurmJsonBackend, SlurmRestBackend,
+                                                        parse_sacct_json, parse_squeue_json,
+                                                        slurm_backend)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'slurm')
+
+FAKE_COMMAND = """#!/bin/sh
+echo "$@" >> {log}
+cat {output}
+"""
+
+
+def load(name):
+    with open(os.path.join(DATA_DIR, name)) as jfile:
+        return json.load(jfile)
+
+
+def fake_commands(tmpdir, monkeypatch, **outputs):
+    """ Put fake Slurm commands printing JSON files on PATH """
+    for command, output in outputs.items():
+        script = tmpdir.join(command)
+        script.write(FAKE_COMMAND.format(log=str(tmpdir.join(command + '.log')),
+                                         output=os.path.join(DATA_DIR, output)))
+        script.chmod(0o755)
+    monkeypatch.setenv('PATH', '{}:{}'.format(str(tmpdir), os.environ['PATH']))
+
+
+class SlurmRestHandler(http.server.BaseHTTPRequestHandler):
+    """ Mock slurmrestd serving sacct.json """
+
+    requests = []
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        url = urllib.parse.urlparse(self.path)
+        SlurmRestHandler.requests.append((url.path, urllib.parse.parse_qs(url.query),
+                                          self.headers.get('X-SLURM-USER-TOKEN')))
+        data = load('sacct.json')
+        wanted = urllib.parse.parse_qs(url.query)['step'][0].split(',')
+        data['jobs'] = [job for job in data['jobs'] if str(job['job_id']) in wanted]
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+@pytest.fixture
+def slurmrestd():
+    """ Run a mock slurmrestd, return its URL """
+    SlurmRestHandler.requests = []
+    server = http.server.HTTPServer(('127.0.0.1', 0), SlurmRestHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield 'http://127.0.0.1:{}'.format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+
+def test_parse_json():
+    assert parse_squeue_json(load('squeue.json')) == {'175757': 'RUNNING', '175758': 'PENDING'}
+
+    states, infos = parse_sacct_json(load('sacct.json'))
+    # state of the first step is used when there is one
+    assert states == {'26382': 'FAILED', '26938': 'TIMEOUT', '175757': 'RUNNING'}
+    assert [info['job_name'] for info in infos['26382']] == ['imb', 'IMB-MPI1']
+    assert infos['26382'][-1]['job_elasped'] == '1-01:01:02'
+    assert infos['26382'][-1]['job_nodelist'] == ['cn10', 'cn11']
+    assert infos['26382'][0]['job_elasped'] == '00:01:35'
+    assert infos['26382'][0]['job_submit_time'] == \
+        datetime.datetime.fromtimestamp(1586178000).strftime('%Y-%m-%dT%H:%M:%S')
+    assert [info['job_name'] for info in infos['26938']] == ['stream']
+
+
+def test_json_backend(tmpdir, monkeypatch):
+    fake_commands(tmpdir, monkeypatch, squeue='squeue.json', sacct='sacct.json')
+    backend = SlurmJsonBackend()
+
+    assert backend.get_jobs_state(['175757', '26382', '26938']) == \
+        {'175757': 'RUNNING', '26382': 'FAILED', '26938': 'TIMEOUT'}
+    # sacct is only run for jobs unknown to squeue
+    assert tmpdir.join('sacct.log').read().strip() == '--json --jobs=26382,26938'
+
+    interface = slurm_i.SlurmInterface('json')
+    assert interface.get_job_info(26938) == parse_sacct_json(load('sacct.json'))[1]['26938']
+
+
+def test_rest_backend(slurmrestd):
+    backend = SlurmRestBackend(slurmrestd, token='secret', max_length=12)
+    assert backend.get_jobs_state(['26382', '26938', '175757']) == \
+        {'175757': 'RUNNING', '26382': 'FAILED', '26938': 'TIMEOUT'}
+    # one request per chunk of job ids
+    assert [(path, query['step'], token) for path, query, token in SlurmRestHandler.requests] == \
+        [('/slurmdb/v0.0.40/jobs', ['26382,26938'], 'secret'),
+         ('/slurmdb/v0.0.40/jobs', ['175757'], 'secret')]
+    assert [info['job_name'] for info in backend.get_jobs_info(['26382'])['26382']] == \
+        ['imb', 'IMB-MPI1']
+
+
+def mockpopen(args, **kwargs):  # pylint: disable=unused-argument
+    return fake_data.MockPopen('squeue' if 'squeue' in args else 'sacct')
+
+
+def test_backend_fallback(mocker):
+    mock_popen = mocker.patch("ubench.scheduler_interfaces.slurm_interface.Popen",
+                              side_effect=mockpopen)
+    # nothing listens on this port, squeue and sacct text output are used instead
+    interface = slurm_i.SlurmInterface(SlurmRestBackend('http://127.0.0.1:1', timeout=1))
+    assert interface.get_jobs_state(['111', '222'])['175757'] == 'RUNNING'
+    assert mock_popen.called
+    assert interface.backend is None
+    assert slurm_backend('cli') is None
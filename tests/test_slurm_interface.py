@@ -22,8 +22,6 @@
 from subprocess import Popen
 import os
 import time
-import json
-import hashlib
 import ubench.scheduler_interfaces.slurm_interface as slurm_i
 from ubench.scheduler_interfaces.slurm_interface import wlist_to_scheduler_wlist
 import ubench.config
@@ -32,10 +30,6 @@ import fake_data
 MOCK_UTILS = ["ubench",
               "utils"]
 
-def delete_cache_file():
-    cache_file = '/tmp/ubench_cache-{}'.format(ubench.config.USER)
-    os.remove(cache_file)
-
 def mockpopen(args, shell, cwd, env=None, stdout=None, stderr=None, universal_newlines=False):
     """Mock Popen"""
     if 'sinfo' in args:
@@ -81,36 +75,85 @@ def test_job_status(mocker):
     # assert interface.get_jobs_state(['111', '222']) == {'175757' : 'RUNNING'}
     # time.sleep(10)
 
-def test_job_status_cache(pytestconfig, mocker):
-    """ we test memoize_disk decorator"""
+def test_job_status_cache(mocker, job_state_cache_file):
+    """ we test job state cache of get_jobs_state"""
 
     mock_popen = mocker.patch("ubench.scheduler_interfaces.slurm_interface.Popen",
                               side_effect=mockpopen)
 
-    # cache files have a postfix based on the arguments used in the method's call
-    md5_id = hashlib.md5(''.join(['222']).encode('utf-8')).hexdigest()
-    cache_file = '/tmp/ubench_cache-{}-{}'.format(ubench.config.USER, md5_id)
-    # the cache file exist if the test has failed before so we clean
-    if os.path.isfile(cache_file):
-        os.remove(cache_file)
-
-    # we create a fake cache file:
+    # we fill the shared cache file as another ubench process would
     expected_results = {"175757": "RUNNING", "26382": "COMPLETED", "26938": "COMPLETED"}
-    cache_contets = {'date': time.time(), 'data': expected_results}
-    json.dump(cache_contets, open(cache_file, 'w'))
+    slurm_i.JobStateCache(job_state_cache_file,
+                          cluster=slurm_i.slurm_cluster_name()).put(expected_results)
 
     interface = slurm_i.SlurmInterface()
 
     # we used cached values no slurm command is executed
-    jobs_info = interface.get_jobs_state(['222'])
+    jobs_info = interface.get_jobs_state(['175757', '26382'])
 
     assert not mock_popen.called
-    assert jobs_info == expected_results
-
-    # we invalidate cache
-    cache = {'date': time.time()-1000}
-    json.dump(cache, open(cache_file, 'w'))
-    jobs_info = interface.get_jobs_state(['111', '222'])
-    # slurm command has been executed
+    assert jobs_info == {"175757": "RUNNING", "26382": "COMPLETED"}
+    # cache is shared by every interface
+    assert slurm_i.SlurmInterface().job_state_cache() is interface.job_state_cache()
+
+    # running state expires, completed one does not
+    mocker.patch("ubench.scheduler_interfaces.job_state_cache.time.time",
+                 return_value=time.time() + 1000)
+    jobs_info = interface.get_jobs_state(['175757', '26382'])
+    # slurm command has been executed for the expired job only
     assert mock_popen.called
-    
\ No newline at end of file
+    assert '-j 175757 ' in mock_popen.call_args_list[0][0][0]
+    assert jobs_info['26382'] == 'COMPLETED'
+    assert interface.job_state_cache().stats()['hits'] == 3
+
+
+FAKE_SACCT = r"""#!/bin/sh
+# Fake sacct: prints a job, its batch step and its first step for each job of --jobs
+echo "$@" >> {log}
+for arg in "$@"; do
+    case $arg in
+        --jobs=*) jobs=$(echo ${{arg#--jobs=}} | tr ',' ' ');;
+    esac
+done
+for job in $jobs; do
+    echo "$job|job_$job|00:01:00|cn[1-2]|2020-04-06T15:00:00|2020-04-06T15:01:00|"
+    echo "$job.batch|batch|00:01:00|cn1|2020-04-06T15:00:00|2020-04-06T15:01:00|"
+    echo "$job.0|step_$job|00:00:5$job|cn[1-2]|2020-04-06T15:01:00|2020-04-06T15:01:01|"
+done
+"""
+
+
+def test_jobs_info(tmpdir, monkeypatch):
+    """ Job information is read with one sacct command per chunk of job ids """
+    sacct_log = tmpdir.join('sacct.log')
+    sacct = tmpdir.join('sacct')
+    sacct.write(FAKE_SACCT.format(log=str(sacct_log)))
+    sacct.chmod(0o755)
+    monkeypatch.setenv('PATH', '{}:{}'.format(str(tmpdir), os.environ['PATH']))
+
+    interface = slurm_i.SlurmInterface()
+    job_ids = [str(job_id) for job_id in range(1, 10)]
+    jobs_info = interface.get_jobs_info(job_ids)
+
+    assert len(sacct_log.readlines()) == 1
+    assert sorted(jobs_info) == job_ids
+    assert [info['job_name'] for info in jobs_info['3']] == ['job_3', 'step_3']
+    assert jobs_info['3'][-1]['job_elasped'] == '00:00:53'
+    assert jobs_info['3'][-1]['job_nodelist'] == ['cn1', 'cn2']
+    assert interface.get_job_info(4) == jobs_info['4']
+
+    sacct_log.remove()
+    monkeypatch.setattr(slurm_i, 'SACCT_MAX_JOBS_LENGTH', 5)
+    assert interface.get_jobs_info(job_ids) == jobs_info
+    assert len(sacct_log.readlines()) == 3
+
+
+def test_slurm_cluster_name(tmpdir, monkeypatch):
+    monkeypatch.delenv('SLURM_CLUSTER_NAME', raising=False)
+    slurm_conf = tmpdir.join('slurm.conf')
+    monkeypatch.setenv('SLURM_CONF', str(slurm_conf))
+    assert slurm_i.slurm_cluster_name() == ''
+    slurm_conf.write('# ClusterName=old\nclustername = athos\nSlurmctldHost=admin\n')
+    assert slurm_i.slurm_cluster_name() == 'athos'
+    monkeypatch.setenv('SLURM_CLUSTER_NAME', 'porthos')
+    assert slurm_i.slurm_cluster_name() == 'porthos'
@@ -19,6 +19,8 @@
 """ Provides test API """
 
 # pylint: disable=unused-import,unused-variable,line-too-long
+import datetime
+import pytest
 from ubench.core.ubench_commands import UbenchCmd
 import fake_data
 
@@ -107,12 +109,25 @@ def test_run_wlist_parameter(mocker):
 
 def test_log(mocker):
     """ Test log command"""
-    mock_bms = mocker.patch(".".join(BMS_MOCK+["print_log"]))
+    mock_bms = mocker.patch(".".join(BMS_MOCK+["print_logs"]))
 
     cmd = UbenchCmd("platform", [])
     cmd.log(None)
-    mock_bms.assert_called_with(-1)
+    mock_bms.assert_called_with([-1], 1)
     cmd.log([2])
-    mock_bms.assert_called_with(2)
-    cmd.log([2, 3])
-    mock_bms.assert_called_with(3)
+    mock_bms.assert_called_with([2], 1)
+    cmd.log(['2', '3'], jobs=2)
+    mock_bms.assert_called_with([2, 3], 2)
+
+
+def test_list(mocker, capsys):
+    """ Test list command """
+    mock_bms = mocker.patch(".".join(BMS_MOCK+["list_runs"]))
+
+    cmd = UbenchCmd("platform", [])
+    cmd.listb('2020-01-02', 'completed', 1, 2)
+    mock_bms.assert_called_with(datetime.datetime(2020, 1, 2), 'completed', 1, 2, 1)
+    with pytest.raises(SystemExit):
+        cmd.listb('2020-13-01')
+    assert capsys.readouterr().out.startswith('Error: ')
+    assert mock_bms.call_count == 1
@@ -0,0 +1,67 @@
+""" YAML I/O layer tests and micro-benchmark """
+
+# pylint: disable=missing-docstring
+import copy
+import io
+import time
+import yaml
+from ubench.data_management import yaml_io
+
+# Number of copies of fixture runs used by the micro-benchmark
+SCALE = 200
+
+
+def _scaled_results(bench_results, scale=SCALE):
+    """ Return bench_results.yaml data with its runs copied scale times """
+    with open(bench_results, 'r') as rfile:
+        data = yaml.safe_load(rfile)
+
+    runs = {}
+    for i in range(scale):
+        for run_id, run in data['runs'].items():
+            runs['{}_{}'.format(i, run_id)] = copy.deepcopy(run)
+    data['runs'] = runs
+    return data
+
+
+def _throughput(func, size, repeat=3):
+    """ Return best throughput in MB/s of func over repeat calls """
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        func()
+        elapsed = max(time.time() - start, 1e-6)
+        best = elapsed if best is None else min(best, elapsed)
+    return size / best / 1e6
+
+
+def test_yaml_io_same_documents(data_dir):
+    """ Fast loader and dumper must give the same data than pure Python ones """
+    data = _scaled_results(data_dir.bench_results, 2)
+
+    document = yaml_io.dump(data, default_flow_style=False)
+    assert document == yaml.dump(data, Dumper=yaml.Dumper, default_flow_style=False)
+    assert yaml_io.load(document) == yaml.load(document, Loader=yaml.FullLoader)
+    assert yaml_io.safe_load(io.StringIO(document)) == data
+
+
+def test_yaml_io_throughput(data_dir):
+    """ Record load/dump throughput of the YAML layer on scaled up results """
+    data = _scaled_results(data_dir.bench_results)
+    document = yaml_io.dump(data, default_flow_style=False)
+    size = len(document)
+
+    records = {
+        'load': _throughput(lambda: yaml_io.load(document), size),
+        'dump': _throughput(lambda: yaml_io.dump(data, default_flow_style=False), size),
+        'load (pure python)': _throughput(
+            lambda: yaml.load(document, Loader=yaml.FullLoader), size, 1),
+        'dump (pure python)': _throughput(
+            lambda: yaml.dump(data, Dumper=yaml.Dumper, default_flow_style=False), size, 1),
+    }
+
+    print('\nYAML throughput on {:.1f} MB, libyaml: {}'.format(size / 1e6, yaml_io.LIBYAML))
+    for name, value in records.items():
+        print('  {:20s} {:8.2f} MB/s'.format(name, value))
+
+    assert all(value > 0 for value in records.values())
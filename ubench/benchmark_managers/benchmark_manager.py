@@ -78,11 +78,11 @@ class BenchmarkManager():
 
 
     @abc.abstractmethod
-    def list_runs(self):
+    def list_runs(self, since=None, status=None, offset=0, limit=None):
         """ List benchmark runs with their IDs and status """
 
     @abc.abstractmethod
-    def result(self, benchmark_id):
+    def result(self, benchmark_id, force=False):
         """ Generate and print results """
 
     def print_result_array(self, output_file=None):
@@ -20,10 +20,61 @@
 # pylint: disable=superfluous-parens
 """ Define BenchmarkManagerSet class. """
 
+import sys
+from concurrent.futures import ThreadPoolExecutor
 
 import ubench.benchmark_managers.benchmark_manager as benm
 import ubench.benchmark_managers.jube_benchmark_manager as jbm
 from ubench.core.ubench_config import UbenchConfig
+from ubench.utils import ThreadOutput
+
+
+def _run_ordered(tasks, jobs=1):
+    """ Run tasks and print their output in task order.
+
+    With more than one job tasks run concurrently in threads, what a task
+    prints is kept until every previous task output is printed. The
+    generator yields after each task output so that callers print what
+    follows a task in the same order.
+
+    Args:
+        tasks (list): functions without arguments
+        jobs (int): maximum number of tasks running at once
+
+    Yields:
+        (object) task return value
+
+    Raises:
+        exception raised by a task, after its output
+    """
+    if jobs <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield task()
+        return
+
+    output = ThreadOutput(sys.stdout)
+
+    def captured(task):
+        """ Run task keeping its output """
+        output.capture()
+        try:
+            return task(), None, output.release()
+        except Exception as exc:  # pylint: disable=broad-except
+            return None, exc, output.release()
+
+    sys.stdout = output
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(captured, task) for task in tasks]
+            for future in futures:
+                value, exc, text = future.result()
+                output.stream.write(text)
+                if exc is not None:
+                    raise exc
+                yield value
+    finally:
+        sys.stdout = output.stream
+
 
 class BenchmarkManagerSet(benm.BenchmarkManager):
     """ Composite class that manages multiple BenchmarkManager.
@@ -37,7 +88,9 @@ class BenchmarkManagerSet(benm.BenchmarkManager):
         list_parameters
         set_parameter
         print_log
+        print_logs
         list_runs
+        results
         analise
         analise_last
         extract_results
@@ -101,35 +154,99 @@ class BenchmarkManagerSet(benm.BenchmarkManager):
             idb (int): id of the benchmark
         """
 
-        for bench_m in self.benchmark_manager_list:
+        self.print_logs([idb])
+
+
+    def print_logs(self, id_list, jobs=1):
+        """ Print logs from benchmark runs, logs are printed in the order of
+        run ids then of benchmarks.
+
+        Args:
+            id_list (list): ids of the runs
+            jobs (int): number of logs read at once
+        """
+
+        def print_bench_log(bench_m, idb):
+            """ Print log of a benchmark run """
             try:
                 bench_m.print_log(idb)
             except OSError as ose:
                 print('    No run was found for '+\
-                    '{0} benchmark with id {1}: '.format(bench_m.benchmark_name, str(idb)))
+                    '{0} benchmark with id {1}: '.format(bench_m.benchmark, str(idb)))
                 print('    '+str(ose))
-        print('')
 
+        tasks = [(lambda b=bench_m, i=idb: print_bench_log(b, i))
+                 for idb in id_list for bench_m in self.benchmark_manager_list]
+        for num, _ in enumerate(_run_ordered(tasks, jobs), 1):
+            if num % len(self.benchmark_manager_list) == 0:
+                print('')
 
-    def list_runs(self):
-        """ List benchmark runs with their IDs and status """
 
-        for bench_m in self.benchmark_manager_list:
+    def list_runs(self, since=None, status=None, offset=0, limit=None, jobs=1):
+        """ List benchmark runs with their IDs and status, see
+        StandardBenchmarkManager.list_runs for filters, benchmarks are
+        listed in order by jobs threads at once. """
+
+        def list_bench_runs(bench_m):
+            """ List runs of a benchmark """
             try:
-                bench_m.list_runs()
+                bench_m.list_runs(since, status, offset, limit)
             except OSError as ose:
                 print('    No run was found for {0} benchmark :'.\
-                    format(bench_m.benchmark_name))
+                    format(bench_m.benchmark))
                 print('    '+str(ose))
             print('')
 
-    def result(self, benchmark_id):
+        tasks = [(lambda b=bench_m: list_bench_runs(b)) for bench_m in self.benchmark_manager_list]
+        for _ in _run_ordered(tasks, jobs):
+            pass
+
+
+    def result(self, benchmark_id, force=False):
         for bench_m in self.benchmark_manager_list:
             try:
-                bench_m.result(benchmark_id)
+                bench_m.result(benchmark_id, force)
+            except IOError:
+                print('----no {0} run found'.format(bench_m.benchmark))
+
+
+    def results(self, id_list, output_file=None, jobs=1, force=False):
+        """ Extract and print results of benchmark runs, results of each run
+        id are printed in the order of benchmarks once every benchmark of the
+        id is extracted.
+
+        Args:
+            id_list (list): ids of the runs
+            output_file (str): path of a file where to write the arrays
+            jobs (int): number of results extracted at once
+            force (bool): extract results of runs which did not change
+        """
+
+        # Results are kept by managers, concurrent extractions of several ids
+        # of a benchmark need one manager by id.
+        id_managers = [self.benchmark_manager_list]
+        for _ in id_list[1:]:
+            if jobs > 1:
+                id_managers.append([jbm.JubeBenchmarkManager(bench_m.benchmark, self.platform)
+                                    for bench_m in self.benchmark_manager_list])
+            else:
+                id_managers.append(self.benchmark_manager_list)
+
+        def bench_result(bench_m, idb):
+            """ Extract results of a benchmark run """
+            try:
+                bench_m.result(idb, force)
             except IOError:
                 print('----no {0} run found'.format(bench_m.benchmark))
 
+        tasks = [(lambda b=bench_m, i=idb: bench_result(b, i))
+                 for idb, managers in zip(id_list, id_managers) for bench_m in managers]
+        nbench = len(self.benchmark_manager_list)
+        for num, _ in enumerate(_run_ordered(tasks, jobs), 1):
+            if num % nbench == 0:
+                for bench_m in id_managers[num // nbench - 1]:
+                    bench_m.print_result_array(output_file)
+
 
     def print_result_array(self, output_file=None):
         """ Asciidoc printing result array
@@ -28,16 +28,22 @@ from datetime import datetime
 from shutil import copytree
 from pydoc import locate
 import collections
+from concurrent.futures import ThreadPoolExecutor
 import multiprocessing as mp
-import yaml
+import sqlite3
 
-from ubench.scheduler_interfaces.slurm_interface import (wlist_to_scheduler_wlist,
-                                                         SlurmInterface)
+from ubench.scheduler_interfaces.slurm_interface import wlist_to_scheduler_wlist
+from ubench.scheduler_interfaces.scheduler_interface import get_scheduler_interface
+from ubench.scheduler_interfaces.job_tracker import JobTracker, FINISH_STATES
+from ubench.scheduler_interfaces.local_interface import LocalSchedulerInterface
+from ubench.scheduler_interfaces.node_packer import NodePacker
 from ubench.data_management.publisher import Publisher
 from ubench.data_management.data_store_yaml import DataStoreYAML
-from ubench.config import CAMPAIGN_DATE_FORMAT, BENCHMARK_API_CLASS
+from ubench.data_management import yaml_io
+from ubench.config import CAMPAIGN_DATE_FORMAT, BENCHMARK_API_CLASS, CAMPAIGN_CONCURRENCY
 from ubench.core.ubench_config import UbenchConfig
 from ubench.data_management.comparison_writer import ComparisonWriter
+from ubench.data_management.history_store import HistoryStore, HISTORY_FILENAME
 from ubench.progress import Progress
 
 
@@ -46,6 +52,7 @@ class CampaignManager(object):
 
     Class attributes:
         ref_results (str) - commit id for bench comparision
+        alpha (float)     - significance level of comparisons with ref_results
         campaign (dict)   - campaign file contents
 
         benchmarks  - ordered dict with (bench, JubeBenchmarkingAPI object)
@@ -77,18 +84,37 @@ class CampaignManager(object):
 
         data_campaign - date the campaign was launched
         campaign_dir - execution directory under UBENCH_RUN_DIR_BENCH
+        node_packer  - NodePacker running jobs in a single allocation, None
+                       if jobs are submitted to the scheduler
+        packed_benchmarks - names of the benchmarks whose jobs are run by node_packer,
+                            their jobs are tracked by packed_job_tracker
+        concurrency  - maximum number of benchmarks launched or compiled at the same time
+        strict_order - True if benchmarks are launched once every benchmark with
+                       a lower order has been compiled, order is only a priority otherwise
     '''
 
-    def __init__(self, campaign_file, ref_results=None, campaign_freq=12):
-        ''' Initialize CampaignManager object '''
+    def __init__(self, campaign_file, ref_results=None, campaign_freq=12, alpha=None,  # pylint: disable=too-many-arguments
+                 pack=False, concurrency=None):
+        ''' Initialize CampaignManager object
+
+        alpha is the significance level used to compare results with ref_results,
+        every difference is printed if None.
+        If pack is True or if the campaign file has a pack key, jobs of benchmarks
+        run without custom nodes are packed in a single allocation.
+        concurrency is the maximum number of benchmarks launched or compiled at the
+        same time, the campaign file concurrency key or
+        ubench.config.CAMPAIGN_CONCURRENCY if None.
+        '''
 
-        # compatibility with old Pyyaml versions
         self.campaign = self.campaign_parser(campaign_file)
         self.benchmarks = collections.OrderedDict()
         self.ref_results = ref_results
         self.exec_info = collections.OrderedDict()
         self.campaign_status = collections.OrderedDict()
-        self.scheduler_interface = SlurmInterface()
+        self.scheduler_interface = get_scheduler_interface(self.campaign['platform'])
+        # Jobs of every benchmark are polled together
+        self.job_tracker = JobTracker(self.scheduler_interface, min_interval=1,
+                                      max_interval=campaign_freq)
         date_campaign = datetime.now().strftime(CAMPAIGN_DATE_FORMAT)
         self.campaign_dir = os.path.join(UbenchConfig().run_dir,
                                          'campaign-{}-{}'.format(self.campaign['name'],
@@ -98,15 +124,26 @@ class CampaignManager(object):
         self.pub_local_dir = UbenchConfig().results_dir
         self.pub_repo_str = UbenchConfig().pub_repo
         self.results_table = {'update' : 0}
+        self.alpha = alpha
+        # pack key is either true or a dict with a max_nodes key
+        pack = pack or self.campaign.get('pack', False)
+        self.pack_max_nodes = pack.get('max_nodes') if isinstance(pack, dict) else None
+        self.pack = bool(pack)
+        self.node_packer = None
+        self.packed_job_tracker = None
+        self.packed_benchmarks = set()
+        self.concurrency = max(1, int(concurrency or self.campaign.get('concurrency')
+                                      or CAMPAIGN_CONCURRENCY))
+        self.strict_order = self.campaign.get('launch_order', 'priority') == 'strict'
+        # benchmark name -> future of its launch
+        self._launching = collections.OrderedDict()
+        self._launch_pool = None
 
     def campaign_parser(self, campaign_file):
         ''' Basic parser for benchmark campaign specification file '''
 
-        yaml_attrs = getattr(yaml, '__dict__', {})
-        if 'FullLoader' in yaml_attrs:
-            campaign_data = yaml.load(open(campaign_file, 'r'), Loader=yaml.FullLoader)
-        else:
-            campaign_data = yaml.load(open(campaign_file, 'r'))
+        with open(campaign_file, 'r') as cfile:
+            campaign_data = yaml_io.load(cfile)
 
         platform = campaign_data['platform']
         benchmarks = campaign_data['benchmarks']
@@ -142,6 +179,17 @@ class CampaignManager(object):
             print(e)
             raise
 
+        if self.pack and isinstance(self.scheduler_interface, LocalSchedulerInterface):
+            print('!!Warning: jobs of platform {} are not packed, packing needs a Slurm platform'
+                  .format(self.campaign['platform']))
+        elif self.pack:
+            self.node_packer = NodePacker(os.path.join(self.campaign_dir, 'packed_jobs'),
+                                          self.pack_max_nodes, self.scheduler_interface)
+            # Packed jobs are read from the packer spool directory, jobs of
+            # benchmarks run with custom nodes are still read from the scheduler
+            self.packed_job_tracker = JobTracker(self.node_packer, min_interval=1,
+                                                 max_interval=self.campaign_freq)
+
         # create benchmark objects
         benchmark_api = locate(BENCHMARK_API_CLASS)
 
@@ -198,6 +246,19 @@ class CampaignManager(object):
             self.campaign_status[benchmark]['finished_jobs'] = 0
             self.campaign_status[benchmark]['status'] = 'RUNNING'
             self.campaign_status[benchmark]['results'] = {}
+            self._job_tracker(benchmark).track(job_ids)
+
+
+    def _job_tracker(self, benchmark):
+        """ Return the tracker of the jobs of a benchmark """
+        if benchmark in self.packed_benchmarks:
+            return self.packed_job_tracker
+        return self.job_tracker
+
+
+    def _job_trackers(self):
+        """ Return every job tracker of the campaign """
+        return [tracker for tracker in (self.job_tracker, self.packed_job_tracker) if tracker]
 
     def get_diff_results(self, benchmark, exec_dir):
         ''' Returns the value obtained by comparing the
@@ -232,7 +293,23 @@ class CampaignManager(object):
         Jube return code is used to check when COMPILING is finished.
         '''
 
-        finish_states = ['COMPLETED', 'FAILED', 'CANCELLED']
+        # Packed jobs allocation is requested once every benchmark has queued its jobs
+        if self.node_packer:
+            if len(self.exec_info) == len(self.benchmarks) and \
+               all(j_job.jube_returncode is not None for j_job, _ in self.exec_info.values()):
+                self.node_packer.allocate()
+            self.node_packer.dispatch()
+
+        # Jobs of newly compiled benchmarks are tracked before the poll so that
+        # their states are read in this tick
+        for b_name, (j_job, _) in self.exec_info.items():
+            if self.campaign_status[b_name]['status'] != 'FINISHED' and \
+               j_job.jube_returncode == 0:
+                self.init_job_info(b_name)
+
+        # States of every tracked job are read with a single query by tracker
+        for tracker in self._job_trackers():
+            tracker.poll()
         for b_name, values in self.exec_info.items():
 
             # Benchs marked with FINISHED are done!
@@ -245,11 +322,10 @@ class CampaignManager(object):
 
                 # Benchs in execution will update `finished_jobs` and `post_results`
                 elif j_job.jube_returncode == 0:
-                    self.init_job_info(b_name)
-                    job_req = self.scheduler_interface.get_jobs_state(j_job.job_ids)
-                    finished_jobs = [j_n for j_n, j_s in job_req.items() if j_s in finish_states]
+                    job_req = self._job_tracker(b_name).states(j_job.job_ids)
+                    finished_jobs = [j_n for j_n, j_s in job_req.items() if j_s in FINISH_STATES]
                     if len(finished_jobs) > self.campaign_status[b_name]['finished_jobs']:
-                        self.benchmarks[b_name].result(0, output=False)
+                        self.benchmarks[b_name].result(0, output=False, incremental=True)
                         self.campaign_status[b_name]['finished_jobs'] = len(finished_jobs)
                         self.campaign_status[b_name]['post_results'] \
                                                   = self.benchmarks[b_name].results_file
@@ -285,36 +361,97 @@ class CampaignManager(object):
         return False
 
     def _run_progress_bar(self):
-        ''' Shows progress bar '''
+        ''' Shows progress bar until next poll of campaign jobs '''
         usr_msg = mp.Process(target=Progress.blink, args=(Progress(msg=" RUNNING"),))
         usr_msg.start()
-        time.sleep(self.campaign_freq)
+        if len(self.exec_info) < len(self.benchmarks):
+            # Launch slots are checked often
+            time.sleep(self.job_tracker.min_interval)
+        else:
+            intervals = [tracker.interval for tracker in self._job_trackers()
+                         if tracker.unfinished()]
+            time.sleep(min(intervals) if intervals else self.campaign_freq)
         usr_msg.terminate()
         usr_msg.join()
         os.system('tput sgr0')
         os.system('tput cnorm')
 
-    def run(self):
-        ''' Run campaign workflow '''
-        # Launch all benchmarks
+    def _launch_benchmark(self, b_name):
+        ''' Launch a benchmark, returns its (JubeRun object, parameters list) '''
         c_benchmarks = self.campaign['benchmarks']
-
-        for b_name, b_obj in self.benchmarks.items():
-            print('Executing benchmark: {}'.format(b_name))
-            parameters = c_benchmarks[b_name]['parameters']
-            if 'w' in parameters:
-                parameters['w'] = wlist_to_scheduler_wlist(parameters['w'])
-
-            parameters['custom_params'] = parameters
-            self.exec_info[b_name] = b_obj.run(parameters)
+        print('Executing benchmark: {}'.format(b_name))
+        parameters = c_benchmarks[b_name]['parameters']
+        if 'w' in parameters:
+            parameters['w'] = wlist_to_scheduler_wlist(parameters['w'])
+        elif self.node_packer:
+            parameters['pack_submit'] = self.node_packer.submit_command()
+            self.packed_benchmarks.add(b_name)
+
+        parameters['custom_params'] = parameters
+        try:
+            return self.benchmarks[b_name].run(parameters)
+        finally:
             # Drop ubench parameters
             c_benchmarks[b_name]['parameters'].pop('w', None)
+            c_benchmarks[b_name]['parameters'].pop('pack_submit', None)
             c_benchmarks[b_name]['parameters'].pop('custom_params', None)
 
-        while self.non_finished():
-            self.update_campaign_status()
-            self.print_campaign_status()
-            self._run_progress_bar()
+    def launch_benchmarks(self):
+        ''' Launch benchmarks which may start without waiting
+
+        Benchmarks are launched by increasing order, at most `concurrency` of them
+        are launched or compiled (jube process still running) at the same time.
+        With strict_order, a benchmark is only launched once every benchmark with
+        a lower order has been compiled.
+
+        Returns:
+            (bool) True if benchmarks remain to be launched
+        '''
+        if self._launch_pool is None:
+            self._launch_pool = ThreadPoolExecutor(max_workers=self.concurrency)
+        for b_name, future in list(self._launching.items()):
+            if future.done():
+                del self._launching[b_name]
+                # Launch errors stop the campaign as sequential launches did
+                self.exec_info[b_name] = future.result()
+
+        c_benchmarks = self.campaign['benchmarks']
+        not_compiled = list(self._launching) + \
+                       [b_name for b_name in self.benchmarks if b_name not in self.exec_info
+                        and b_name not in self._launching] + \
+                       [b_name for b_name, (j_job, _) in self.exec_info.items()
+                        if j_job.jube_returncode is None]
+        busy = len(self._launching) + \
+               sum(1 for j_job, _ in self.exec_info.values() if j_job.jube_returncode is None)
+
+        for b_name in self.benchmarks:
+            if busy >= self.concurrency:
+                break
+            if b_name in self.exec_info or b_name in self._launching:
+                continue
+            order = c_benchmarks[b_name]['order']
+            if self.strict_order and any(c_benchmarks[other]['order'] < order
+                                         for other in not_compiled):
+                break
+            self.campaign_status[b_name]['status'] = 'CONFIGURING'
+            self._launching[b_name] = self._launch_pool.submit(self._launch_benchmark, b_name)
+            busy += 1
+
+        return len(self.exec_info) < len(self.benchmarks)
+
+    def run(self):
+        ''' Run campaign workflow '''
+        # Benchmarks are launched while jobs of launched benchmarks are monitored
+        try:
+            while self.launch_benchmarks() or self.non_finished():
+                self.update_campaign_status()
+                self.print_campaign_status()
+                self._run_progress_bar()
+        finally:
+            self._launch_pool.shutdown(wait=True)
+            self._launch_pool = None
+            if self.node_packer:
+                self.node_packer.release()
 
         print('\nEnd : {}\n'.format(datetime.now().time().strftime('%H:%M:%S')))
 
@@ -326,14 +463,30 @@ class CampaignManager(object):
                 bench_dirs = [self.campaign_status[bench]['pre_results'],
                               self.campaign_status[bench]['post_results']]
                 bench_dirs = [os.path.split(dir)[0] for dir in bench_dirs]
-                writer = ComparisonWriter()
+                writer = ComparisonWriter(alpha=self.alpha)
                 writer.print_comparison(bench, bench_dirs)
             else:
                 self.benchmarks[bench].result(0, campaign=True, output=False)
 
+        self.add_to_history()
         print('Campaign finished successfully')
 
 
+    def add_to_history(self):
+        ''' Append campaign results to the performance history of UBENCH_RESULTS_DIR '''
+        history_file = os.path.join(self.pub_local_dir, HISTORY_FILENAME)
+        try:
+            history = HistoryStore(history_file)
+            for bench in self.benchmarks.keys():
+                results_file = self.campaign_status[bench].get('post_results')
+                if results_file:
+                    history.add_file(results_file, os.path.basename(self.campaign_dir))
+            history.close()
+        except (sqlite3.Error, OSError) as e:
+            print('Warning: campaign results were not added to history {}: {}'
+                  .format(history_file, e))
+
+
     def print_campaign_status(self):
         ''' Print campaign status '''
         width = 20
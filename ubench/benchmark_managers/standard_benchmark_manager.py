@@ -24,16 +24,18 @@
 from __future__ import print_function
 
 import abc
+import datetime
 import os
-import re
-import sys
 import time
 from shutil import copy, copytree
 
 import six
 import ubench.benchmark_managers.benchmark_manager as benm
+import ubench.config
 from ubench.core.ubench_config import UbenchConfig
-import ubench.scheduler_interfaces.slurm_interface as slurmi
+from ubench.scheduler_interfaces.scheduler_interface import get_scheduler_interface
+from ubench.scheduler_interfaces.job_tracker import JobTracker, FINISH_STATES
+from ubench.data_management.run_catalog import RunCatalog, RUN_CATALOG_FILENAME
 
 @six.add_metaclass(abc.ABCMeta)  # pylint: disable=too-many-instance-attributes
 class StandardBenchmarkManager(benm.BenchmarkManager):
@@ -50,6 +52,7 @@ class StandardBenchmarkManager(benm.BenchmarkManager):
         benchmark_path (str)
         benchmark_src_path (str)
         benchmarking_api (str)
+        run_catalog (RunCatalog): catalog of the benchmark runs
         title (str)
         description (str)
         print_array (boolean)
@@ -74,6 +77,7 @@ class StandardBenchmarkManager(benm.BenchmarkManager):
         self.benchmark_results_path = ''
         self.benchmark_path = os.path.join(UbenchConfig().run_dir, platform, benchmark)
         self.benchmark_src_path = os.path.join(UbenchConfig().benchmark_dir, benchmark)
+        self.run_catalog = RunCatalog(os.path.join(self.benchmark_path, RUN_CATALOG_FILENAME))
         # Default report parameters
         self.print_array = True
         self.print_transposed_array = False
@@ -164,6 +168,8 @@ class StandardBenchmarkManager(benm.BenchmarkManager):
             if 'raw_cli' in opts:
                 logfile.write('cmdline         : {0} \n'.format(' '.join(opts['raw_cli'])))
 
+        self._catalog_run(j_job, opts)
+
         print("---- Use the following command to follow benchmark progress: "\
               "ubench log -p {0} -b {1} -i {2}".format(self.platform,
                                                        self.benchmark, j_job.jubeid))
@@ -180,23 +186,108 @@ class StandardBenchmarkManager(benm.BenchmarkManager):
             if not job_ids:
                 print("Error: No job ids found")
 
-            scheduler_interface = slurmi.SlurmInterface()
-            job_states = ['RUNNING']
-            finish_states = ['COMPLETED', 'FAILED', 'CANCELLED']
-            while job_states:
-                job_req = scheduler_interface.get_jobs_state(job_ids)
-                # failing jobs
-                failed = [job_n for job_n, job_s in job_req.items() if job_s == 'FAILED']
-                if failed:
-                    for job_n in failed:
-                        print("Job {} has failed".format(job_n))
-
-                job_states = [job_s for job_s in job_req.values() if job_s not in finish_states]
-                if job_states:
-                    print("Wating for jobs id: {}".format(",".join(job_req.keys())))
-                    time.sleep(60)
+            def job_finished(job_n, job_s):  # pylint: disable=missing-docstring
+                if job_s != 'COMPLETED':
+                    print("Job {} has {}".format(job_n, job_s.lower()))
+
+            def waiting(tracker):  # pylint: disable=missing-docstring
+                if tracker.unfinished():
+                    print("Wating for jobs id: {}".format(",".join(tracker.unfinished())))
+
+            job_tracker = JobTracker(get_scheduler_interface(self.platform))
+            job_tracker.track(job_ids, on_finish=job_finished)
+            job_tracker.wait(waiting)
 
             print('---- All jobs or processes in background have finished')
+            completed = j_job.jube_returncode == 0 and job_ids and \
+                        all(state == 'COMPLETED' for state in job_tracker.states().values())
+            self._update_catalog_run(j_job.jubeid, 'COMPLETED' if completed else 'FAILED')
+
+
+    def _runs_dir(self):
+        """ Return directory of the benchmark runs """
+        return os.path.join(self.benchmark_path,
+                            self.benchmarking_api.jube_files.get_bench_outputdir())
+
+
+    def _catalog_run(self, j_job, opts):
+        """ Add a launched run to the run catalog, runs launched before the
+        catalog existed are imported first """
+        try:
+            if not self.run_catalog.exists():
+                self.run_catalog.import_logs(os.path.dirname(j_job.result_path))
+            self.run_catalog.add({'id': j_job.jubeid,
+                                  'date': datetime.datetime.now().isoformat(timespec='seconds'),
+                                  'platform': self.platform,
+                                  'benchmark': self.benchmark,
+                                  'cmdline': ' '.join(opts.get('raw_cli', [])),
+                                  'status': 'SUBMITTED',
+                                  'result_path': j_job.result_path})
+        except (IOError, OSError) as err:
+            print('!!Warning: run was not added to the run catalog: {}'.format(err))
+
+
+    def _update_catalog_run(self, run_id, status, fields=None):
+        """ Update status and other fields of a run in the run catalog """
+        try:
+            self.run_catalog.update(run_id, dict(fields or {}, status=status))
+        except (IOError, OSError) as err:
+            print('!!Warning: run catalog was not updated: {}'.format(err))
+
+
+    def _refresh_catalog_status(self, runs):
+        """ Update status of unfinished runs of the run catalog from the
+        scheduler states of their jobs. A run is COMPLETED once all its jobs
+        are completed, FAILED once all its jobs are finished and one of them
+        did not complete, RUNNING while one of its jobs runs.
+
+        Runs whose directory was removed or whose jobs are no longer known
+        by the scheduler get the UNKNOWN status and are not refreshed again.
+        Runs without jobs yet, still compiling for instance, are refreshed
+        at most once every ubench.config.RUN_CATALOG_CHECK_INTERVAL.
+
+        Args:
+            runs (list): catalog runs
+        """
+        now = time.time()
+        run_job_ids = {}
+        for run in runs:
+            if run.get('status') in ('COMPLETED', 'FAILED') or run.get('unresolvable') or \
+               now - run.get('checked', 0) < ubench.config.RUN_CATALOG_CHECK_INTERVAL:
+                continue
+            try:
+                job_ids = self.benchmarking_api.get_run_job_ids(run['id'])
+            except (IOError, OSError):
+                self._update_catalog_run(run['id'], 'UNKNOWN', {'unresolvable': True})
+                continue
+            if job_ids:
+                run_job_ids[run['id']] = job_ids
+            else:
+                self._update_catalog_run(run['id'], run.get('status', 'UNKNOWN'),
+                                         {'checked': now})
+        if not run_job_ids:
+            return
+
+        job_states = get_scheduler_interface(self.platform).get_jobs_state(
+            sorted(set(job_id for job_ids in run_job_ids.values() for job_id in job_ids)))
+        for run in runs:
+            if run['id'] not in run_job_ids:
+                continue
+            states = [job_states.get(job_id) for job_id in run_job_ids[run['id']]]
+            if all(state is None for state in states):
+                self._update_catalog_run(run['id'], 'UNKNOWN', {'unresolvable': True})
+                continue
+            if None in states:
+                continue
+            if all(state in FINISH_STATES for state in states):
+                status = 'COMPLETED' if all(state == 'COMPLETED' for state in states) \
+                         else 'FAILED'
+            elif 'RUNNING' in states:
+                status = 'RUNNING'
+            else:
+                continue
+            if status != run.get('status'):
+                self._update_catalog_run(run['id'], status)
 
 
     def list_parameters(self, default_values):
@@ -239,91 +330,69 @@ class StandardBenchmarkManager(benm.BenchmarkManager):
             print(str(io_error))
             raise
 
-    def list_runs(self):
-        """ List benchmark runs with their IDs and status """
-        # pylint: disable=too-many-locals, too-many-branches
+    def list_runs(self, since=None, status=None, offset=0, limit=None):  # pylint: disable=arguments-differ
+        """ List benchmark runs with their IDs and status.
 
-        field_pattern = re.compile(r'(\S+).*: (.*)')  # pylint: disable=unused-variable
-        field_dict = {}  # pylint: disable=unused-variable
-        sorted_key_list = []  # pylint: disable=unused-variable
-        nbenchs = 0
+        Runs are read from the run catalog, ubench.log files of the run
+        directories are only read once to import runs launched before the
+        catalog existed. Status of unfinished runs is refreshed from the
+        scheduler states of their jobs.
 
-        # Retrieve informations from ubench.log files found in the benchmark directory.
-        # Informations are organized in a dictionnary.
-        logfile_paths = []
-
-        try:
-            result_root_dir = os.path.join(self.benchmark_path,
-                                           self.benchmarking_api.jube_files.get_bench_outputdir())
-        except OSError as ose:
-            print('    No run was found for {0} benchmark :'.\
-                  format(self.benchmark))
-            print("    {}".format(ose))
-
-        for fd in os.listdir(result_root_dir):
-            for filename in os.listdir(os.path.join(result_root_dir, fd)):
-                if filename == 'ubench.log':
-                    logfile_paths.append(os.path.join(result_root_dir, fd, 'ubench.log'))
-
-        # The second loop is need to parse files in a sorted order.
-        list_data = {}
-        for filepath in sorted(logfile_paths):
-            with open(filepath, 'r') as logfile:
-                nbenchs += 1
-                list_data[nbenchs] = {}
-                fields = field_pattern.findall(logfile.read())
-                for field in fields:
-                    if field[0] == 'Run_directory':
-                        list_data[nbenchs][field[0]] = os.path.dirname(filepath)
-                    else:
-                        list_data[nbenchs][field[0]] = field[1].strip()
-
-        if not list_data:
+        Args:
+            since (datetime): only list runs launched from this date
+            status (str): only list runs with this status
+            offset (int): number of matching runs which are not listed
+            limit (int): maximum number of listed runs, every run if None
+        """
+        if not self.run_catalog.exists():
+            # Raises OSError if the benchmark has never been run
+            self.run_catalog.import_logs(self._runs_dir())
+
+        # Runs launched in background or imported from logs are only updated
+        # when they are listed or when their results are extracted. Listed runs
+        # depend on the status of every run of the period when it is filtered.
+        if status:
+            self._refresh_catalog_status(self.run_catalog.runs(since))
+        else:
+            self._refresh_catalog_status(self.run_catalog.runs(since, None, offset, limit))
+        runs = self.run_catalog.runs(since, status, offset, limit)
+        if not runs:
             print('----no benchmark run found for : {0}'.format(self.benchmark))
+            return
 
-        # Print dictionnary with a table layout.
-        separating_line = ''
-        columns = list(set([c for x in list(list_data.keys()) for c in list(list_data[x].keys())]))
-
-        max_dict = {k:0 for k in columns}
+        print('\nPlatform: {0} \nBenchmark: {1}\n'.format(self.platform, self.benchmark))
 
-        for data in list(list_data.values()):
-            max_dict.update({k:max([v, len(data[k])])\
-                             for k, v in list(max_dict.items()) if k in data})
+        # Print runs with a table layout
+        columns = [('ID', 'id'), ('Date', 'date'), ('Status', 'status'),
+                   ('Run_directory', 'result_path'), ('cmdline', 'cmdline')]
+        rows = [['' if run.get(field) is None else str(run[field]) for _, field in columns]
+                for run in runs]
+        widths = [max([len(title)] + [len(row[idx]) for row in rows])
+                  for idx, (title, _) in enumerate(columns)]
 
-        if 'Platform' in columns:
-            columns.remove('Platform')
-        if 'Benchmark_name' in columns:
-            columns.remove('Benchmark_name')
+        print(' | '.join(title.ljust(width) for (title, _), width in zip(columns, widths)) + ' |')
+        print('-' * (sum(widths) + 3 * len(widths) - 1))
+        for row in rows:
+            print(' | '.join(value.ljust(width) for value, width in zip(row, widths)) + ' |')
 
-        if list(list_data.values()):
-            header = list(list_data.values())[0]
-            print('\nPlatform: {0} \nBenchmark: {1}\n'.
-                  format(header['Platform'], header['Benchmark_name']))
 
-        for column in columns:
-            sys.stdout.write(column.ljust(max_dict[column]) + ' | ')
-            separating_line += '-' * (max_dict[column]+2)
+    def result(self, benchmark_id, force=False):
+        """ Generate and print execution results
 
-        separating_line += '-' * (len(columns)-1)
-        print('')
-        print(separating_line)
-
-        for bench in list(list_data.values()):
-            for column in columns:
-                if column in bench:
-                    sys.stdout.write(bench[column].ljust(max_dict[column]) + ' | ')
-                else:
-                    sys.stdout.write(''.ljust(max_dict[column]) + ' | ')
-            print('')
-
-
-    def result(self, benchmark_id):
-        """ Generate and print execution results"""
+        Args:
+            benchmark_id (int): id of the benchmark run
+            force (bool): extract results even if the run did not change
+        """
 
-        self.result_array = self.benchmarking_api.result(benchmark_id)
+        self.result_array = self.benchmarking_api.result(benchmark_id, force=force)
         self.transposed_result_array = [list(x) for x in zip(*self.result_array)]
 
+        # Results file is kept in the run directory, named after the run id
+        run_dir = os.path.dirname(self.benchmarking_api.results_file)
+        run = self.run_catalog.get(os.path.basename(run_dir))
+        if run:
+            self._refresh_catalog_status([run])
+
 
     # # # # #       REPORT      # # # # #
      # # # #                     # # # #
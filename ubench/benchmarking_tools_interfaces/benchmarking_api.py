@@ -65,6 +65,18 @@ class BenchmarkingAPI(object):
         pass
 
 
+    def get_run_job_ids(self, idb):
+        """ Get the scheduler job ids of a benchmark run
+
+        Args:
+             (int) idb: id of the benchmark
+
+        Returns:
+            (list) job ids
+        """
+        pass
+
+
     def run(self, opts):
         """ Runs benchmark.
 
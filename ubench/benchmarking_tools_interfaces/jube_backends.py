@@ -0,0 +1,129 @@
+##############################################################################
+#  This file is part of the UncleBench benchmarking tool.                    #
+#        Copyright (C) 2019 EDF SA                                           #
+#                                                                            #
+#  UncleBench is free software: you can redistribute it and/or modify        #
+#  it under the terms of the GNU General Public License as published by      #
+#  the Free Software Foundation, either version 3 of the License, or         #
+#  (at your option) any later version.                                       #
+#                                                                            #
+#  UncleBench is distributed in the hope that it will be useful,             #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the              #
+#  GNU General Public License for more details.                              #
+#                                                                            #
+#  You should have received a copy of the GNU General Public License         #
+#  along with UncleBench. If not, see <http://www.gnu.org/licenses/>.        #
+#                                                                            #
+##############################################################################
+""" Provides JUBE backends running jube commands.
+
+ - JubeInProcessBackend calls the jube2 package from the ubench process,
+   no interpreter is started and JUBE is imported once
+
+Backends have a run(args) method returning the return code, standard
+output lines and standard error lines of a jube command as utils.run_cmd
+does. Paths given to backends must be absolute. JubeBenchmarkingAPI falls
+back on the jube command when no backend is available.
+"""
+
+import sys
+import threading
+
+import ubench.config
+from ubench.utils import ThreadOutput
+
+try:
+    import jube2.main as jube_main
+except ImportError:
+    jube_main = None
+
+BACKENDS = ('subprocess', 'inprocess')
+# JUBE changes standard output and logging configuration of the process,
+# commands are run one at a time
+_JUBE_LOCK = threading.Lock()
+
+
+def jube_backend(name=None):
+    """ Return JUBE backend
+
+    Args:
+        name (str): 'subprocess' or 'inprocess', ubench.config.JUBE_BACKEND if None
+
+    Returns:
+        backend object, None for the jube command ('subprocess') or if the
+        jube2 package cannot be imported
+    """
+    if name is None:
+        name = ubench.config.JUBE_BACKEND
+    if name == 'inprocess':
+        return JubeInProcessBackend() if jube_main is not None else None
+    if name != 'subprocess':
+        print('!!Warning: unknown JUBE backend {}, choose one of {}'
+              .format(name, ', '.join(BACKENDS)))
+    return None
+
+
+def _lines(text):
+    """ Return non empty lines of a text """
+    return [line for line in text.split('\n') if line]
+
+
+class JubeInProcessBackend(object):
+    """ Runs jube commands with the jube2 package imported by ubench.
+
+    Commands may be run by several threads, they are serialised. The working
+    directory is shared by every thread of the process, so it is never
+    changed: commands get absolute paths. Standard output and error are
+    replaced during a command by proxies which keep the output of the
+    calling thread, other threads write to the original streams.
+
+    Methods:
+        run(args)
+    """
+
+
+    def __init__(self, jube_module=None):
+        """ Class constructor
+
+        Args:
+            jube_module: module with a main(command) function, jube2.main if None
+        """
+        self.jube_module = jube_module or jube_main
+
+
+    def run(self, args):
+        """ Run a jube command
+
+        Output of the command is kept, output printed by other threads
+        meanwhile is not.
+
+        Args:
+            args (list): jube command arguments with absolute paths,
+                         ex: ['analyse', '/path/to/benchmark_runs', '--id', '3']
+
+        Returns:
+            (tuple) return code, standard output lines, standard error lines
+        """
+        with _JUBE_LOCK:
+            stdout = ThreadOutput(sys.stdout)
+            stderr = ThreadOutput(sys.stderr)
+            stdout.capture()
+            stderr.capture()
+            sys.stdout, sys.stderr = stdout, stderr
+            try:
+                self.jube_module.main(list(args))
+                ret_code = 0
+            except SystemExit as exc:
+                if exc.code is None or isinstance(exc.code, int):
+                    ret_code = exc.code or 0
+                else:
+                    print(exc.code, file=sys.stderr)
+                    ret_code = 1
+            except Exception as exc:  # pylint: disable=broad-except
+                print('{}: {}'.format(type(exc).__name__, exc), file=sys.stderr)
+                ret_code = 1
+            finally:
+                sys.stdout, sys.stderr = stdout.stream, stderr.stream
+
+        return ret_code, _lines(stdout.release()), _lines(stderr.release())
@@ -23,20 +23,32 @@ import os
 import sys
 import re
 import csv
+import io
 import tempfile
 import time
 import hashlib
-from subprocess import Popen, PIPE
+from subprocess import Popen
 from collections import defaultdict
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 import ubench.utils as utils
 import ubench.data_management.data_store_yaml as data_store_yaml
 from ubench.core.ubench_config import UbenchConfig
 from ubench.benchmarking_tools_interfaces.benchmarking_api import BenchmarkingAPI
-import ubench.scheduler_interfaces.slurm_interface as slurmi
+from ubench.scheduler_interfaces.scheduler_interface import get_scheduler_interface
+from ubench.scheduler_interfaces.job_tracker import FINISH_STATES
+from ubench.data_management.run_catalog import RunCatalog, RUN_CATALOG_FILENAME
 from . import jube_xml_parser
+from . import jube_run_state
+from .jube_backends import jube_backend
 
 PY3_OR_LATER = sys.version_info[0] >= 3
+# Last benchmark run id reserved by ubench, kept in the benchmark output directory
+LAST_ID_FILE = '.ubench_last_id'
 
 #pylint: disable=superfluous-parens, too-many-instance-attributes, super-init-not-called
 #pylint: disable=arguments-differ, invalid-name, redefined-variable-type, no-self-use
@@ -84,6 +96,9 @@ class JubeBenchmarkingAPI(BenchmarkingAPI):
         self._jube_files = None
         self.results = {}
         self.results_file = None
+        # Run directory -> rows of workpackages whose results are extracted
+        self._extracted_runs = {}
+        self.jube_backend = jube_backend()
 
     @property
     def jube_files(self):
@@ -99,12 +114,20 @@ class JubeBenchmarkingAPI(BenchmarkingAPI):
         return self._jube_files
 
 
-    def result(self, benchmark_id, output=True, campaign=False):
+    def result(self, benchmark_id, output=True, campaign=False, incremental=False,
+               force=False):
         ''' Generate and print results
+
+        Results of a run whose files did not change since its results were
+        extracted are read from the result files, jube is not run again.
+
         Args:
              (int) benchmark_id: id of the benchmark
              (bool) output: if true prints output
              (bool) campaign: enables different behaviour if called from campaign
+             (bool) incremental: only extract data of workpackages without results
+                                 and merge them in existing bench_results.yaml
+             (bool) force: analyse and extract results even if the run did not change
 
         Returns:
             (list) numeric results
@@ -123,17 +146,29 @@ class JubeBenchmarkingAPI(BenchmarkingAPI):
             does not exist'''.format(benchmark_results_path))
             raise IOError
 
-        if output:
-            print('----analysing {0} results'.format(self.benchmark))
-        self._analyse(benchmark_id)
-        if output:
-            print('----extracting results')
-            print('----benchmark results path: {0}'.format(benchmark_results_path))
-        results_array = self._extract_results(benchmark_id)
-        if output:
-            print('''---- writing benchmark data in:
+        run_state = None if force else self._run_state(benchmark_id)
+        if run_state is not None and \
+           run_state == jube_run_state.read_result_state(benchmark_results_path):
+            if output:
+                print('----{0} run did not change since its results were extracted,'
+                      ' use --force to extract them again'.format(self.benchmark))
+                print('----benchmark results path: {0}'.format(benchmark_results_path))
+            results_array = self._read_result_array(benchmark_id)
+            self.results_file = os.path.join(benchmark_results_path, 'bench_results.yaml')
+        else:
+            if output:
+                print('----analysing {0} results'.format(self.benchmark))
+            run_state = self._analyse(benchmark_id)
+            if output:
+                print('----extracting results')
+                print('----benchmark results path: {0}'.format(benchmark_results_path))
+            results_array = self._extract_results(benchmark_id)
+            if output:
+                print('''---- writing benchmark data in:
              {0}/bench_results.yaml'''.format(benchmark_results_path))
-        self.results = self._write_bench_data(benchmark_id)
+            self.results = self._write_bench_data(benchmark_id, incremental)
+            if run_state is not None:
+                jube_run_state.write_result_state(benchmark_results_path, run_state)
 
         if campaign:
             self.result_array = results_array
@@ -143,37 +178,77 @@ class JubeBenchmarkingAPI(BenchmarkingAPI):
 
 
     def _analyse(self, benchmark_id):
-        ''' Executes `jube analyse` command
+        ''' Executes `jube continue` and `jube analyse` commands
 
         Args:
             benchmark_id (int): id of the benchmark to be analyzed
 
         Returns:
-            (str) Result directory absolute path
+            (dict) state of the run directory before it is analysed,
+                   see _run_state
         Raises:
             RuntimeError
         '''
 
-        outpath = self.jube_files.get_bench_outputdir()
+        outpath = self._jube_outpath()
 
         # Continue benchmark steps that were not already executed.
         # This is often mandatory to execute postprocessing steps.
-        cmd_str = 'jube continue --hide-animation {} --id {}'.format(outpath,
-                                                                     benchmark_id)
-        ret_code, _, stderr = utils.run_cmd(cmd_str, self.benchmark_path)
+        # The state is read before the analysis so that files modified
+        # during the analysis are analysed again.
+        run_state = None
+        for args in (['continue', '--hide-animation', outpath, '--id', str(benchmark_id)],
+                     ['analyse', outpath, '--id', str(benchmark_id)]):
+            ret_code, _, stderr = self._run_jube(args)
 
-        if ret_code:
-            print(stderr)
-            msg = 'Error when executing command: {}'.format(cmd_str)
-            raise RuntimeError(msg)
+            if ret_code:
+                print(stderr)
+                msg = 'Error when executing command: jube {}'.format(' '.join(args))
+                raise RuntimeError(msg)
+            if args[0] == 'continue':
+                run_state = self._run_state(benchmark_id)
 
-        cmd_str = 'jube analyse {} --id {}'.format(outpath, benchmark_id)
-        ret_code, _, stderr = utils.run_cmd(cmd_str, self.benchmark_path)
+        return run_state
 
-        if ret_code:
-            print(stderr)
-            msg = 'Error when executing command: {}'.format(cmd_str)
-            raise RuntimeError(msg)
+
+    def _run_state(self, benchmark_id):
+        ''' Return state of the files of a run directory used by the analysis,
+        see jube_run_state.run_state
+
+        Args:
+            benchmark_id (int): id of the benchmark
+
+        Returns:
+            (dict) run directory state, None if the run configuration cannot be read
+        '''
+        outpath = self.jube_files.get_bench_outputdir()
+        run_dir = self.get_bench_rundir(benchmark_id, outpath)
+        if not os.path.isfile(os.path.join(run_dir, 'configuration.xml')):
+            return None
+        analyse_files = self._get_jubexmlconfig(benchmark_id).get_analyse_files()
+        return jube_run_state.run_state(run_dir, analyse_files)
+
+
+    def _jube_outpath(self):
+        ''' Return absolute path of the benchmark output directory given to
+        jube commands, see _run_jube '''
+        return os.path.join(self.benchmark_path, self.jube_files.get_bench_outputdir())
+
+
+    def _run_jube(self, args):
+        ''' Run a jube command with the JUBE backend, with the jube command
+        in the benchmark directory if there is no backend. The working
+        directory of the process is not changed, paths must be absolute.
+
+        Args:
+            args (list): jube command arguments
+
+        Returns:
+            (tuple) return code, standard output lines, standard error lines
+        '''
+        if self.jube_backend:
+            return self.jube_backend.run(args)
+        return utils.run_cmd(' '.join(['jube'] + args), self.benchmark_path)
 
 
     def get_log(self, idb=-1):  # pylint: disable=too-many-locals
@@ -187,18 +262,9 @@ class JubeBenchmarkingAPI(BenchmarkingAPI):
         '''
         out_path = os.path.join(self.benchmark_path,
                                 self.jube_files.get_bench_outputdir())
-        # If idb equals -1 get highest id directory found in out_dir
+        # If idb equals -1 get last run
         if idb == -1:
-            dir_list = []
-            newest_result_dir = None
-
-            for fd in os.listdir(out_path):  # pylint: disable=invalid-name
-                result_dir = os.path.join(out_path, fd)
-                if os.path.isdir(result_dir):
-                    dir_list.append(result_dir)
-
-            newest_result_dir = max(dir_list, key=os.path.getmtime)
-            idb_s = newest_result_dir
+            idb_s = str(self._last_run_id(out_path)).zfill(6)
         else:
             idb_s = str(idb).zfill(6)
 
@@ -235,6 +301,22 @@ class JubeBenchmarkingAPI(BenchmarkingAPI):
             +result
 
 
+    def get_run_job_ids(self, benchmark_id):
+        ''' Get the scheduler job ids of a benchmark run
+
+        Args:
+            benchmark_id (int): id of the benchmark
+
+        Returns:
+            (list) job ids
+
+        Raises:
+            OSError if the run directory does not exist
+        '''
+        run_dir = self.get_bench_rundir(benchmark_id, self.jube_files.get_bench_outputdir())
+        return [job_id for job_id in JubeRun.read_job_ids(run_dir).values() if job_id.isdigit()]
+
+
     def get_status_info(self, benchmark_id):
         ''' Get the status for a benchmark run
 
@@ -245,29 +327,21 @@ class JubeBenchmarkingAPI(BenchmarkingAPI):
             (dict) global_status
         '''
 
-        outpath = self.jube_files.get_bench_outputdir()
-
         if not os.path.isdir(self.benchmark_path):
             raise IOError
 
-        os.chdir(self.benchmark_path)
-
+        outpath = self._jube_outpath()
         bench_steps = self.jube_files.get_bench_steps()
 
+        # Updating state with continue command, once for every step
+        self._run_jube(['continue', '--hide-animation', outpath, '--id', str(benchmark_id)])
+
         global_status = {}
         for step in bench_steps:
-            # Updating state with continue command
-            # countinue_str = 'jube continue --hide-animation
-            cmd_str = 'jube continue --hide-animation {} --id {}'.format(outpath, benchmark_id)
-            continue_cmd = Popen(cmd_str, cwd=os.getcwd(),
-                                 stdout=open(os.devnull, 'w'), shell=True,
-                                 universal_newlines=True)
-            continue_cmd.wait()
-            input_str = 'jube info {} --id {} --step {}'.format(outpath, benchmark_id, step)
-            status_from_jube = Popen(input_str, cwd=os.getcwd(), shell=True, stdout=PIPE,
-                                     universal_newlines=True)
+            _, stdout, _ = self._run_jube(['info', outpath, '--id', str(benchmark_id),
+                                           '--step', step])
             global_status[step] = []
-            for line in status_from_jube.stdout:
+            for line in stdout:
                 if re.search(r'^\s+\d+\s+\|\s+\w+\s+\|.*', line):
                     raw_values = [c.strip() for c in line.split('|')]
                     task = {}
@@ -279,13 +353,58 @@ class JubeBenchmarkingAPI(BenchmarkingAPI):
 
         return global_status
 
-    def _write_bench_data(self, benchmark_id): # pylint: disable=too-many-locals
+    def _extracted_rows(self, benchmark_rundir):
+        ''' Return rows of workpackages whose results were already extracted.
+
+        Rows are read from bench_results.yaml the first time a run directory
+        is extracted incrementally, only rows of finished workpackages are kept.
+
+        Args:
+            benchmark_rundir (str): benchmark run directory
+
+        Returns:
+            (dict) execution id -> bench_results.yaml row
+        '''
+        if benchmark_rundir not in self._extracted_runs:
+            rows = {}
+            results_file = os.path.join(benchmark_rundir, 'bench_results.yaml')
+            if os.path.isfile(results_file):
+                try:
+                    _, runs_info = data_store_yaml.DataStoreYAML().load(results_file)
+                except IOError:
+                    runs_info = None
+                for exec_id, row in (runs_info or {}).items():
+                    if row.get('results_bench', 'failed') != 'failed' and \
+                       self._workpackage_done(row.get('jube_wp_abspath')):
+                        rows[str(exec_id)] = row
+            self._extracted_runs[benchmark_rundir] = rows
+
+        return self._extracted_runs[benchmark_rundir]
+
+
+    @staticmethod
+    def _workpackage_done(wp_workdir):
+        ''' Return True if JUBE marked the workpackage of a work directory as done
+
+        Args:
+            wp_workdir (str): workpackage work directory
+        '''
+        return bool(wp_workdir) and \
+            os.path.isfile(os.path.join(os.path.dirname(wp_workdir.rstrip(os.sep)), 'done'))
+
+
+    def _write_bench_data(self, benchmark_id, incremental=False): # pylint: disable=too-many-locals
         ''' Generates benchmarks results data
 
         Writes bench_results.yaml
 
         Args:
             benchmark_id (int): id of the benchmark
+            incremental (bool): reuse rows of finished workpackages whose
+                                results were already extracted, job information
+                                is only read for other workpackages. A workpackage
+                                is finished once JUBE marked it as done or once
+                                its job is finished.
 
         Returns:
             (dict) mapping between Jube execution directories and result values
@@ -294,10 +413,18 @@ class JubeBenchmarkingAPI(BenchmarkingAPI):
         benchmark_rundir = self.get_bench_rundir(benchmark_id, outpath)
         context_names, context = self._get_execution_context(benchmark_id)
         results, field_names = self._get_results(benchmark_rundir, context_names)
-        scheduler_interface = slurmi.SlurmInterface()
+        scheduler_interface = get_scheduler_interface(self.platform)
         common_fields = [n for n in context_names if n in field_names]
+        extracted = self._extracted_rows(benchmark_rundir) if incremental else {}
         map_dir = {}
+        job_ids = {}
         for exec_id, values in context.items():
+            if exec_id in extracted:
+                context[exec_id] = extracted[exec_id]
+                exec_dir = "{}_execute".format(values['jube_wp_id'].zfill(6))
+                map_dir[exec_dir] = extracted[exec_id]['results_bench']
+                continue
+
             key_results = hashlib.md5(''.join([values[n] for n in common_fields]).encode('utf-8'))
 
             key = key_results.hexdigest()
@@ -316,13 +443,29 @@ class JubeBenchmarkingAPI(BenchmarkingAPI):
                     if re_result:
                         job_id = re_result[0]
                         values['job_id_ubench'] = job_id
-                        if scheduler_interface:
-                            job_info = scheduler_interface.get_job_info(job_id)
-                            if job_info:
-                                values.update(job_info[-1])
-                                context[exec_id].update(values)
+                        job_ids[exec_id] = job_id
                         break
 
+        # Job information and state of every workpackage are read at once
+        jobs_state = {}
+        if scheduler_interface and job_ids:
+            jobs_info = scheduler_interface.get_jobs_info(sorted(set(job_ids.values())))
+            for exec_id, job_id in job_ids.items():
+                job_info = jobs_info.get(job_id)
+                if job_info:
+                    context[exec_id].update(job_info[-1])
+            if incremental:
+                jobs_state = scheduler_interface.get_jobs_state(sorted(set(job_ids.values())))
+
+        # Results of finished workpackages are not read again by next incremental
+        # extractions, results of running jobs may be partial
+        for exec_id, values in context.items():
+            if not incremental or exec_id in extracted or values['results_bench'] == 'failed':
+                continue
+            if self._workpackage_done(values.get('jube_wp_abspath')) or \
+               jobs_state.get(job_ids.get(exec_id)) in FINISH_STATES:
+                extracted[exec_id] = values
+
 
         try:
 
@@ -363,12 +506,8 @@ class JubeBenchmarkingAPI(BenchmarkingAPI):
 
         cvsfile = jube_xml_config.get_result_cvsfile()
 
-        cmd_str = 'jube result {} --id {} -o {}'.format(outpath,
-                                                        benchmark_id,
-                                                        cvsfile)
-
-        _, stdout, _ = utils.run_cmd(cmd_str, self.benchmark_path)
-        result_array = []
+        _, stdout, _ = self._run_jube(['result', self._jube_outpath(),
+                                       '--id', str(benchmark_id), '-o', cvsfile])
         cvs_data = csv.reader(stdout)
 
         with open(os.path.join(benchmark_runpath, 'result/ubench_results.dat'), 'w') as result_file:
@@ -379,8 +518,28 @@ class JubeBenchmarkingAPI(BenchmarkingAPI):
             for row in cvs_data:
                 cvs_writer.writerow(row)
 
-        jubecvsfile_path = os.path.join(benchmark_runpath, 'result', '{}.dat'.format(cvsfile))
+        return self._read_result_array(benchmark_id, jube_xml_config)
+
+
+    def _read_result_array(self, benchmark_id, jube_xml_config=None):
+        ''' Read result array of a run from the csv file written by jube result
+
+        Args:
+            benchmark_id (int): id of the benchmark
+            jube_xml_config (JubeXMLConfig): run configuration, read if None
+
+        Returns:
+            (list) result array
+        '''
+        outpath = self.jube_files.get_bench_outputdir()
+        benchmark_runpath = os.path.join(self.benchmark_path, outpath,
+                                         self.get_bench_rundir(benchmark_id, outpath))
+        if jube_xml_config is None:
+            jube_xml_config = self._get_jubexmlconfig(benchmark_id)
+        jubecvsfile_path = os.path.join(benchmark_runpath, 'result',
+                                        '{}.dat'.format(jube_xml_config.get_result_cvsfile()))
 
+        result_array = []
         try:
             with open(jubecvsfile_path, 'r') as jubecsvfile:
                 jubereader = csv.reader(jubecsvfile)
@@ -398,19 +557,23 @@ class JubeBenchmarkingAPI(BenchmarkingAPI):
         separator = '~'
         context = {}
         outpath = self.jube_files.get_bench_outputdir()
-        jube_cmd = 'jube info ./{0} --id {1} --step execute -p -c \"{2}\"'.format(outpath,
-                                                                                  benchmark_id,
-                                                                                  separator)
-                                                                                  
-        cmd_output = tempfile.TemporaryFile(mode='w+t') if PY3_OR_LATER else tempfile.TemporaryFile()
-        result_from_jube = Popen(jube_cmd, cwd=self.benchmark_path,
-                                 shell=True, stdout=cmd_output,
-                                 universal_newlines=True)
-        ret_code = result_from_jube.wait()  # pylint: disable=unused-variable
-
-        # with cmd_output as out:
-        cmd_output.flush()
-        cmd_output.seek(0)
+        if self.jube_backend:
+            _, stdout, _ = self.jube_backend.run(['info', self._jube_outpath(), '--id',
+                                                  str(benchmark_id), '--step', 'execute',
+                                                  '-p', '-c', separator])
+            cmd_output = io.StringIO('\n'.join(stdout) + '\n')
+        else:
+            jube_cmd = 'jube info ./{0} --id {1} --step execute -p -c \"{2}\"'.format(
+                outpath, benchmark_id, separator)
+            cmd_output = tempfile.TemporaryFile(mode='w+t') if PY3_OR_LATER \
+                else tempfile.TemporaryFile()
+            result_from_jube = Popen(jube_cmd, cwd=self.benchmark_path,
+                                     shell=True, stdout=cmd_output,
+                                     universal_newlines=True)
+            result_from_jube.wait()
+
+            cmd_output.flush()
+            cmd_output.seek(0)
         jubereader = csv.DictReader(cmd_output, delimiter='~')
         context_names = jubereader.fieldnames
         for row in jubereader:
@@ -488,6 +651,8 @@ class JubeBenchmarkingAPI(BenchmarkingAPI):
             if opts['w']:
                 self._set_custom_nodes(opts['w'])
 
+        if opts.get('pack_submit'):
+            self._set_pack_submit(opts['pack_submit'])
 
         platform_dir = self.jube_files.get_platform_dir()
         self.jube_files.add_bench_input()
@@ -528,6 +693,19 @@ class JubeBenchmarkingAPI(BenchmarkingAPI):
         self.jube_files.add_custom_nodes_stub(nnodes_list, nodes_id_list)
 
 
+    def _set_pack_submit(self, submit_cmd):
+        '''  Modify benchmark xml file to queue job scripts with a node packer
+        instead of submitting them to the scheduler.
+
+        Args:
+            submit_cmd (str): command queuing a job script, see NodePacker.submit_command
+        '''
+        for subcmd in ['submit', '{submit}', 'submit_singleton', '{submit_singleton}']:
+            self.jube_files.substitute_element_text('do', None,
+                                                    re.escape('$' + subcmd + ' '),
+                                                    submit_cmd.replace('\\', r'\\') + ' ')
+
+
     def list_parameters(self, default_values):
         '''  List benchmark customisable parameters
 
@@ -561,7 +739,7 @@ class JubeBenchmarkingAPI(BenchmarkingAPI):
 
         if os.path.isdir(abs_output_path):
             if benchmark_id == 'last':
-                path_id, _ = self.get_max_id(os.listdir(abs_output_path))
+                path_id = self._last_run_id(abs_output_path)
             else:
                 path_id = benchmark_id
 
@@ -655,14 +833,24 @@ class JubeBenchmarkingAPI(BenchmarkingAPI):
         return jube_xml_config
 
 
+    def _last_run_id(self, out_path):
+        ''' Return id of the last run of out_path.
+
+        The run catalog is used if its last run directory exists, otherwise
+        run directories are listed.
+        '''
+        last_run = RunCatalog(os.path.join(self.benchmark_path, RUN_CATALOG_FILENAME)).last()
+        if last_run and os.path.isdir(os.path.join(out_path, str(last_run['id']).zfill(6))):
+            return last_run['id']
+        return self.get_max_id(os.listdir(out_path))[0]
+
+
     @staticmethod
     def get_max_id(file_list): # pylint: disable=no-self-use
         ''' Return max id directory'''
-        max_id = -1
-        ids_dict = {-1:'0000000'}
-        if file_list:
-            ids_dict = {int(id_str): id_str for id_str in file_list if id_str.isdigit()}
-            max_id = max(ids_dict.keys())
+        ids_dict = {int(id_str): id_str for id_str in file_list or [] if id_str.isdigit()}
+        ids_dict[-1] = '0000000'
+        max_id = max(ids_dict.keys())
         return max_id, ids_dict[max_id]
 
 
@@ -752,25 +940,68 @@ class JubeRun(object):
         return self._jube_returncode
 
 
-    def run(self, output_dir, benchmark_path):
-        ''' Execute benchmark '''
-        max_id = None
-        numdir = None
+    @staticmethod
+    def reserve_id(output_dir):
+        ''' Reserve the id of a new benchmark run of output_dir.
+
+        The last reserved id is kept in a file of output_dir so that the
+        directories of previous runs are only listed once. Ids of runs
+        started without ubench are skipped.
 
-        if os.path.isdir(output_dir):
-            max_id, _ = JubeBenchmarkingAPI.get_max_id(os.listdir(output_dir))
+        Args:
+            output_dir (str): benchmark output directory
 
-        input_str = 'jube run --hide-animation {}.xml --tag {}'.format(self.benchmark,
-                                                                       self.platform)
+        Returns:
+            (int) benchmark run id
+        '''
+        try:
+            if not os.path.isdir(output_dir):
+                os.makedirs(output_dir)
+            with open(os.path.join(output_dir, LAST_ID_FILE + '.lock'), 'a') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                last_id_file = os.path.join(output_dir, LAST_ID_FILE)
+                try:
+                    with open(last_id_file, 'r') as id_file:
+                        new_id = int(id_file.read()) + 1
+                except (IOError, OSError, ValueError):
+                    new_id = JubeBenchmarkingAPI.get_max_id(os.listdir(output_dir))[0] + 1
+                while os.path.exists(os.path.join(output_dir, str(new_id).zfill(6))):
+                    new_id += 1
+                with open(last_id_file, 'w') as id_file:
+                    id_file.write(str(new_id))
+                return new_id
+        except (IOError, OSError):
+            # Read-only output directory, jube run will fail if the id is taken
+            file_list = os.listdir(output_dir) if os.path.isdir(output_dir) else []
+            return JubeBenchmarkingAPI.get_max_id(file_list)[0] + 1
+
+
+    def run(self, output_dir, benchmark_path, poll_interval=0.01, max_poll_interval=0.5):
+        ''' Execute benchmark
+
+        The id of the run is reserved before jube is started, the run is
+        started once its directory exists or once jube has exited.
+
+        Args:
+            output_dir (str): benchmark output directory
+            benchmark_path (str): directory of the benchmark XML files
+            poll_interval (float): initial delay between run directory lookups in seconds
+            max_poll_interval (float): maximum delay between run directory lookups in seconds
+        '''
+        new_id = self.reserve_id(output_dir)
+        numdir = str(new_id).zfill(6)
+
+        input_str = 'jube run --hide-animation {}.xml --tag {} --id {}'.format(self.benchmark,
+                                                                              self.platform,
+                                                                              new_id)
 
         popen_obj = utils.run_cmd_bg(input_str, benchmark_path)
 
-        while popen_obj.returncode is None:
-            time.sleep(1)
-            popen_obj.poll()
-            new_id, numdir = JubeBenchmarkingAPI.get_max_id(os.listdir(output_dir))
-            if new_id != max_id:
-                break
+        while popen_obj.poll() is None and \
+              not os.path.isdir(os.path.join(output_dir, numdir)):
+            time.sleep(poll_interval)
+            poll_interval = min(max_poll_interval, poll_interval * 2)
 
         if popen_obj.returncode:
             stdout, stderr = popen_obj.communicate()
@@ -796,17 +1027,30 @@ class JubeRun(object):
 
     def extract_job_ids(self):
         ''' Get jobs' ids from directory '''
-        ## we have to get the id directory elsewhere
-        id_dir = self.result_path
+        return self.read_job_ids(self.result_path)
+
+
+    @staticmethod
+    def read_job_ids(run_dir):
+        ''' Get jobs' ids of a run directory
+
+        Args:
+            run_dir (str): JUBE run directory
+
+        Returns:
+            (dict) execute workpackage directory -> job id, empty if not found
+        '''
         dir_exec_info = {}
         dir_exec_rex = re.compile(r'^\d{6}_execute$')
         job_id_rex = re.compile(r'^\w+\s\w+\s\w+\s(\d+)$')
-        for files in os.listdir(id_dir):
+        for files in os.listdir(run_dir):
             mat = dir_exec_rex.match(files)
             if mat:
                 exec_dir = mat.group()
                 dir_exec_info[exec_dir] = ''
-                job_file_name = os.path.join(id_dir, mat.group(), 'work', 'stdout')
+                job_file_name = os.path.join(run_dir, mat.group(), 'work', 'stdout')
+                if not os.path.isfile(job_file_name):
+                    continue
                 with  open(job_file_name, 'r') as job_file:
                     for line in job_file:
                         job_mat = job_id_rex.match(line)
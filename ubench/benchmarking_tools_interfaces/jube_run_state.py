@@ -0,0 +1,114 @@
+##############################################################################
+#  This file is part of the UncleBench benchmarking tool.                    #
+#        Copyright (C) 2019 EDF SA                                           #
+#                                                                            #
+#  UncleBench is free software: you can redistribute it and/or modify        #
+#  it under the terms of the GNU General Public License as published by      #
+#  the Free Software Foundation, either version 3 of the License, or         #
+#  (at your option) any later version.                                       #
+#                                                                            #
+#  UncleBench is distributed in the hope that it will be useful,             #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the              #
+#  GNU General Public License for more details.                              #
+#                                                                            #
+#  You should have received a copy of the GNU General Public License         #
+#  along with UncleBench. If not, see <http://www.gnu.org/licenses/>.        #
+#                                                                            #
+##############################################################################
+""" Provides change detection of JUBE benchmark runs.
+
+The state of a run directory is the state of the files JUBE analysis
+depends on: the done markers of the workpackages, their analysed files
+and, for unfinished workpackages, the files of their work directory
+which tell JUBE that a job ended. ubench result keeps the state of the
+run once its results are extracted and does not run jube continue and
+analyse again until the state changes.
+"""
+
+import glob
+import json
+import os
+import re
+
+RESULT_STATE_FILE = '.ubench_result_state'
+# Files of a run directory written by ubench result
+RESULT_FILES = ['bench_results.yaml', os.path.join('result', 'ubench_results.dat')]
+_WORKPACKAGE_DIR = re.compile(r'^\d{6}_')
+_JUBE_PARAMETER = re.compile(r'\$\{?\w+\}?')
+
+
+def _file_state(path):
+    """ Return [modification time, size] of a file, None if it does not exist """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _files(directory):
+    """ Return names of the files of a directory """
+    try:
+        return [name for name in os.listdir(directory)
+                if os.path.isfile(os.path.join(directory, name))]
+    except OSError:
+        return []
+
+
+def run_state(run_dir, analyse_files):
+    """ Return the state of a JUBE run directory
+
+    Args:
+        run_dir (str): JUBE run directory
+        analyse_files (list): names of the files read by the analysers,
+                              they may contain JUBE parameters and wildcards
+
+    Returns:
+        (dict) file path relative to run_dir -> [modification time, size]
+    """
+    # Parameters of analysed file names are not known, they match any name
+    patterns = [_JUBE_PARAMETER.sub('*', name) for name in analyse_files]
+    state = {}
+    for wp_dir in sorted(os.listdir(run_dir)):
+        wp_path = os.path.join(run_dir, wp_dir)
+        if not _WORKPACKAGE_DIR.match(wp_dir) or not os.path.isdir(wp_path):
+            continue
+
+        wp_files = _files(wp_path)
+        work_path = os.path.join(wp_path, 'work')
+        paths = [os.path.join(wp_path, name) for name in wp_files]
+        if 'done' not in wp_files:
+            paths += [os.path.join(work_path, name) for name in _files(work_path)]
+        for pattern in patterns:
+            paths += glob.glob(os.path.join(work_path, pattern))
+
+        for path in paths:
+            file_state = _file_state(path)
+            if file_state:
+                state[os.path.relpath(path, run_dir)] = file_state
+
+    return state
+
+
+def read_result_state(run_dir):
+    """ Return the state of a run directory when its results were last
+    extracted, None if they were never extracted or if a result file was
+    removed. """
+    if not all(os.path.isfile(os.path.join(run_dir, name)) for name in RESULT_FILES):
+        return None
+    try:
+        with open(os.path.join(run_dir, RESULT_STATE_FILE), 'r') as state_file:
+            return json.load(state_file)
+    except (IOError, ValueError):
+        return None
+
+
+def write_result_state(run_dir, state):
+    """ Keep the state of a run directory whose results are extracted """
+    try:
+        with open(os.path.join(run_dir, RESULT_STATE_FILE), 'w') as state_file:
+            json.dump(state, state_file, sort_keys=True)
+    except IOError:
+        # Read-only run directory, results are extracted every time
+        pass
@@ -20,8 +20,51 @@
 """Unclebench global variables"""
 
 import getpass
+import os
 
 USER = getpass.getuser()
 MEM_DISK_TTL = 30 # seconds
+_CACHE_HOME = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+                           'unclebench')
+# Parsed result files cache, disabled if RESULTS_CACHE_MAX_SIZE is 0
+RESULTS_CACHE_DIR = os.environ.get('UBENCH_RESULTS_CACHE_DIR',
+                                   os.path.join(_CACHE_HOME, 'results'))
+RESULTS_CACHE_MAX_SIZE = int(os.environ.get('UBENCH_RESULTS_CACHE_MAX_SIZE',
+                                            512 * 1024 * 1024)) # bytes
+# Result file indexes of results directories, one SQLite database per directory
+RESULTS_INDEX_DIR = os.environ.get('UBENCH_RESULTS_INDEX_DIR',
+                                   os.path.join(_CACHE_HOME, 'indexes'))
+# Scheduler job states cache shared by ubench processes, not kept on disk
+# if JOB_STATE_CACHE_FILE is empty
+JOB_STATE_CACHE_FILE = os.environ.get('UBENCH_JOB_STATE_CACHE_FILE',
+                                      os.path.join(_CACHE_HOME, 'job_states.json'))
+JOB_STATE_CACHE_MAX_ENTRIES = int(os.environ.get('UBENCH_JOB_STATE_CACHE_MAX_ENTRIES', 10000))
+# Time to live of job states, other non terminal states expire after MEM_DISK_TTL
+JOB_STATE_TTL = {'PENDING': 30, 'RUNNING': 10} # seconds
+# Terminal job states are kept longer but not forever, job ids may be reused
+# once the scheduler job id counter wraps or is reset
+JOB_STATE_FINISHED_TTL = 7 * 24 * 3600 # seconds
+# Slurm job states and information are read from squeue and sacct text output (cli),
+# JSON output (json) or slurmrestd (rest)
+SLURM_BACKEND = os.environ.get('UBENCH_SLURM_BACKEND', 'cli')
+SLURMRESTD_URL = os.environ.get('UBENCH_SLURMRESTD_URL', 'http://localhost:6820')
+SLURMRESTD_API_VERSION = os.environ.get('UBENCH_SLURMRESTD_API_VERSION', 'v0.0.40')
+# Scheduler of platforms without scheduler parameter, see SCHEDULER_INTERFACE_CLASSES
+SCHEDULER = os.environ.get('UBENCH_SCHEDULER', 'slurm')
+SCHEDULER_INTERFACE_CLASSES = {
+    'slurm': 'ubench.scheduler_interfaces.slurm_interface.SlurmInterface',
+    'local': 'ubench.scheduler_interfaces.local_interface.LocalSchedulerInterface'}
+# Jobs of the local scheduler, finished jobs are removed after LOCAL_SCHEDULER_KEEP_TIME
+LOCAL_SCHEDULER_DIR = os.environ.get('UBENCH_LOCAL_SCHEDULER_DIR',
+                                     os.path.join(_CACHE_HOME, 'local_jobs'))
+LOCAL_SCHEDULER_KEEP_TIME = 7 * 24 * 3600 # seconds
+# Run catalog status of runs whose jobs are not found yet is refreshed at most
+# once every RUN_CATALOG_CHECK_INTERVAL
+RUN_CATALOG_CHECK_INTERVAL = 300 # seconds
+# jube commands are run by the jube2 package of the ubench process (inprocess)
+# or by the jube command (subprocess), the jube command is used if jube2 cannot be imported
+JUBE_BACKEND = os.environ.get('UBENCH_JUBE_BACKEND', 'inprocess')
 CAMPAIGN_DATE_FORMAT = '%Y-%m-%d_%H-%M'
+# Maximum number of campaign benchmarks launched or compiled at the same time
+CAMPAIGN_CONCURRENCY = int(os.environ.get('UBENCH_CAMPAIGN_CONCURRENCY', 4))
 BENCHMARK_API_CLASS = "ubench.benchmarking_tools_interfaces.jube_benchmarking_api.JubeBenchmarkingAPI"
@@ -21,9 +21,9 @@
 ''' Define UbenchCmd class '''
 
 
+import datetime
 import os
 from subprocess import Popen
-import yaml
 
 from ubench.core.ubench_config import UbenchConfig
 import ubench.benchmark_managers.benchmark_manager_set as bms
@@ -32,11 +32,24 @@ import ubench.benchmarking_tools_interfaces.jube_xml_parser as jube_xml_parser
 import ubench.core.fetcher as fetcher
 import ubench.data_management.comparison_writer as comparison_writer
 import ubench.data_management.report as report
+from ubench.data_management.data_store_columnar import DataStoreColumnar
+from ubench.data_management.results_cache import ResultsCache
+from ubench.data_management.history_store import (HistoryStore, HISTORY_FILENAME,
+                                                  series_change_points)
+from ubench.data_management import yaml_io
+from ubench.scheduler_interfaces.job_state_cache import JobStateCache
 from ubench.scheduler_interfaces.slurm_interface import wlist_to_scheduler_wlist
 from ubench.data_management.publisher import Campaign, Benchmark, Publisher
 import ubench.utils as utils
 
 
+def _parse_day(day):
+    ''' Return datetime of a YYYY-MM-DD string, None if day is None '''
+    if day is None:
+        return None
+    return datetime.datetime.strptime(day, '%Y-%m-%d')
+
+
 class UbenchCmd(object):
     ''' Implements Unclebench commands.
 
@@ -60,6 +73,9 @@ class UbenchCmd(object):
         fetch
         compare
         report
+        import_results
+        cache
+        history
         campaign
         publish
     '''
@@ -79,18 +95,18 @@ class UbenchCmd(object):
         self.pub_repo_str = UbenchConfig().pub_repo
         self.pub_dir = UbenchConfig().results_dir
 
-    def log(self, id_list): # pylint: disable=dangerous-default-value
+    def log(self, id_list, jobs=1): # pylint: disable=dangerous-default-value
         ''' Provides information about benchmark execution
 
         Args:
             id_list (optional): by default, it will print information on last
                                 execution for the instance benchmark and platform.
+            jobs (int): number of logs read at once
         '''
         if id_list is None:
             id_list = [-1]
 
-        for idb in id_list:
-            self.bm_set.print_log(int(idb))
+        self.bm_set.print_logs([int(idb) for idb in id_list], jobs)
 
 
     def list_parameters(self, default_values=False):
@@ -99,23 +115,40 @@ class UbenchCmd(object):
         self.bm_set.list_parameters(default_values)
 
 
-    def result(self, id_list, output_file=None): # pylint: disable=dangerous-default-value
-        ''' Prints benchmark results '''
+    def result(self, id_list, output_file=None, jobs=1, force=False):
+        ''' Prints benchmark results
+
+        Args:
+            id_list (list): run ids, last run by default
+            output_file (str): file where results are written
+            jobs (int): number of results extracted at once
+            force (bool): extract results of runs which did not change since
+                          their results were extracted
+        '''
 
         if id_list is None:
             id_list = ['last']
 
-        for idb in id_list:
-            self.bm_set.result(idb)
-            # self.bm_set.analyse(idb)
-            # self.bm_set.extract_results(idb)
-            self.bm_set.print_result_array(output_file)
+        self.bm_set.results(id_list, output_file, jobs, force)
 
 
-    def listb(self):
-        ''' Lists runs information '''
+    def listb(self, since=None, status=None, offset=0, limit=None, jobs=1):
+        ''' Lists runs information
+
+        Args:
+            since (str): only list runs launched from this YYYY-MM-DD day
+            status (str): only list runs with this status
+            offset (int): number of matching runs which are not listed
+            limit (int): maximum number of listed runs
+            jobs (int): number of benchmarks listed at once
+        '''
+        try:
+            since = _parse_day(since)
+        except ValueError as err:
+            print('Error: {}'.format(err))
+            exit(1)
 
-        self.bm_set.list_runs()
+        self.bm_set.list_runs(since, status, offset, limit, jobs)
 
 
     def run(self, opt_dict={}):  # pylint: disable=dangerous-default-value
@@ -159,7 +192,7 @@ class UbenchCmd(object):
         # we read a file which contains a dictionary with the options
         if opt_dict['file_params']:
             with open(opt_dict['file_params'], 'r') as params_file:
-                dict_options = yaml.load(params_file)
+                dict_options = yaml_io.load(params_file)
 
         # we redefine custom params
         opt_dict['custom_params'] = dict_options
@@ -173,9 +206,19 @@ class UbenchCmd(object):
         return True
 
     def campaign(self, campaign_file, result_ref=None,
-                 publish_dir=None, commit_msg=None):
-        ''' Executes campaign '''
-        campaign = CampaignManager(campaign_file, result_ref)
+                 publish_dir=None, commit_msg=None, alpha=None, pack=False,
+                 concurrency=None):
+        ''' Executes campaign
+
+        Args:
+            alpha: significance level of statistical comparisons with result_ref,
+                   raw differences are printed if None
+            pack: run jobs in a single allocation, see CampaignManager
+            concurrency: maximum number of benchmarks launched at the same time
+        '''
+        # pylint: disable=too-many-arguments
+        campaign = CampaignManager(campaign_file, result_ref, alpha=alpha, pack=pack,
+                                   concurrency=concurrency)
         campaign.init_campaign()
         campaign.run()
         if publish_dir is not None:
@@ -248,37 +291,46 @@ class UbenchCmd(object):
 
     # pylint: disable=no-self-use
     def compare(self, input_directories, benchmark_name, context=(None, None),
-                threshold=None):
+                threshold=None, jobs=1, top=None, output_format='table', alpha=None):
         ''' Compare benchmark results from different directories.
 
         Args:
             input_directories:
             benchmark_name:
             context:
+            jobs: number of processes used to load result files
+            top: only print the top rows with the largest absolute differences
+            output_format: table, csv or json
+            alpha: significance level of statistical comparisons,
+                   raw differences are printed if None
         '''
-        # pylint: disable=bad-whitespace
+        # pylint: disable=bad-whitespace,too-many-arguments
         input_directories = [ self._return_dirs(ref) for ref in input_directories ]
 
-        cwriter = comparison_writer.ComparisonWriter(threshold)
-        print('    comparing :')
-        for rdir in input_directories:
-            print('    - '+rdir)
-        print('')
-        cwriter.print_comparison(benchmark_name, input_directories, context)
+        cwriter = comparison_writer.ComparisonWriter(threshold, jobs, alpha)
+        # csv and json outputs are meant to be parsed, they are printed alone
+        if output_format == 'table':
+            print('    comparing :')
+            for rdir in input_directories:
+                print('    - '+rdir)
+            print('')
+        cwriter.print_comparison(benchmark_name, input_directories, context,
+                                 top=top, output_format=output_format)
 
 
-    def report(self, metadata_file, output_dir):
+    def report(self, metadata_file, output_dir, jobs=1):
         ''' Build a performance report.
 
         Args:
             metadata_file: file containing parameters for report build
             outpit_dir: where to store the report
+            jobs: number of processes used to load result files and write sections
         '''
         bench_template = os.path.join(UbenchConfig().templates_path, 'bench.html')
         compare_template = os.path.join(UbenchConfig().templates_path, 'compare.html')
         report_template = os.path.join(UbenchConfig().templates_path, 'report.html')
         perf_report = report.Report(metadata_file, bench_template,
-                                    compare_template, report_template)
+                                    compare_template, report_template, jobs)
         report_name = 'ubench_performance_report'
 
         print(('    Writing report {} in {} directory'.format(report_name+'.html', output_dir)))
@@ -290,6 +342,97 @@ class UbenchCmd(object):
         Popen(asciidoctor_cmd, cwd=os.getcwd(), shell=True, universal_newlines=True)
 
 
+    def import_results(self, input_dir, store_dir):
+        ''' Import YAML result files into a columnar result store.
+
+        Args:
+            input_dir: directory containing YAML result files
+            store_dir: root directory of the columnar store
+        '''
+        if not os.path.isdir(input_dir):
+            print('Cannot find {} directory'.format(input_dir))
+            exit(1)
+
+        store = DataStoreColumnar(store_dir)
+        try:
+            imported = store.import_yaml_tree(input_dir)
+        except ImportError as ierr:
+            print('Error: {}'.format(ierr))
+            exit(1)
+
+        print('    {} runs imported from {} to {}'.format(imported, input_dir, store_dir))
+
+
+    def cache(self, action):
+        ''' Print statistics of or clear the parsed results and job state caches.
+
+        Args:
+            action: 'stats' or 'clear'
+        '''
+        results_cache = ResultsCache()
+        job_state_cache = JobStateCache()
+        if action == 'clear':
+            removed = results_cache.clear()
+            print('    {} entries removed from {}'.format(removed, results_cache.cache_dir))
+            removed = job_state_cache.clear()
+            print('    {} job states removed from {}'.format(removed, job_state_cache.cache_file))
+            return
+
+        stats = results_cache.stats()
+        print('    Cache directory : {}'.format(stats['dir']))
+        print('    Entries         : {}'.format(stats['entries']))
+        print('    Size            : {:.1f} MB / {:.1f} MB'.format(stats['size'] / 1e6,
+                                                                 stats['max_size'] / 1e6))
+        print('    Hits / misses   : {} / {}'.format(stats['hits'], stats['misses']))
+        stats = job_state_cache.stats()
+        print('    Job state cache : {}'.format(stats['file']))
+        print('    Job states      : {}'.format(stats['entries']))
+
+
+    def history(self, action, options):
+        ''' Add results to or show the performance history.
+
+        History is kept in UBENCH_RESULTS_DIR.
+
+        Args:
+            action: 'add' or 'show'
+            options (dict): add options: input_dirs, campaign
+                            show options: benchmark_name, platform, metric, since,
+                            until, months, context, change_points
+        '''
+        history = HistoryStore(os.path.join(self.pub_dir, HISTORY_FILENAME))
+        if action == 'add':
+            for input_dir in options['input_dirs']:
+                added = history.add_dir(input_dir, options.get('campaign'))
+                print('    {} results added to history from {}'.format(added, input_dir))
+            return
+
+        try:
+            since = _parse_day(options.get('since'))
+            until = _parse_day(options.get('until'))
+            context = dict(item.split('=', 1) for item in options.get('context') or [])
+        except ValueError as err:
+            print('Error: {}'.format(err))
+            exit(1)
+        if options.get('months'):
+            since = datetime.datetime.now() - datetime.timedelta(days=30.44 * options['months'])
+
+        series = history.series(options['benchmark_name'], options.get('platform'),
+                                options.get('metric'), since, until, context)
+        if series.empty:
+            print('    No results found in history for {}'.format(options['benchmark_name']))
+            return
+
+        print(series.to_string(index=False))
+        if options.get('change_points'):
+            changes = series_change_points(series)
+            print('')
+            if changes.empty:
+                print('    No change point found')
+            else:
+                print(changes.to_string(index=False))
+
+
     def publish(self, options):
         ''' Guide method to Publish class functionality
 
@@ -21,26 +21,36 @@
 
 
 import logging
+import sys
 import numpy as np
 import pandas  # pylint: disable=import-error
 from matplotlib import pyplot as plt
 
-import ubench.data_management.data_store_yaml as dsy
+from ubench.data_management.data_store_columnar import get_data_store
+from ubench.data_management import result_statistics
+
+# Number of comparison rows written at once by print_comparison
+PRINT_CHUNK_SIZE = 1000
 
 
 class ComparisonWriter(object):
     """ ComparisionWriter class """
 
 
-    def __init__(self, threshold=None):
+    def __init__(self, threshold=None, workers=1, alpha=None):
         """ Class constructor
 
         Args:
             threshold
+            workers (int): number of processes used to load result files
+            alpha (float): if given, results are compared with statistics on their
+                           repetitions and only differences significant at level
+                           alpha are kept
         """
 
-        self.dstore = dsy.DataStoreYAML()
         self.threshold = threshold
+        self.workers = workers
+        self.alpha = alpha
 
 
     def write_cplot(self, c_list, sub_bench, sub_bench_list, context, output_filename):
@@ -150,17 +160,76 @@ class ComparisonWriter(object):
         plt.savefig(output_filename)
 
 
-    def print_comparison(self, benchmark_name, input_directories, context=(None, None)):
+    def print_comparison(self, benchmark_name, input_directories, context=(None, None),
+                         top=None, output_format='table', output=None):
         """ Print arrays comparating results found in different input directories
+
+        Each sub benchmark comparison is printed as soon as it is computed,
+        rows are written by chunks of PRINT_CHUNK_SIZE rows.
+
+        Args:
+            benchmark_name (str): name of the benchmark
+            input_directories (list of str): list of directories
+            context (tuple): ([ctx0_0,ctx0_1,..],ctx1)
+            top (int): only print the top rows with the largest absolute differences
+            output_format (str): table, csv or json (one JSON object per line)
+            output: file object where comparisons are written, sys.stdout if None
         """
+        # pylint: disable=too-many-arguments
+        if output is None:
+            output = sys.stdout
+
+        header = None
+        for dframe in self.iter_compare(benchmark_name, input_directories,
+                                        context_in=context):
+            if not isinstance(dframe, pandas.DataFrame):
+                continue
+            if top:
+                dframe = ComparisonWriter.top_differences(dframe, top)
+
+            if output_format == 'csv':
+                # Header is written again only if columns change
+                columns = list(dframe.columns)
+                dframe.to_csv(output, index=False, header=columns != header,
+                              chunksize=PRINT_CHUNK_SIZE)
+                header = columns
+            elif output_format == 'json':
+                for start in range(0, len(dframe), PRINT_CHUNK_SIZE):
+                    chunk = dframe.iloc[start:start + PRINT_CHUNK_SIZE]
+                    output.write(chunk.to_json(orient='records', lines=True).rstrip('\n'))
+                    output.write('\n')
+            else:
+                output.write('\n')
+                # Values are formatted and aligned the same way in every chunk
+                formatters = {column: str for column in dframe.columns}
+                col_space = {column: max([len(str(column))]
+                                         + [len(str(value)) for value in dframe[column]])
+                             for column in dframe.columns}
+                for start in range(0, max(len(dframe), 1), PRINT_CHUNK_SIZE):
+                    chunk = dframe.iloc[start:start + PRINT_CHUNK_SIZE]
+                    output.write(chunk.to_string(index=False, header=start == 0,
+                                                 col_space=col_space, formatters=formatters))
+                    output.write('\n')
+            output.flush()
+
+
+    @staticmethod
+    def top_differences(dframe, top):
+        """ Return the top rows of a comparison with the largest absolute differences
 
-        df_to_print = self.compare(benchmark_name, input_directories, context)
+        Args:
+            dframe: comparison dataframe returned by compare_pandas
+            top (int): number of rows to keep
+
+        Returns:
+            dataframe sorted by decreasing largest absolute difference
+        """
+        diff_columns = [column for column in dframe.columns if str(column).endswith('(%)')]
+        if not diff_columns:
+            return dframe.head(top)
 
-        for dframe in df_to_print:
-            print('')  # pylint: disable=superfluous-parens
-            with pandas.option_context('display.max_rows', None, 'display.max_columns',
-                                       None, 'expand_frame_repr', False):
-                print((dframe.to_string(index=False)))  # pylint: disable=superfluous-parens
+        max_diff = dframe[diff_columns].abs().max(axis=1)
+        return dframe.loc[max_diff.nlargest(top).index]
 
     def compare_pandas(self, pandas_list, context, session_list=None):
         """ Computes relative differences.
@@ -176,7 +245,7 @@ class ComparisonWriter(object):
         Returns:
             Pandas dataframe
         """
-        # pylint: disable=too-many-locals, too-many-branches, too-many-statements
+        # pylint: disable=too-many-locals, too-many-branches
 
         panda_ref = pandas_list[0]
 
@@ -194,20 +263,13 @@ class ComparisonWriter(object):
         result_columns_pre_merge = [x for x in list(panda_ref.columns.values)
                                     if x not in context[0]]
 
-        # Do all but last merges keeping the original result field name unchanged
-        idx = 0
-        pd_compare = panda_ref
-        for pdr in pandas_list[1:-1]:
-            pd_compare = pandas.merge(pd_compare, pdr, on=context[0],
-                                      suffixes=['', '_post_'+str(idx)])
-            idx += 1
+        if self.alpha is not None:
+            return self.compare_statistics(pandas_list, context, result_columns_pre_merge,
+                                           session_list)
 
-        # At last merge add a _pre suffix to reference result
-        if len(pandas_list) > 1:
-            pd_compare = pandas.merge(pd_compare, pandas_list[-1],
-                                      on=context[0], suffixes=['_pre', '_post_' + str(idx)])
-        else:
-            pd_compare = panda_ref
+        pd_compare = self._join_sessions(pandas_list, context[0], result_columns_pre_merge)
+        if pd_compare is None:
+            pd_compare = self._merge_sessions(pandas_list, context[0])
 
         pd_compare_columns_list = list(pd_compare.columns.values)
         result_columns = [x for x in pd_compare_columns_list if x not in context[0]]
@@ -221,46 +283,48 @@ class ComparisonWriter(object):
         pandas.options.mode.chained_assignment = None # Avoid useless warning
 
         # Convert numeric columns to int or float
-        # pylint: disable=unnecessary-lambda
         for ccolumn in context[0]:
-            try:
-                pd_compare[ccolumn] = pd_compare[ccolumn].apply(lambda x: int(x))
-            except: # pylint: disable=bare-except
-                try:
-                    pd_compare[ccolumn] = pd_compare[ccolumn].apply(lambda x: float(x))
-                except:
-                    continue
+            pd_compare[ccolumn] = ComparisonWriter._to_numeric_context(pd_compare[ccolumn])
 
-        # Add difference columns in % for numeric result columns
+        # Name result columns after sessions
+        n_posts = len(pandas_list[1:])
+        renamed_columns = {}
+        for rcolumn in result_columns_pre_merge:
+            renamed_columns[rcolumn + '_pre'] \
+                = session_list[0] if session_list else rcolumn + '_pre'
+            for i in range(0, n_posts):
+                renamed_columns[rcolumn + '_post_' + str(i)] \
+                    = session_list[i+1] if session_list else rcolumn + '_post_' + str(i)
+        if session_list and n_posts:
+            pd_compare.rename(columns=renamed_columns, inplace=True)
+
+        # Add difference columns in % for numeric result columns,
+        # differences to the reference are computed for every session at once
         diff_columns = []
-
         for rcolumn in result_columns_pre_merge:
-            pre_column = rcolumn + '_pre'
+            if not n_posts:
+                break
             if session_list:
-                pd_compare.rename(columns={pre_column:session_list[0]}, inplace=True)
-                pre_column = session_list[0]
-            for i in range(0, len(pandas_list[1:])):
-                post_column = rcolumn + '_post_' + str(i)
-                if session_list:
-                    pd_compare.rename(columns={post_column:session_list[i+1]}, inplace=True)
-                    post_column = session_list[i+1]
-                try:
-                    if session_list:
-                        diff_column_name = session_list[i+1] + ' vs ' + session_list[0] + '(%)'
-                    else:
-                        diff_column_name = rcolumn + '_diff_' + str(i) + '(%)'
-
-                    ref_col = pd_compare[pre_column].apply(ComparisonWriter._try_convert(np.nan,
-                                                                                         float))
-                    post_col = pd_compare[post_column].apply(ComparisonWriter._try_convert(np.nan,
-                                                                                           float))
-                    pd_compare[diff_column_name] = (post_col - ref_col) * 100 / ref_col
-                    pd_compare[diff_column_name] = pd_compare[diff_column_name].round(2)
-
-                except Exception: # pylint: disable=broad-except
-                    continue
-                else:
-                    diff_columns.append(diff_column_name)
+                diff_names = [session_list[i+1] + ' vs ' + session_list[0] + '(%)'
+                              for i in range(0, n_posts)]
+            else:
+                diff_names = [rcolumn + '_diff_' + str(i) + '(%)' for i in range(0, n_posts)]
+
+            try:
+                ref_col = pandas.to_numeric(pd_compare[renamed_columns[rcolumn + '_pre']],
+                                            errors='coerce').astype(float)
+                post_cols = pandas.DataFrame(
+                    {diff_name: pandas.to_numeric(
+                        pd_compare[renamed_columns[rcolumn + '_post_' + str(i)]],
+                        errors='coerce').astype(float)
+                     for i, diff_name in enumerate(diff_names)})
+                diffs = post_cols.sub(ref_col, axis=0).mul(100).div(ref_col, axis=0).round(2)
+            except Exception: # pylint: disable=broad-except
+                continue
+
+            for diff_name in diff_names:
+                pd_compare[diff_name] = diffs[diff_name]
+                diff_columns.append(diff_name)
 
         # Remove rows with no difference above given threshold
         if self.threshold:
@@ -270,12 +334,163 @@ class ComparisonWriter(object):
 
             # Use it as a filter :
             pd_compare = pd_compare[pd_compare.max_diff > float(self.threshold)]
-            pd_compare.drop('max_diff', 1, inplace=True)
+            pd_compare.drop('max_diff', axis=1, inplace=True)
 
         pandas.options.mode.chained_assignment = 'warn'  # Reactivate warning
         return pd_compare.sort_values(by=ctxt_columns_list)
 
 
+    def compare_statistics(self, pandas_list, context, result_columns, session_list=None):
+        """ Computes relative differences of result medians and their significance.
+
+        Every repetition of a context result is used as a sample, a context is
+        kept only if one of its differences is significant at level self.alpha
+        (Mann-Whitney U test) and above threshold.
+
+        Args:
+            pandas_list
+            context
+            result_columns (list): compared result columns
+            session_list
+
+        Returns:
+            Pandas dataframe
+        """
+        # pylint: disable=too-many-locals
+        ctxt_columns_list = list(context[0])
+        if 'nodes' in ctxt_columns_list:
+            ctxt_columns_list.insert(0, ctxt_columns_list.pop(ctxt_columns_list.index('nodes')))
+        n_posts = len(pandas_list[1:])
+
+        pd_compare = None
+        significant_columns = []
+        for rcolumn in result_columns:
+            compared = result_statistics.compare_sessions(pandas_list, ctxt_columns_list,
+                                                          rcolumn, self.alpha)
+            names = [session_list[i] if session_list else
+                     rcolumn + ('_pre' if i == 0 else '_post_' + str(i - 1))
+                     for i in range(0, n_posts + 1)]
+            renamed_columns = {}
+            for i, name in enumerate(names):
+                renamed_columns['median_' + str(i)] = name
+                renamed_columns['ci_low_' + str(i)] = name + '_ci_low'
+                renamed_columns['ci_high_' + str(i)] = name + '_ci_high'
+            for i in range(1, n_posts + 1):
+                if session_list:
+                    diff_name = names[i] + ' vs ' + names[0]
+                else:
+                    diff_name = rcolumn + '_diff_' + str(i - 1)
+                renamed_columns['diff_{}(%)'.format(i)] = diff_name + '(%)'
+                renamed_columns['p_value_' + str(i)] = diff_name + '_p_value'
+                renamed_columns['significant_' + str(i)] = diff_name + '_significant'
+                significant_columns.append((diff_name + '(%)', diff_name + '_significant'))
+
+            compared = compared.rename(columns=renamed_columns)
+            compared = compared[ctxt_columns_list + [column for column in compared.columns
+                                                     if column in renamed_columns.values()]]
+            if pd_compare is None:
+                pd_compare = compared
+            else:
+                pd_compare = pd_compare.merge(compared, on=ctxt_columns_list, how='inner')
+
+        for ccolumn in ctxt_columns_list:
+            pd_compare[ccolumn] = ComparisonWriter._to_numeric_context(pd_compare[ccolumn])
+
+        # Keep contexts with at least one significant difference above threshold
+        threshold = float(self.threshold) if self.threshold else 0.0
+        keep = pandas.Series(False, index=pd_compare.index)
+        for diff_name, significant in significant_columns:
+            keep |= pd_compare[significant] & (pd_compare[diff_name].abs() > threshold)
+        pd_compare = pd_compare[keep].drop([significant for _, significant in significant_columns],
+                                           axis=1)
+
+        return pd_compare.sort_values(by=ctxt_columns_list).reset_index(drop=True)
+
+
+    @staticmethod
+    def _join_sessions(pandas_list, context_columns, result_columns):
+        """ Join session pandas on their context columns in one indexed operation.
+
+        Result columns are suffixed as in _merge_sessions: _pre for the reference
+        and _post_<i> for other sessions.
+
+        Args:
+            pandas_list: session pandas, the first one is the reference
+            context_columns (list): columns identifying a measure
+            result_columns (list): other columns of reference panda
+
+        Returns:
+            Pandas dataframe, None if pandas cannot be joined on an index
+            (duplicated contexts, different result columns)
+        """
+        if len(pandas_list) < 2 or not context_columns:
+            return None
+
+        indexed_list = []
+        for idx, panda in enumerate(pandas_list):
+            if sorted(panda.columns.values) != sorted(context_columns + result_columns):
+                return None
+            indexed = panda.set_index(context_columns)
+            if not indexed.index.is_unique:
+                return None
+            suffix = '_pre' if idx == 0 else '_post_' + str(idx - 1)
+            indexed_list.append(indexed[result_columns].add_suffix(suffix))
+
+        return pandas.concat(indexed_list, axis=1, join='inner').reset_index()
+
+
+    @staticmethod
+    def _merge_sessions(pandas_list, context_columns):
+        """ Merge session pandas one after another on their context columns.
+
+        Args:
+            pandas_list: session pandas, the first one is the reference
+            context_columns (list): columns identifying a measure
+
+        Returns:
+            Pandas dataframe
+        """
+        # Do all but last merges keeping the original result field name unchanged
+        idx = 0
+        pd_compare = pandas_list[0]
+        for pdr in pandas_list[1:-1]:
+            pd_compare = pandas.merge(pd_compare, pdr, on=context_columns,
+                                      suffixes=['', '_post_'+str(idx)])
+            idx += 1
+
+        # At last merge add a _pre suffix to reference result
+        if len(pandas_list) > 1:
+            pd_compare = pandas.merge(pd_compare, pandas_list[-1],
+                                      on=context_columns, suffixes=['_pre', '_post_' + str(idx)])
+
+        return pd_compare
+
+
+    @staticmethod
+    def _to_numeric_context(column):
+        """ Convert a context column to int or float if every value can be converted """
+        try:
+            numbers = pandas.to_numeric(column)
+        except (TypeError, ValueError):
+            numbers = None
+
+        if numbers is not None and numbers.dtype.kind in 'iuf':
+            if numbers.dtype.kind == 'f' and column.dtype.kind == 'f' \
+               and np.isfinite(numbers).all():
+                # float values are truncated as by int()
+                return numbers.astype(int)
+            return numbers
+
+        # pylint: disable=unnecessary-lambda
+        try:
+            return column.apply(lambda x: int(x))
+        except: # pylint: disable=bare-except
+            try:
+                return column.apply(lambda x: float(x))
+            except: # pylint: disable=bare-except
+                return column
+
+
     @staticmethod
     def _try_convert(default, *types):
         """ Internal method """
@@ -291,10 +506,26 @@ class ComparisonWriter(object):
 
 
     def compare(self, benchmark_name, input_directories, date_interval_list=None,
-                context_in=(None, None), session_list=None, result_filter=None):
+                context_in=(None, None), session_list=None, result_filter=None,
+                runs_lists=None):
         """ Compare results of each input directory/date_interval combination,
         results from first combination are considered as the reference.
 
+        Returns the list of comparisons computed by iter_compare, arguments
+        are those of iter_compare.
+        """
+        # pylint: disable=too-many-arguments
+        return list(self.iter_compare(benchmark_name, input_directories, date_interval_list,
+                                      context_in, session_list, result_filter, runs_lists))
+
+
+    def iter_compare(self, benchmark_name, input_directories, date_interval_list=None,
+                     context_in=(None, None), session_list=None, result_filter=None,
+                     runs_lists=None):
+        """ Compare results of each input directory/date_interval combination,
+        results from first combination are considered as the reference.
+        A comparison dataframe is yielded for each sub benchmark.
+
         Args:
             benchmark_name (str): name of the benchmark
             input_directories (list of str): list of directories
@@ -304,6 +535,9 @@ class ComparisonWriter(object):
             session_list (list):
             result_filter (dic): keys are benchmark name, values are names of the measure to keep.
                                   No value means that all measures will be considered.
+            runs_lists (list): for each input directory, benchmark runs already loaded
+                               by DataStore.load_dir. Runs are read from input
+                               directories if None.
         """
         # pylint: disable=too-many-arguments, too-many-locals, too-many-branches
 
@@ -313,19 +547,26 @@ class ComparisonWriter(object):
         metadata = {}  # pylint: disable=unused-variable
         config_list = []
 
-        if date_interval_list:
-            for rdir, d_interval in zip(input_directories, date_interval_list):
-                config_list.append((rdir, d_interval))
-        else:
-            for rdir in input_directories:
-                config_list.append((rdir, (None, None)))
+        if not date_interval_list:
+            date_interval_list = [(None, None)] * len(input_directories)
+        if runs_lists is None:
+            runs_lists = [None] * len(input_directories)
+        for rdir, d_interval, runs_list in zip(input_directories, date_interval_list, runs_lists):
+            config_list.append((rdir, d_interval, runs_list))
 
-        for input_dir, date_interval in config_list:
+        for input_dir, date_interval, runs_list in config_list:
 
-            metadata, current_panda, current_context, current_sub_bench \
-                = self.dstore.dir_to_pandas(input_dir, benchmark_name,
+            dstore = get_data_store(input_dir)
+            if runs_list is not None:
+                metadata, current_panda, current_context, current_sub_bench \
+                    = dstore.runs_to_pandas(runs_list, benchmark_name,
                                             date_interval, context_in,
                                             result_filter)
+            else:
+                metadata, current_panda, current_context, current_sub_bench \
+                    = dstore.dir_to_pandas(input_dir, benchmark_name,
+                                           date_interval, context_in,
+                                           result_filter, self.workers)
             if current_panda.empty:
                 continue
 
@@ -341,17 +582,17 @@ class ComparisonWriter(object):
             if sub_bench and current_sub_bench != sub_bench:
                 print('Different sub benchs found: {} and {}. Cannot compare results.'
                       .format(current_sub_bench, sub_bench))
-                return []
+                return
             else:
                 sub_bench = current_sub_bench
 
         if not pandas_list:
             print('No ubench results data found in given'
                   ' directories or not well-formated data')  # pylint: disable=superfluous-parens
-            return []
+            return
 
         if all(panda.empty for panda in pandas_list):
-            return []  # pylint: disable=superfluous-parens
+            return
 
         # List sub_benchs
         if not sub_bench:
@@ -362,7 +603,6 @@ class ComparisonWriter(object):
             sub_bench_list = pandas_list[0][sub_bench].unique().tolist()
 
         # Do a comparison for each sub_bench
-        pandas_result_list = []
         for s_bench in sub_bench_list:
             pandas_list_sub = []
             if s_bench:
@@ -371,6 +611,4 @@ class ComparisonWriter(object):
             else:
                 pandas_list_sub = pandas_list
 
-            pandas_result_list.append(self.compare_pandas(pandas_list_sub, context, session_list))
-
-        return pandas_result_list
+            yield self.compare_pandas(pandas_list_sub, context, session_list)
@@ -21,6 +21,7 @@
 
 import abc
 import datetime
+import multiprocessing as mp
 import os
 import pandas # pylint: disable=import-error
 import six
@@ -40,6 +41,46 @@ def _read_date(date_str):
     return date_time
 
 
+def _try_int(value):
+    """ Return value converted to int, value itself if it cannot be converted """
+    try:
+        return int(value)
+    except:  # pylint: disable=bare-except
+        return value
+
+
+def _load_worker(args):
+    """ Load a data file, used by worker processes.
+
+    Args:
+        args (tuple): data store and file name
+
+    Returns:
+        (filename, metadata, runs_info) tuple
+    """
+    dstore, filename = args
+    metadata, runs_info = dstore.load(filename)
+    return filename, metadata, runs_info
+
+
+def _file_to_panda_worker(args):
+    """ Build the dataframe of a data file, used by worker processes.
+
+    Args:
+        args (tuple): data store followed by file_to_panda arguments
+
+    Returns:
+        file_to_panda result, None if loading asked to exit
+    """
+    dstore, filename, benchmark_name, date_interval, context, result_names = args
+    try:
+        return dstore.file_to_panda(filename, benchmark_name, date_interval, context,
+                                    result_names=result_names)
+    except SystemExit:
+        # Worker processes cannot exit on behalf of the main process
+        return None
+
+
 @six.add_metaclass(abc.ABCMeta)
 class DataStore(object):
     """ Load, write, extract data from unclebench performance results data files.
@@ -47,9 +88,14 @@ class DataStore(object):
     Methods
         write:
         load:
+        load_results:
         extract_data_from_file:
         file_to_panda:
+        run_to_panda:
+        iter_dir_pandas:
         dir_to_pandas:
+        load_dir:
+        runs_to_pandas:
     """
 
     def __init__(self):
@@ -79,7 +125,44 @@ class DataStore(object):
         pass
 
 
-    def extract_data_from_file(self, filename, benchmark_name, date_interval=None):
+    def load_results(self, input_file, result_names=None, context_columns=None):
+        """ Load the runs of a data file that are needed to build a result dataframe.
+
+        Backends able to read a subset of a data file should override this
+        method. Default implementation loads the whole file.
+
+        Args:
+            input_file (str): data file
+            result_names (list): if set, only these result fields are needed
+            context_columns (list): if set, only these run fields are needed as context
+
+        Returns:
+            A (metadata, runs_info) tuple
+        """
+        # pylint: disable=unused-argument
+        return self.load(input_file)
+
+
+    def _list_data_files(self, data_dir, benchmark_name, date_interval=None):
+        """ Yield paths of data files under data_dir that may contain results
+        of benchmark_name in date_interval.
+
+        Default implementation walks every file of data_dir, backends with an
+        indexed or partitioned layout should override it.
+
+        Args:
+            data_dir (str): results directory
+            benchmark_name (str): name of the benchmark
+            date_interval: tuple with two datetime objects
+        """
+        # pylint: disable=unused-argument
+        for (dirpath, dirnames, filenames) in os.walk(data_dir):  # pylint: disable=unused-variable
+            for fname in filenames:
+                yield os.path.join(dirpath, fname)
+
+
+    def extract_data_from_file(self, filename, benchmark_name, date_interval=None,
+                               result_names=None, context_columns=None):
         """ Extract benchmark performance data from a file.
 
         Data are extracted if the benchmark date lies in date_interval and
@@ -90,6 +173,8 @@ class DataStore(object):
             benchmark_name: name of the benchmark.
             date_interval: tuple with two dates with the following format :
                            Tue May 18 14:12:02 2038
+            result_names: result fields to load, every field if None.
+            context_columns: run fields to load as context, every field if None.
 
         Returns:
             A tuple containaing two dictionnaries, one with metadata which is
@@ -97,7 +182,22 @@ class DataStore(object):
             each run.
         """
 
-        metadata, data = self.load(filename)
+        metadata, data = self.load_results(filename, result_names, context_columns)
+        return self._select_run(metadata, data, benchmark_name, date_interval)
+
+
+    @staticmethod
+    def _select_run(metadata, data, benchmark_name, date_interval=None):
+        """ Return (metadata, data) if the run is a benchmark_name run whose date lies
+        in date_interval, (None, None) otherwise.
+
+        Args:
+            metadata (dict): run metadata
+            data (dict): execution id -> execution information
+            benchmark_name: name of the benchmark.
+            date_interval: tuple with two datetime objects, None bounds are not checked
+                           and runs without a readable Date are kept
+        """
         if not data:
             return (None, None)
 
@@ -105,10 +205,16 @@ class DataStore(object):
         if benchmark_name != metadata['Benchmark_name']:
             return(None, None)
 
-        # Check if dates correspond
-        if date_interval:
-            run_date = _read_date(metadata['Date'])
-            if (run_date < date_interval[0]) or (run_date > date_interval[1]):
+        # Check if dates correspond, a None bound is not checked and runs
+        # without a readable date are kept
+        if date_interval and any(date_interval):
+            try:
+                run_date = _read_date(metadata['Date'])
+            except (KeyError, TypeError, ValueError):
+                run_date = None
+            if run_date and date_interval[0] and run_date < date_interval[0]:
+                return(None, None)
+            if run_date and date_interval[1] and run_date > date_interval[1]:
                 return(None, None)
 
         return(metadata, data)
@@ -116,7 +222,7 @@ class DataStore(object):
 
     def file_to_panda(self, filename, benchmark_name,
                       date_interval=None, context=(None, None),
-                      d_filter=None):
+                      d_filter=None, result_names=None):
         """ Return a panda from a file if it is an unclebench performance data file
         with date and benchmark name correponding to those given as argument.
 
@@ -125,6 +231,9 @@ class DataStore(object):
             benchmark_name
             date_interval
             context
+            d_filter
+            result_names (list): names of the measures to load, all measures
+                                 are loaded if None.
         """
         # pylint: disable=too-many-locals, too-many-branches, too-many-statements
 
@@ -137,14 +246,40 @@ class DataStore(object):
 
             return filter_data
 
+        # Context fields given by the caller, restricting loaded columns
+        context_columns = None
+        if context[0]:
+            context_columns = list(context[0]) + ([context[1]] if context[1] else [])
+        if result_names and context_columns:
+            # Result fields used as context (ex: IMB message size) must be loaded
+            result_names = list(result_names) + context_columns
+
         if date_interval:
-            metadata, data = self.extract_data_from_file(filename, benchmark_name, date_interval)
+            metadata, data = self.extract_data_from_file(filename, benchmark_name, date_interval,
+                                                         result_names, context_columns)
         elif d_filter:
             metadata, data = self.load(filename)
             data = get_data(data, d_filter)
         else:
             metadata, data = self.load(filename)
 
+        return self.run_to_panda(metadata, data, benchmark_name, context)
+
+
+    def run_to_panda(self, metadata, data, benchmark_name, context=(None, None)):
+        """ Return a panda from a run already loaded.
+
+        Args:
+            metadata (dict): run metadata, None if the run does not correspond
+            data (dict): execution id -> execution information
+            benchmark_name
+            context
+
+        Returns:
+            (metadata, dataframe, context, sub_bench) tuple as file_to_panda
+        """
+        # pylint: disable=too-many-branches
+
         if not context[0]:
             context = ([], context[1])
         if not context[1]:
@@ -176,13 +311,6 @@ class DataStore(object):
         for id_exec in sorted(data.keys()):  # This guarantees the order of nodes
             result_name_column = metadata['Benchmark_name'] + '_results'
 
-        # Build report_info dictionnary
-        report_info = {}
-        for column in context[0] + ['result']:
-            report_info[column] = []
-        if result_name_column:
-            report_info[result_name_column] = []
-
         # Check if contexts are coherent
         if context[0] and context[1]:
             for ctx in context[0]:
@@ -191,9 +319,130 @@ class DataStore(object):
                           .format(ctx))  # pylint: disable=superfluous-parens
                     return({}, pandas.DataFrame(), (None, None), None)
 
+        df_report_info = self._build_report_frame(data, context, full_context,
+                                                  result_name_column)
+        if df_report_info is None:
+            df_report_info = self._build_report_frame_by_row(data, context, full_context,
+                                                             result_name_column, benchmark_name)
+
+        # Case where the bench has too many iterations
+        if data and int(data[sorted(data.keys())[-1]]['jube_step_iterations']) >= 10:
+            df_report_info = df_report_info.drop_duplicates()
+        # Return a tuple
+        return (metadata, df_report_info, context, result_name_column)
+
+
+    @staticmethod
+    def _build_report_frame(data, context, full_context, result_name_column):
+        """ Build the result dataframe of a file with column wise operations.
+
+        Each (execution, result field) pair gives a record, records with list
+        valued results (ex: IMB message sizes used as context) are exploded
+        into one row per value.
+
+        Args:
+            data (dict): execution id -> execution information
+            context (tuple): ([column contexts], row context)
+            full_context (list): every context field
+            result_name_column (str): name of the column holding result field names
+
+        Returns:
+            pandas.DataFrame, None if data layout needs _build_report_frame_by_row
+        """
+        # pylint: disable=too-many-locals, too-many-branches, too-many-return-statements
+        columns = context[0] + ['result', result_name_column]
+        if context[1] and context[1] not in columns:
+            columns.append(context[1])
+
+        records = []
+        list_context = set()
+        for id_exec in sorted(data.keys()):  # This guarantees the order of nodes
+            value = data[id_exec]
+            results = value['results_bench']
+            if not isinstance(results, dict):
+                return None
+
+            # Result categories can be considered as context
+            context_key = [key for key in sorted(results) if key in full_context]
+            if len(context_key) > 1:
+                return None
+            list_context.add(context_key[0] if context_key else None)
+            if len(list_context) > 1:
+                return None
+
+            fields = [column for column in full_context if column not in context_key]
+            if any(column not in value for column in fields):
+                return None
+            record = {column: value[column] for column in fields}
+
+            for key, result in sorted(results.items()):
+                if key in full_context:
+                    continue
+                current = dict(record)
+                current['result'] = result
+                current[result_name_column] = key
+                if context_key:
+                    ctx_values = results[context_key[0]]
+                    if not isinstance(result, list) or not isinstance(ctx_values, list) \
+                       or not result or len(ctx_values) < len(result):
+                        return None
+                    current[context_key[0]] = ctx_values[:len(result)]
+                records.append(current)
+
+        ctx_key = list_context.pop() if list_context else None
+        if not records or ctx_key in ('result', result_name_column):
+            return None
+
+        frame = pandas.DataFrame.from_records(records, columns=columns)
+        if ctx_key is None:
+            return frame
+
+        frame = frame.explode([ctx_key, 'result'], ignore_index=True)
+        frame['result'] = frame['result'].infer_objects()
+
+        # Context values are converted to int when they all can be
+        ctx_values = frame[ctx_key].tolist()
+        try:
+            numbers = pandas.to_numeric(frame[ctx_key])
+        except (TypeError, ValueError):
+            numbers = None
+        if numbers is not None and numbers.dtype.kind == 'i':
+            frame[ctx_key] = numbers
+        else:
+            frame[ctx_key] = pandas.Series([_try_int(val) for val in ctx_values]).infer_objects()
+
+        return frame
+
+
+    @staticmethod
+    def _build_report_frame_by_row(data, context, full_context, result_name_column,
+                                   benchmark_name):
+        """ Build the result dataframe of a file row by row.
+
+        Handles every data layout, used when _build_report_frame cannot.
+
+        Args:
+            data (dict): execution id -> execution information
+            context (tuple): ([column contexts], row context)
+            full_context (list): every context field
+            result_name_column (str): name of the column holding result field names
+            benchmark_name (str): name of the benchmark
+
+        Returns:
+            pandas.DataFrame
+        """
+        # pylint: disable=too-many-branches, too-many-nested-blocks
+
+        # Build report_info dictionnary
+        report_info = {}
+        for column in context[0] + ['result']:
+            report_info[column] = []
+        if result_name_column:
+            report_info[result_name_column] = []
+
         # Fill report_info
         # This guarantees the order of nodes
-        for id_exec in sorted(data.keys()):  # pylint: disable=too-many-nested-blocks
+        for id_exec in sorted(data.keys()):
             value = data[id_exec]
 
             # Result categories can be considered as context
@@ -218,11 +467,8 @@ class DataStore(object):
                                 if not column in report_info:
                                     report_info[column] = []
                                 report_info[column].append(value[column])
-                            try:
-                                report_info[ctx_key].append(
-                                    int(value['results_bench'][ctx_key][index]))
-                            except:  # pylint: disable=bare-except
-                                report_info[ctx_key].append(value['results_bench'][ctx_key][index])
+                            report_info[ctx_key].append(
+                                _try_int(value['results_bench'][ctx_key][index]))
                             report_info['result'].append(res)
                             if result_name_column:
                                 report_info[result_name_column].append(key)
@@ -241,17 +487,71 @@ class DataStore(object):
                     if result_name_column:
                         report_info[result_name_column].append(key)
 
-        df_report_info = pandas.DataFrame(report_info)
-        # Case where the bench has too many iterations
-        if int(value['jube_step_iterations']) >= 10:
-            df_report_info = df_report_info.drop_duplicates()
-        # Return a tuple
-        return (metadata, df_report_info, context, result_name_column)
+        return pandas.DataFrame(report_info)
+
+
+    def iter_dir_pandas(self, data_dir, benchmark_name,
+                        date_interval=None, context=(None, None),
+                        result_filter=None, workers=1):
+        """ Load every data file found in "data_dir" and yield, for each file
+        containing results of benchmark_name, its metadata and dataframe.
+
+        Files are parsed by a pool of worker processes if workers is greater than 1,
+        they are yielded in the same order as with a single worker.
+
+        Args:
+            data_dir
+            benchmark_name
+            date_interval
+            context
+            result_filter (dic): keys are benchmark name, values are names of the measure to keep.
+                                  No value means that all measures will be considered.
+            workers (int): number of processes used to parse files
+
+        Yields:
+            (metadata, dataframe, context, sub_bench) tuples
+        """
+        # pylint: disable=too-many-arguments
+
+        if not os.path.isdir(data_dir):
+            print(('Cannot find ' + data_dir + ' directory'))  # pylint: disable=superfluous-parens
+            exit(1)
+
+        result_names = None
+        if result_filter and result_filter.get(benchmark_name):
+            result_names = result_filter[benchmark_name]
+
+        tasks = [(self, filename, benchmark_name, date_interval, context, result_names)
+                 for filename in self._list_data_files(data_dir, benchmark_name, date_interval)]
+
+        pool = None
+        if workers and workers > 1 and len(tasks) > 1:
+            pool = mp.Pool(min(workers, len(tasks)))
+            file_pandas = pool.imap(_file_to_panda_worker, tasks,
+                                    chunksize=max(1, len(tasks) // (4 * workers)))
+        else:
+            file_pandas = (_file_to_panda_worker(task) for task in tasks)
+
+        try:
+            for file_panda in file_pandas:
+                if file_panda is None:
+                    exit(1)
+
+                metadata, current_panda, current_context, current_sub_bench = file_panda
+                if current_panda.empty:
+                    continue
+
+                current_panda = self._filter_results(current_panda, benchmark_name, result_names)
+                yield metadata, current_panda, current_context, current_sub_bench
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
 
 
     def dir_to_pandas(self, data_dir, benchmark_name,
                       date_interval=None, context=(None, None),
-                      result_filter=None):
+                      result_filter=None, workers=1):
         """ Load every data file found in "data_dir" and return a list
         of dictionnaries, each one containing data from a file.
 
@@ -262,69 +562,152 @@ class DataStore(object):
             context
             result_filter (dic): keys are benchmark name, values are names of the measure to keep.
                                   No value means that all measures will be considered.
+            workers (int): number of processes used to parse files
         """
-        # pylint: disable=too-many-locals, too-many-branches, too-many-arguments
+        # pylint: disable=too-many-arguments
+
+        return self._concat_pandas(self.iter_dir_pandas(data_dir, benchmark_name,
+                                                        date_interval, context,
+                                                        result_filter, workers),
+                                   benchmark_name)
+
+
+    @staticmethod
+    def _concat_pandas(file_pandas, benchmark_name):
+        """ Concatenate per file pandas.
+
+        Args:
+            file_pandas: iterable of (metadata, dataframe, context, sub_bench) tuples
+            benchmark_name
 
-        concatenated_panda = pandas.DataFrame()
+        Returns:
+            (concatenated metadata, dataframe, context, sub_bench) tuple
+        """
+        panda_list = []
         result_context = None
         sub_bench = None
         concatenated_metadata = {}
 
+        for metadata, current_panda, current_context, current_sub_bench in file_pandas:
+
+            panda_list.append(current_panda)
+
+            for field, value in list(metadata.items()):
+                if not field in concatenated_metadata:
+                    concatenated_metadata[field] = []
+                concatenated_metadata[field].append(value)
+
+            if (result_context) and (result_context != current_context):
+                print('Different result files structure for benchmark {}.'
+                      .format(benchmark_name))
+                print('Different context found : {} and {}'
+                      .format(str(current_context), str(result_context)))
+            else:
+                result_context = current_context
+
+            if (sub_bench) and (sub_bench != current_sub_bench):
+                print('Different result files structure for benchmark {}.'
+                      .format(benchmark_name))
+                print('Two different result_bench fields : {} and {}'
+                      .format(current_sub_bench, sub_bench))
+            else:
+                sub_bench = current_sub_bench
+
+        if not result_context:
+            result_context = (None, None)
+
+        # Frames are concatenated once, concatenating them one after another
+        # copies accumulated data for every file.
+        if len(panda_list) > 1:
+            concatenated_panda = pandas.concat(panda_list)
+        elif panda_list:
+            concatenated_panda = panda_list[0]
+        else:
+            concatenated_panda = pandas.DataFrame()
+
+        return concatenated_metadata, concatenated_panda, result_context, sub_bench
+
+
+    def load_dir(self, data_dir, workers=1):
+        """ Load every data file found in data_dir once.
+
+        Runs of every benchmark are kept in memory so that dataframes of
+        several benchmarks, contexts and date intervals can be built
+        with runs_to_pandas without reading files again.
+
+        Args:
+            data_dir (str): results directory
+            workers (int): number of processes used to parse files
+
+        Returns:
+            (dict) benchmark name -> list of (metadata, runs_info) tuples in file order
+        """
         if not os.path.isdir(data_dir):
             print(('Cannot find ' + data_dir + ' directory'))  # pylint: disable=superfluous-parens
             exit(1)
 
-        for (dirpath, dirnames, filenames) in os.walk(data_dir):  # pylint: disable=unused-variable
-            for fname in filenames:
-                metadata, current_panda, current_context, current_sub_bench \
-                    = self.file_to_panda(os.path.join(dirpath, fname), \
-                                          benchmark_name, date_interval, context)
+        tasks = [(self, filename) for filename in self._list_data_files(data_dir, None)]
+        if workers and workers > 1 and len(tasks) > 1:
+            pool = mp.Pool(min(workers, len(tasks)))
+            try:
+                loaded = pool.map(_load_worker, tasks,
+                                  chunksize=max(1, len(tasks) // (4 * workers)))
+            finally:
+                pool.terminate()
+                pool.join()
+        else:
+            loaded = [_load_worker(task) for task in tasks]
+
+        dir_runs = {}
+        for _, metadata, runs_info in loaded:
+            if not metadata or not runs_info or 'Benchmark_name' not in metadata:
+                continue
+            dir_runs.setdefault(metadata['Benchmark_name'], []).append((metadata, runs_info))
+
+        return dir_runs
+
 
+    def runs_to_pandas(self, runs_list, benchmark_name,
+                       date_interval=None, context=(None, None),
+                       result_filter=None):
+        """ dir_to_pandas equivalent working on runs loaded by load_dir.
+
+        Args:
+            runs_list (list): (metadata, runs_info) tuples
+            benchmark_name
+            date_interval
+            context
+            result_filter (dic): keys are benchmark name, values are names of the measure to keep.
+                                  No value means that all measures will be considered.
+        """
+        # pylint: disable=too-many-arguments
+        result_names = None
+        if result_filter and result_filter.get(benchmark_name):
+            result_names = result_filter[benchmark_name]
+
+        def run_pandas():  # pylint: disable=missing-docstring
+            for metadata, runs_info in runs_list:
+                metadata, runs_info = self._select_run(metadata, runs_info,
+                                                       benchmark_name, date_interval)
+                metadata, current_panda, current_context, current_sub_bench \
+                    = self.run_to_panda(metadata, runs_info, benchmark_name, context)
                 if current_panda.empty:
                     continue
+                current_panda = self._filter_results(current_panda, benchmark_name, result_names)
+                yield metadata, current_panda, current_context, current_sub_bench
 
-                # Apply filter to results, usefull to avoid printing part of benchmark
-                # results that would not be meaningfull.
-                if result_filter:
-                    if benchmark_name in result_filter:
-                        if result_filter[benchmark_name]:
-                            result_field_name = benchmark_name+"_results"
-                            current_panda = current_panda[
-                                current_panda[result_field_name].
-                                isin(result_filter[benchmark_name])]
-
-                if concatenated_panda.empty:
-                    concatenated_panda = current_panda
-                else:
-                    concatenated_panda = pandas.concat(# pylint: disable=redefined-variable-type
-                        [concatenated_panda, current_panda]
-                    )
-
-                for field, value in list(metadata.items()):
-                    if not field in concatenated_metadata:
-                        concatenated_metadata[field] = []
-                    concatenated_metadata[field].append(value)
-
-                if (result_context) and (result_context != current_context):
-                    print('Different result files structure for benchmark {}.'
-                          .format(benchmark_name))
-                    print('Different context found : {} and {}'
-                          .format(str(current_context), str(result_context)))
-                else:
-                    result_context = current_context
+        return self._concat_pandas(run_pandas(), benchmark_name)
 
-                if (sub_bench) and (sub_bench != current_sub_bench):
-                    print('Different result files structure for benchmark {}.'
-                          .format(benchmark_name))
-                    print('Two different result_bench fields : {} and {}'
-                          .format(current_sub_bench, sub_bench))
-                else:
-                    sub_bench = current_sub_bench
 
-        if not result_context:
-            result_context = (None, None)
-
-        return concatenated_metadata, concatenated_panda, result_context, sub_bench
+    @staticmethod
+    def _filter_results(panda, benchmark_name, result_names):
+        """ Keep rows of result fields listed in result_names, every row if None """
+        # Apply filter to results, usefull to avoid printing part of benchmark
+        # results that would not be meaningfull.
+        if result_names:
+            result_field_name = benchmark_name+"_results"
+            panda = panda[panda[result_field_name].isin(result_names)]
+        return panda
 
 
     def compaire_bench_runs(self, pre_result_file, post_result_file, result_filter, run_context):
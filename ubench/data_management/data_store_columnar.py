@@ -0,0 +1,340 @@
+##############################################################################
+#  This file is part of the UncleBench benchmarking tool.                    #
+#        Copyright (C) 2019 EDF SA                                           #
+#                                                                            #
+#  UncleBench is free software: you can redistribute it and/or modify        #
+#  it under the terms of the GNU General Public License as published by      #
+#  the Free Software Foundation, either version 3 of the License, or         #
+#  (at your option) any later version.                                       #
+#                                                                            #
+#  UncleBench is distributed in the hope that it will be useful,             #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the              #
+#  GNU General Public License for more details.                              #
+#                                                                            #
+#  You should have received a copy of the GNU General Public License         #
+#  along with UncleBench. If not, see <http://www.gnu.org/licenses/>.        #
+#                                                                            #
+##############################################################################
+""" Provides DataStoreColumnar class """
+
+import datetime
+import hashlib
+import json
+import os
+
+from ubench.data_management.data_store import DataStore, _read_date
+from ubench.data_management.data_store_yaml import DataStoreYAML
+
+# Empty file written at the root of a columnar store, used to detect its layout
+STORE_MARKER = '.ubench_columnar'
+# Key of the parquet footer entry holding run metadata
+METADATA_KEY = b'ubench'
+
+RESULT_NAME = 'result_name'
+RESULT_VALUE = 'result_value'
+# Run fields always needed to build a result dataframe
+REQUIRED_COLUMNS = ['id', 'context_fields', 'jube_step_iterations']
+
+
+def _import_pyarrow():
+    """ Import pyarrow modules needed to read and write parquet files.
+
+    Returns:
+        (pyarrow, pyarrow.parquet) modules
+
+    Raises:
+        ImportError if pyarrow is not installed
+    """
+    try:
+        import pyarrow  # pylint: disable=import-error
+        import pyarrow.parquet as parquet  # pylint: disable=import-error
+    except ImportError:
+        raise ImportError('pyarrow is needed to use columnar result stores,'
+                          ' please install it (pip install pyarrow)')
+    return pyarrow, parquet
+
+
+def is_columnar_store(data_dir):
+    """ Return True if data_dir is the root of a columnar result store """
+    return os.path.isfile(os.path.join(data_dir, STORE_MARKER))
+
+
+def get_data_store(data_dir):
+    """ Return the DataStore able to read results found in data_dir.
+
+    Args:
+        data_dir (str): results directory
+
+    Returns:
+        DataStoreColumnar if data_dir is a columnar store, DataStoreYAML otherwise
+    """
+    if is_columnar_store(data_dir):
+        return DataStoreColumnar(data_dir)
+    return DataStoreYAML()
+
+
+class DataStoreColumnar(DataStore):
+    """ Provides methods to load and write results in a columnar store.
+
+    Each run is written in a parquet file with one row per (execution, result field).
+    Run metadata is kept in the parquet footer. Files are partitioned by
+    benchmark, platform and date:
+
+        <store_dir>/benchmark=<name>/platform=<platform>/date=<YYYY-MM-DD>/<run>.parquet
+
+    so that benchmark and date selections only open matching partitions, and
+    result field selections only read matching rows.
+
+    Methods:
+        write(metadata, runs_info, output_file)
+        load(input_file)
+        load_results(input_file, result_names, context_columns)
+        add_run(metadata, runs_info)
+        import_yaml_tree(yaml_dir)
+    """
+
+
+    def __init__(self, store_dir=None):
+        """ Class constructor
+
+        Args:
+            store_dir (str): root directory of the store
+        """
+        super(DataStoreColumnar, self).__init__()
+        self.store_dir = store_dir
+
+
+    def write(self, metadata, runs_info, output_file):
+        """ Write a run to a parquet file.
+
+        Args:
+            metadata (dict): information common to every execution
+            runs_info (dict): execution id -> execution information
+            output_file (str): parquet file path
+        """
+        pyarrow, parquet = _import_pyarrow()
+
+        field_names = []
+        for run in runs_info.values():
+            for field in run:
+                if field != 'results_bench' and field not in field_names:
+                    field_names.append(field)
+
+        # Non string fields (lists, numbers) are JSON encoded
+        json_columns = [field for field in field_names
+                        if any(not isinstance(run.get(field, ''), str)
+                               for run in runs_info.values())]
+
+        columns = {field: [] for field in field_names + [RESULT_NAME, RESULT_VALUE]}
+        for run in runs_info.values():
+            results = run.get('results_bench', {})
+            if isinstance(results, dict):
+                result_items = sorted(results.items())
+            else:
+                # failed runs have no result fields
+                result_items = [(None, results)]
+
+            for result_name, result_value in result_items:
+                for field in field_names:
+                    value = run.get(field)
+                    if field in json_columns:
+                        value = json.dumps(value)
+                    columns[field].append(value)
+                columns[RESULT_NAME].append(result_name)
+                columns[RESULT_VALUE].append(json.dumps(result_value))
+
+        table = pyarrow.table({name: pyarrow.array(values, type=pyarrow.string())
+                               for name, values in columns.items()})
+        footer = {'metadata': metadata, 'json_columns': json_columns}
+        table = table.replace_schema_metadata({METADATA_KEY: json.dumps(footer)})
+
+        out_dir = os.path.dirname(output_file)
+        if out_dir and not os.path.isdir(out_dir):
+            os.makedirs(out_dir)
+        parquet.write_table(table, output_file)
+
+
+    def load(self, input_file):
+        """ Load a run from a parquet file.
+
+        Args:
+            input_file (str): parquet file
+
+        Returns:
+            (metadata, runs_info) tuple, (None, None) if the file cannot be read
+        """
+        return self.load_results(input_file, None, None, all_columns=True)
+
+
+    def load_results(self, input_file, result_names=None, context_columns=None,
+                     all_columns=False):
+        """ Load the part of a run needed to build a result dataframe.
+
+        Args:
+            input_file (str): parquet file
+            result_names (list): only rows of these result fields are read
+            context_columns (list): only these run fields are read, if None
+                                    fields listed in context_fields are read
+            all_columns (bool): read every run field
+
+        Returns:
+            (metadata, runs_info) tuple, (None, None) if the file cannot be read
+        """
+        # pylint: disable=arguments-differ, too-many-locals
+        _, parquet = _import_pyarrow()
+
+        try:
+            schema = parquet.read_schema(input_file)
+            footer = json.loads(schema.metadata[METADATA_KEY].decode('utf-8'))
+        except Exception:  # pylint: disable=broad-except
+            return (None, None)
+
+        metadata = footer['metadata']
+        json_columns = set(footer['json_columns'])
+        available = set(schema.names)
+
+        filters = None
+        if result_names:
+            filters = [(RESULT_NAME, 'in', list(result_names))]
+
+        if all_columns:
+            columns = None
+        else:
+            if context_columns is None:
+                ctx_table = parquet.read_table(input_file, columns=['context_fields'])
+                context_columns = set()
+                for ctx_fields in ctx_table.column('context_fields').to_pylist():
+                    if ctx_fields:
+                        context_columns.update(json.loads(ctx_fields))
+            columns = [c for c in REQUIRED_COLUMNS + sorted(context_columns)
+                       if c in available]
+            columns = list(dict.fromkeys(columns)) + [RESULT_NAME, RESULT_VALUE]
+
+        table = parquet.read_table(input_file, columns=columns, filters=filters)
+
+        runs_info = {}
+        for row in table.to_pylist():
+            result_name = row.pop(RESULT_NAME)
+            result_value = json.loads(row.pop(RESULT_VALUE))
+            exec_id = row['id']
+            if exec_id not in runs_info:
+                run = {}
+                for field, value in row.items():
+                    if field in json_columns and value is not None:
+                        value = json.loads(value)
+                    run[field] = value
+                run['results_bench'] = {}
+                runs_info[exec_id] = run
+
+            if result_name is None:
+                runs_info[exec_id]['results_bench'] = result_value
+            else:
+                runs_info[exec_id]['results_bench'][result_name] = result_value
+
+        return (metadata, runs_info)
+
+
+    def _partition_dir(self, metadata):
+        """ Return partition directory of a run given its metadata """
+        try:
+            date = _read_date(metadata['Date']).strftime('%Y-%m-%d')
+        except (KeyError, ValueError):
+            date = 'unknown'
+
+        return os.path.join(self.store_dir,
+                            'benchmark={}'.format(metadata.get('Benchmark_name', 'unknown')),
+                            'platform={}'.format(metadata.get('Platform', 'unknown')),
+                            'date={}'.format(date))
+
+
+    def add_run(self, metadata, runs_info):
+        """ Add a run to the store.
+
+        Args:
+            metadata (dict): information common to every execution
+            runs_info (dict): execution id -> execution information
+
+        Returns:
+            (str) path of the written parquet file
+        """
+        if not os.path.isdir(self.store_dir):
+            os.makedirs(self.store_dir)
+        open(os.path.join(self.store_dir, STORE_MARKER), 'a').close()
+
+        run_key = '{}{}{}'.format(metadata.get('Run_directory', ''),
+                                  metadata.get('Date', ''),
+                                  metadata.get('ID', ''))
+        run_hash = hashlib.md5(run_key.encode('utf-8')).hexdigest()[:12]
+        output_file = os.path.join(self._partition_dir(metadata),
+                                   'run-{}.parquet'.format(run_hash))
+        self.write(metadata, runs_info, output_file)
+
+        return output_file
+
+
+    def import_yaml_tree(self, yaml_dir):
+        """ Import every bench_results.yaml like file found under yaml_dir.
+
+        Args:
+            yaml_dir (str): directory containing YAML result files
+
+        Returns:
+            (int) number of imported runs
+        """
+        yaml_store = DataStoreYAML()
+        imported = 0
+        for (dirpath, _, filenames) in os.walk(yaml_dir):
+            for fname in filenames:
+                metadata, runs_info = yaml_store.load(os.path.join(dirpath, fname))
+                if not metadata or not runs_info or 'Benchmark_name' not in metadata:
+                    continue
+                self.add_run(metadata, runs_info)
+                imported += 1
+
+        return imported
+
+
+    @staticmethod
+    def _is_day(date_str):
+        """ Return True if date_str is a YYYY-MM-DD partition date """
+        try:
+            datetime.datetime.strptime(date_str, '%Y-%m-%d')
+        except ValueError:
+            return False
+        return True
+
+
+    def _list_data_files(self, data_dir, benchmark_name, date_interval=None):
+        """ Yield parquet files of partitions matching benchmark_name and date_interval.
+
+        Args:
+            data_dir (str): root directory of the store
+            benchmark_name (str): name of the benchmark
+            date_interval: tuple with two datetime objects
+        """
+        if benchmark_name:
+            bench_dirs = [os.path.join(data_dir, 'benchmark={}'.format(benchmark_name))]
+        else:
+            bench_dirs = [os.path.join(data_dir, d) for d in sorted(os.listdir(data_dir))
+                          if d.startswith('benchmark=')]
+
+        date_min, date_max = date_interval if date_interval else (None, None)
+        for bench_dir in bench_dirs:
+            if not os.path.isdir(bench_dir):
+                continue
+            for platform_dir in sorted(os.listdir(bench_dir)):
+                platform_path = os.path.join(bench_dir, platform_dir)
+                for date_dir in sorted(os.listdir(platform_path)):
+                    date_str = date_dir.split('=', 1)[-1]
+                    # partitions are daily, exact dates are checked on load. Runs
+                    # without a readable date (date=unknown) are kept as in YAML stores.
+                    if self._is_day(date_str):
+                        if date_min and date_str < date_min.strftime('%Y-%m-%d'):
+                            continue
+                        if date_max and date_str > date_max.strftime('%Y-%m-%d'):
+                            continue
+                    date_path = os.path.join(platform_path, date_dir)
+                    for fname in sorted(os.listdir(date_path)):
+                        if fname.endswith('.parquet'):
+                            yield os.path.join(date_path, fname)
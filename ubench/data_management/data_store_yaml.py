@@ -18,13 +18,11 @@
 ##############################################################################
 """ Provides DataStoreYAML class """
 
-import collections
-import yaml
-from yaml.representer import Representer
+import sqlite3
 from ubench.data_management.data_store import DataStore
-
-yaml.add_representer(collections.defaultdict, Representer.represent_dict)
-yaml.add_representer(collections.OrderedDict, Representer.represent_dict)
+from ubench.data_management.results_index import ResultsIndex
+from ubench.data_management.results_cache import ResultsCache
+from ubench.data_management import yaml_io
 
 class DataStoreYAML(DataStore):
     """ Provides methods to load and write configuration from and to YAML files
@@ -32,11 +30,18 @@ class DataStoreYAML(DataStore):
     Methods:
         write(metadata, runs_info, output_file)
         load(input_file)
+        get_index(data_dir)
     """
 
 
-    def __init__(self):
-        """ Class constructor """
+    def __init__(self, cache=None):
+        """ Class constructor
+
+        Args:
+            cache (ResultsCache): cache of parsed files, default cache if None
+        """
+        super(DataStoreYAML, self).__init__()
+        self.cache = cache if cache is not None else ResultsCache()
 
 
     def write(self, metadata, runs_info, output_file):
@@ -51,26 +56,29 @@ class DataStoreYAML(DataStore):
         with open(output_file, 'w') as outfile:
             benchdata = metadata
             benchdata['runs'] = runs_info
-            yaml.dump(benchdata, outfile, default_flow_style=False)
+            yaml_io.dump(benchdata, outfile, default_flow_style=False)
 
 
     def load(self, input_file):
         """ Loads YAML configuration to dictionary
 
+        Parsed result files are kept in cache until they are modified, other
+        files are not cached.
+
         Args:
             input_file (str): YAML file
         """
 
+        cached = self.cache.get(input_file)
+        if cached is not None:
+            return cached
+
         metadata = None
         runs_info = None
 
         with open(input_file, 'r') as inputfile:
             try:
-                yaml_attrs = getattr(yaml, '__dict__', {})
-                if 'FullLoader' in yaml_attrs:
-                    data = yaml.load(inputfile, Loader=yaml.FullLoader)
-                else:
-                    data = yaml.safe_load(inputfile)
+                data = yaml_io.load(inputfile)
                 runs_info = data['runs']
                 data.pop('runs', None)
                 metadata = data
@@ -79,4 +87,51 @@ class DataStoreYAML(DataStore):
                 runs_info = None
                 metadata = None
 
+        if runs_info is not None:
+            self.cache.put(input_file, (metadata, runs_info))
         return(metadata, runs_info)
+
+
+    def get_index(self, data_dir):
+        """ Return an up to date ResultsIndex of data_dir
+
+        Args:
+            data_dir (str): results directory
+
+        Returns:
+            ResultsIndex or None if the index cannot be opened (ex: read-only directory)
+        """
+        try:
+            index = ResultsIndex(data_dir, self)
+            index.refresh()
+        except sqlite3.Error:
+            return None
+
+        return index
+
+
+    def _list_data_files(self, data_dir, benchmark_name, date_interval=None):
+        """ Yield result files of benchmark_name in date_interval found in data_dir.
+
+        Files are selected using the results directory index, every file is
+        returned if the index cannot be used.
+
+        Args:
+            data_dir (str): results directory
+            benchmark_name (str): name of the benchmark
+            date_interval: tuple with two datetime objects
+        """
+        index = self.get_index(data_dir)
+        if index is None:
+            for filename in super(DataStoreYAML, self)._list_data_files(data_dir, benchmark_name,
+                                                                        date_interval):
+                yield filename
+            return
+
+        try:
+            filenames = index.select(benchmark_name, date_interval)
+        finally:
+            index.close()
+
+        for filename in filenames:
+            yield filename
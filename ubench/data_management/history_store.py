@@ -0,0 +1,344 @@
+##############################################################################
+#  This file is part of the UncleBench benchmarking tool.                    #
+#        Copyright (C) 2019 EDF SA                                           #
+#                                                                            #
+#  UncleBench is free software: you can redistribute it and/or modify        #
+#  it under the terms of the GNU General Public License as published by      #
+#  the Free Software Foundation, either version 3 of the License, or         #
+#  (at your option) any later version.                                       #
+#                                                                            #
+#  UncleBench is distributed in the hope that it will be useful,             #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the              #
+#  GNU General Public License for more details.                              #
+#                                                                            #
+#  You should have received a copy of the GNU General Public License         #
+#  along with UncleBench. If not, see <http://www.gnu.org/licenses/>.        #
+#                                                                            #
+##############################################################################
+""" Provides HistoryStore class, change_points and series_change_points functions """
+
+import datetime
+import hashlib
+import json
+import math
+import os
+import sqlite3
+
+import numpy
+import pandas
+
+from ubench.data_management.data_store import _read_date
+from ubench.data_management.data_store_yaml import DataStoreYAML
+
+HISTORY_FILENAME = 'ubench_history.sqlite'
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS sources (
+    digest TEXT PRIMARY KEY,
+    path TEXT,
+    campaign TEXT,
+    added TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    date TEXT,
+    benchmark TEXT,
+    platform TEXT,
+    metric TEXT,
+    context TEXT,
+    value REAL,
+    campaign TEXT,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS results_series ON results (benchmark, platform, metric, date);
+CREATE INDEX IF NOT EXISTS sources_path ON sources (path);
+CREATE INDEX IF NOT EXISTS results_source ON results (source);
+'''
+
+HISTORY_COLUMNS = ['date', 'benchmark', 'platform', 'metric', 'context', 'value', 'campaign']
+
+
+class HistoryStore(object):
+    """ Store of benchmark results over time.
+
+    Results of every result file added are normalized into one row per
+    (date, benchmark, platform, metric, context, value) and kept in a SQLite
+    database. Sources are identified by their absolute path: a file whose
+    content was already added is skipped, rows of a file rewritten since it
+    was added replace its previous rows.
+
+    Methods:
+        add_file(path, campaign)
+        add_dir(data_dir, campaign)
+        query(benchmark_name, platform, metric, since, until, context)
+        series(benchmark_name, platform, metric, since, until, context)
+    """
+
+
+    def __init__(self, db_file, data_store=None):
+        """ Class constructor
+
+        Args:
+            db_file (str): history database file, created if it does not exist
+            data_store (DataStore): store used to read result files
+
+        Raises:
+            sqlite3.Error if the database cannot be opened
+        """
+        db_dir = os.path.dirname(os.path.abspath(db_file))
+        if not os.path.isdir(db_dir):
+            os.makedirs(db_dir)
+        self.db_file = db_file
+        self.data_store = data_store if data_store else DataStoreYAML()
+        self.connection = sqlite3.connect(db_file)
+        self.connection.executescript(_SCHEMA)
+
+
+    def close(self):
+        """ Close history database """
+        self.connection.close()
+
+
+    def _normalize(self, metadata, runs_info, campaign, source):
+        """ Return history rows of a loaded result file """
+        benchmark_name = metadata['Benchmark_name']
+        metadata, panda, _, metric_column = self.data_store.run_to_panda(metadata, runs_info,
+                                                                         benchmark_name)
+        if panda.empty:
+            return []
+
+        try:
+            date = _read_date(metadata['Date']).isoformat()
+        except (KeyError, TypeError, ValueError):
+            date = datetime.datetime.fromtimestamp(os.path.getmtime(source)).isoformat()
+
+        # Repetitions of list valued results give one row each
+        panda = panda.explode('result')
+        values = pandas.to_numeric(panda['result'], errors='coerce')
+        panda = panda[values.notna()]
+        values = values[values.notna()]
+        if metric_column in panda.columns:
+            metrics = panda[metric_column].astype(str).tolist()
+        else:
+            metrics = [benchmark_name] * len(panda)
+        context_columns = [column for column in panda.columns
+                           if column not in ('result', metric_column)]
+        contexts = [json.dumps(context, sort_keys=True)
+                    for context in panda[context_columns].astype(str).to_dict('records')]
+
+        platform = metadata.get('Platform')
+        return [(date, benchmark_name, platform, metric, context, float(value), campaign, source)
+                for metric, context, value in zip(metrics, contexts, values)]
+
+
+    def add_file(self, path, campaign=None):
+        """ Append results of a result file.
+
+        Args:
+            path (str): result file
+            campaign (str): name of the campaign which produced the results
+
+        Returns:
+            (int) number of rows added, 0 if the file is not a result file or
+            its content was already added
+        """
+        try:
+            with open(path, 'rb') as rfile:
+                digest = hashlib.sha1(rfile.read()).hexdigest()
+        except IOError:
+            return 0
+
+        # Unchanged files and copies of an added file are skipped
+        if self.connection.execute('SELECT 1 FROM sources WHERE digest = ?',
+                                   (digest,)).fetchone():
+            return 0
+
+        metadata, runs_info = self.data_store.load(path)
+        if not metadata or not runs_info or 'Benchmark_name' not in metadata:
+            return 0
+
+        source = os.path.abspath(path)
+        rows = self._normalize(metadata, runs_info, campaign, source)
+        with self.connection:
+            # Rows of a rewritten file replace the ones previously added
+            self.connection.execute('DELETE FROM results WHERE source = ?', (source,))
+            self.connection.execute('DELETE FROM sources WHERE path = ?', (source,))
+            self.connection.execute('INSERT INTO sources VALUES (?,?,?,?)',
+                                    (digest, source, campaign,
+                                     datetime.datetime.now().isoformat()))
+            self.connection.executemany('INSERT INTO results VALUES (?,?,?,?,?,?,?,?)', rows)
+
+        return len(rows)
+
+
+    def add_dir(self, data_dir, campaign=None):
+        """ Append results of every YAML result file found in data_dir.
+
+        Args:
+            data_dir (str): directory where result files are searched
+            campaign (str): name of the campaign which produced the results
+
+        Returns:
+            (int) number of rows added
+        """
+        added = 0
+        for (dirpath, dirnames, filenames) in os.walk(data_dir):  # pylint: disable=unused-variable
+            dirnames.sort()
+            for fname in sorted(filenames):
+                if fname.endswith(('.yaml', '.yml')):
+                    added += self.add_file(os.path.join(dirpath, fname), campaign)
+
+        return added
+
+
+    def query(self, benchmark_name, platform=None, metric=None,  # pylint: disable=too-many-arguments
+              since=None, until=None, context=None):
+        """ Return results of a benchmark.
+
+        Args:
+            benchmark_name (str): name of the benchmark
+            platform (str): platform name, every platform if None
+            metric (str): result name, every result if None
+            since (datetime): results older than since are not returned
+            until (datetime): results newer than until are not returned
+            context (dict): context field -> value, only results run with
+                            these context values are returned
+
+        Returns:
+            dataframe with date, benchmark, platform, metric, context, value
+            and campaign columns sorted by date
+        """
+        query = 'SELECT {} FROM results WHERE benchmark = ?'.format(', '.join(HISTORY_COLUMNS))
+        params = [benchmark_name]
+        if platform:
+            query += ' AND platform = ?'
+            params.append(platform)
+        if metric:
+            query += ' AND metric = ?'
+            params.append(metric)
+        if since:
+            query += ' AND date >= ?'
+            params.append(since.isoformat())
+        if until:
+            query += ' AND date <= ?'
+            params.append(until.isoformat())
+        query += ' ORDER BY date'
+
+        results = pandas.DataFrame(self.connection.execute(query, params).fetchall(),
+                                   columns=HISTORY_COLUMNS)
+        if context and not results.empty:
+            contexts = results['context'].map(json.loads)
+            keep = contexts.map(lambda ctx: all(str(ctx.get(key)) == str(val)
+                                                for key, val in context.items()))
+            results = results[keep].reset_index(drop=True)
+
+        results['date'] = pandas.to_datetime(results['date'])
+        return results
+
+
+    def series(self, benchmark_name, platform=None, metric=None,  # pylint: disable=too-many-arguments
+               since=None, until=None, context=None):
+        """ Return median value of each run of a benchmark.
+
+        Arguments are those of query.
+
+        Returns:
+            dataframe with platform, metric, context, date, value and
+            repetitions columns, one row per (platform, metric, context, date)
+        """
+        results = self.query(benchmark_name, platform, metric, since, until, context)
+        grouped = results.groupby(['platform', 'metric', 'context', 'date'], dropna=False)
+        series = grouped['value'].agg(['median', 'count']).reset_index()
+        return series.rename(columns={'median': 'value', 'count': 'repetitions'})
+
+
+def _best_split(cumsum, start, end, min_size):
+    """ Return best split of segment [start, end) and its cost reduction """
+    splits = numpy.arange(start + min_size, end - min_size + 1)
+    if not len(splits):
+        return None, 0.0
+
+    total = cumsum[end] - cumsum[start]
+    left = cumsum[splits] - cumsum[start]
+    n_left = splits - start
+    n_right = end - splits
+    mean_diff = left / n_left - (total - left) / n_right
+    gains = n_left * n_right / float(end - start) * mean_diff ** 2
+    best = int(numpy.argmax(gains))
+    return int(splits[best]), float(gains[best])
+
+
+def change_points(values, min_size=2, penalty=None):
+    """ Detect mean shifts in a series with binary segmentation.
+
+    A segment is split where the sum of squared deviations decreases the most
+    if this decrease is above penalty. Default penalty is a modified BIC
+    3 * sigma^2 * log(n), sigma being a robust noise estimate computed from
+    differences of successive values. When more than half of successive values
+    are equal, as for rounded metrics, the robust estimate is 0 and the
+    standard deviation of the differences is used instead.
+
+    Args:
+        values: series values ordered by date
+        min_size (int): minimum number of values of a segment
+        penalty (float): minimum cost reduction of a split
+
+    Returns:
+        (list) sorted indexes of the first values of new segments
+    """
+    values = numpy.asarray(values, dtype=float)
+    n_values = len(values)
+    if n_values < 2 * min_size:
+        return []
+
+    if penalty is None:
+        diffs = numpy.diff(values)
+        sigma = numpy.median(numpy.abs(diffs)) / (0.6745 * math.sqrt(2))
+        if sigma == 0:
+            sigma = numpy.std(diffs) / math.sqrt(2)
+        penalty = 3 * sigma ** 2 * math.log(n_values)
+
+    cumsum = numpy.concatenate([[0.0], numpy.cumsum(values)])
+    cumsum_sq = numpy.concatenate([[0.0], numpy.cumsum(values ** 2)])
+    points = []
+    segments = [(0, n_values)]
+    while segments:
+        start, end = segments.pop()
+        split, gain = _best_split(cumsum, start, end, min_size)
+        # Relative tolerance avoids splitting constant segments on rounding errors
+        if split is None or gain <= max(penalty, 1e-9 * abs(cumsum_sq[end] - cumsum_sq[start])):
+            continue
+        points.append(split)
+        segments.extend([(start, split), (split, end)])
+
+    return sorted(points)
+
+
+def series_change_points(series, min_size=2, penalty=None):
+    """ Detect mean shifts of every (platform, metric, context) series.
+
+    Args:
+        series: dataframe returned by HistoryStore.series
+        min_size (int): minimum number of runs of a segment
+        penalty (float): minimum cost reduction of a split, see change_points
+
+    Returns:
+        dataframe with platform, metric, context, date, before, after and
+        shift(%) columns, one row per change point. before and after are
+        mean values of the segments around the change point.
+    """
+    rows = []
+    for (platform, metric, context), group in series.groupby(['platform', 'metric', 'context'],
+                                                             dropna=False, sort=True):
+        values = group['value'].to_numpy(dtype=float)
+        dates = group['date'].tolist()
+        points = change_points(values, min_size, penalty)
+        bounds = [0] + points + [len(values)]
+        for idx, point in enumerate(points):
+            before = values[bounds[idx]:point].mean()
+            after = values[point:bounds[idx + 2]].mean()
+            shift = round((after - before) * 100 / before, 2) if before else float('nan')
+            rows.append((platform, metric, context, dates[point], before, after, shift))
+
+    return pandas.DataFrame(rows, columns=['platform', 'metric', 'context', 'date',
+                                           'before', 'after', 'shift(%)'])
@@ -28,8 +28,10 @@ import re
 import os
 import glob
 import shutil
+import sqlite3
 from ubench.data_management.vcs.git import Git
 from ubench.data_management.data_store_yaml import DataStoreYAML
+from ubench.data_management.results_index import ResultsIndex
 import ubench.utils as utils
 
 class Publisher(object):
@@ -100,12 +102,28 @@ class Publisher(object):
             { benchmark : 'path/to/bench_results.yaml' }
         '''
         vcs = Git(self.local_dir, self.repo_str)
-        files = vcs.get_files_from_tag(ref)
+        files = [f for f in vcs.get_files_from_tag(ref) if os.path.isfile(f)]
+        if not files:
+            return {}
+
+        data = DataStoreYAML()
+        try:
+            index = ResultsIndex(self.local_dir, data)
+        except sqlite3.Error:
+            index = None
+
         b_map = {}
-        for f in files:
-            data = DataStoreYAML()
-            metadata, _ = data.load(f)
-            b_map[metadata['Benchmark_name']] = f
+        if index is not None:
+            entries = index.lookup(files)
+            index.close()
+            for f in files:
+                if f in entries:
+                    b_map[entries[f]['benchmark']] = f
+        else:
+            for f in files:
+                metadata, _ = data.load(f)
+                if metadata:
+                    b_map[metadata['Benchmark_name']] = f
         return b_map
 
     def _copy_files(self):
@@ -19,13 +19,38 @@
 #                                                                            #
 ##############################################################################
 import datetime
+import multiprocessing as mp
 import os
-import yaml
 import jinja2
-import ubench.data_management.data_store_yaml as dsy
+from matplotlib import pyplot as plt
+from ubench.data_management.data_store_columnar import get_data_store
+from ubench.data_management import yaml_io
 import ubench.data_management.comparison_writer as comparison_writer
 
 
+# Report instance used by section worker processes
+_SECTION_REPORT = None
+
+
+def _init_section_worker(report):
+    """
+    Initialize a process writing report sections.
+    """
+    global _SECTION_REPORT  # pylint: disable=global-statement
+    _SECTION_REPORT = report
+    # Worker processes cannot start processes to load files
+    _SECTION_REPORT.workers = 1
+    # Plots are only written to files
+    plt.switch_backend('Agg')
+
+
+def _write_section_worker(args):
+    """
+    Write a benchmark section in a worker process.
+    """
+    return _SECTION_REPORT.write_section(*args)
+
+
 def _dic_to_tuple(one_el_dictionnary):
     """
     Translate a single element dictionnary to a two element tuple key, value
@@ -48,10 +73,15 @@ class Report:
     Performance report class.
     """
     def __init__(self, metadata_file, bench_template, \
-                 compare_template, report_template):
+                 compare_template, report_template, workers=1):
         """
         Report constructor.
+
+        workers: number of processes used to load result files
         """
+        self.workers = workers
+        # Runs of each session directory, loaded once for every benchmark
+        self.session_runs = {}
         self.bench_template = bench_template
         self.compare_template = compare_template
         self.report_template = report_template
@@ -79,6 +109,7 @@ class Report:
         self.date_interval_list = []
         self.session_list = []
         self.directory_list = []
+        self.runs_lists = []
         if metadata_file:
             self.read_metadata(metadata_file)
 
@@ -91,11 +122,7 @@ class Report:
         """
         with open(metadata_file, 'r') as mfile:
             try:
-                yaml_attrs = getattr(yaml, '__dict__', {})
-                if 'FullLoader' in yaml_attrs:
-                    self.metadata = yaml.load(mfile, Loader=yaml.FullLoader)
-                else:
-                    self.metadata = yaml.safe_load(mfile)
+                self.metadata = yaml_io.load(mfile)
             except Exception as e:
                 print("Cannot load metadata file:"+str(e))
 
@@ -130,6 +157,22 @@ class Report:
         self.report_dictionnary['sessions'] = []
         self.report_dictionnary['benchmarks'] = []
 
+    @staticmethod
+    def _get_session_field(r_field, session_name, session_data, benchmark_data, default_fields):
+        """
+        Return (True, value) of field r_field of a benchmark session, or
+        (False, None) if it is not found. Benchmark session section comes
+        first, then default benchmark, session and default session sections.
+        """
+        for section in [(benchmark_data or {}).get(session_name),
+                        default_fields['benchmarks'],
+                        session_data,
+                        default_fields['sessions']]:
+            if section and r_field in section:
+                return True, section[r_field]
+
+        return False, None
+
     def set_fields_from_sessions(self,
                                  session_name,
                                  session_data,
@@ -145,29 +188,16 @@ class Report:
         if not session_name in self.report_dictionnary['sessions']:
             self.report_dictionnary['sessions'].append(session_name)
 
-        fields_found = []
         extended_report = current_benchmark_report.copy()
+        if not benchmark_data[session_name]:
+            benchmark_data[session_name] = {}
 
-        # Get fields from benchmarks section
-        for r_field in fields_to_find:
-            if not benchmark_data[session_name]:
-                benchmark_data[session_name] = {}
-            if r_field in benchmark_data[session_name]:
-                extended_report[r_field] = benchmark_data[session_name][r_field]
-                fields_found.append(r_field)
-            elif r_field in default_fields['benchmarks']:
-                extended_report[r_field] = default_fields['benchmarks'][r_field]
-                fields_found.append(r_field)
-
-        # Fields not found are set from session sections
-        for r_field in fields_found:
-            fields_to_find.remove(r_field)
-
+        # Fields are looked for in benchmarks section, then in session sections
         for r_field in fields_to_find:
-            if r_field in session_data:
-                extended_report[r_field] = session_data[r_field]
-            elif r_field in default_fields['sessions']:
-                extended_report[r_field] = default_fields['sessions'][r_field]
+            found, value = self._get_session_field(r_field, session_name, session_data,
+                                                   benchmark_data, default_fields)
+            if found:
+                extended_report[r_field] = value
             else:
                 print(("Please precise {} for benchmark {}".
                        format(r_field, benchmark_name)))
@@ -219,6 +249,18 @@ class Report:
 
         return report_from_contexts, fields_to_find
 
+    def get_session_runs(self, session_dir):
+        """
+        Return runs found in session_dir, grouped by benchmark name. Each
+        session directory is read once, whatever the number of benchmarks
+        and sessions using it.
+        """
+        if session_dir not in self.session_runs:
+            self.session_runs[session_dir] \
+                = get_data_store(session_dir).load_dir(session_dir, self.workers)
+
+        return self.session_runs[session_dir]
+
     def add_session_to_report(self,
                               benchmark_name,
                               session_name,
@@ -244,7 +286,9 @@ class Report:
         """
         self.session_list.append(session_name)
 
-        dstore = dsy.DataStoreYAML()
+        runs_list = self.get_session_runs(session_report['dir']).get(benchmark_name, [])
+        self.runs_lists.append(runs_list)
+        dstore = get_data_store(session_report['dir'])
         date_interval = (Report._read_date(session_report['date_start']),
                          Report._read_date(session_report['date_end']))
         self.date_interval_list.append(date_interval)
@@ -252,8 +296,8 @@ class Report:
 
         context_out = None
         run_metadata, bench_dataframe, context_out, sub_bench \
-            = dstore.dir_to_pandas(session_report['dir'], benchmark_name, \
-                                   date_interval, (row_headers, column_headers))
+            = dstore.runs_to_pandas(runs_list, benchmark_name, \
+                                    date_interval, (row_headers, column_headers))
 
         if bench_dataframe.empty:
             print(("Error : no value found for session {} and benchmark {}".\
@@ -311,65 +355,42 @@ class Report:
                                                   'contexts',
                                                   'benchmarks'])
 
-        # Write a section for each benchmark/session
-        for benchmark_item in self.metadata['benchmarks']:
-            benchmark_name, benchmark_data = _dic_to_tuple(benchmark_item)
-
-            if benchmark_name == 'default':
-                continue
+        benchmark_items = [_dic_to_tuple(benchmark_item)
+                           for benchmark_item in self.metadata['benchmarks']]
+        benchmark_items = [(benchmark_name, benchmark_data)
+                           for benchmark_name, benchmark_data in benchmark_items
+                           if benchmark_name != 'default']
 
-            self.report_dictionnary['benchmarks'].append(benchmark_name)
-            fields_to_find = self.required_fields.union(self.context_fields)
-
-            # For each benchmark look for report fields in context, sessions
-            # and benchmark sections
-            common_report_data, fields_not_found = \
-                self.set_fields_from_contexts_section(
-                    benchmark_name,
-                    fields_to_find,
-                    default_fields)
-
-            self.results_filter[benchmark_name] = common_report_data['results_filter']
-
-            # For each session add corresponding report information
-            # according to parameters retrieved from metadata
+        # Write a section for each benchmark/session
+        if self.workers > 1 and len(benchmark_items) > 1:
+            # Session directories are loaded once before workers are started
             for session_item in self.metadata['sessions']:
-                fields_to_find_in_sessions = fields_not_found.copy()
                 session_name, session_data = _dic_to_tuple(session_item)
-
-                if session_name != 'default':
-                    session_report \
-                        = self.set_fields_from_sessions(session_name,
-                                                        session_data,
-                                                        benchmark_name,
-                                                        benchmark_data,
-                                                        common_report_data,
-                                                        fields_to_find_in_sessions,
-                                                        default_fields)
-                    sub_bench, sub_bench_list, context =\
-                        self.add_session_to_report(benchmark_name,
-                                                   session_name,
-                                                   session_report,
-                                                   common_report_data['row_headers'],
-                                                   common_report_data['column_headers'],
-                                                   output_dir)
-
-            # Write performance comparison across sessions
-            compare_file = \
-                self.write_comparison(benchmark_name,
-                                      sub_bench,
-                                      sub_bench_list,
-                                      context,
-                                      common_report_data['compare_threshold'],
-                                      common_report_data['compare_array'],
-                                      common_report_data['compare_graph'],
-                                      output_dir)
-
-            self.report_dictionnary['compare_comment'][benchmark_name] =\
-                common_report_data['compare_comment']
-
-            if compare_file:
-                self.report_files['compare'][benchmark_name] = compare_file
+                if session_name == 'default':
+                    continue
+                for _, benchmark_data in benchmark_items:
+                    found, session_dir = self._get_session_field('dir', session_name,
+                                                                 session_data, benchmark_data,
+                                                                 default_fields)
+                    if found and session_dir:
+                        self.get_session_runs(session_dir)
+
+            pool = mp.Pool(min(self.workers, len(benchmark_items)),
+                           initializer=_init_section_worker, initargs=(self,))
+            try:
+                sections = pool.imap(_write_section_worker,
+                                     [(benchmark_name, benchmark_data, default_fields, output_dir)
+                                      for benchmark_name, benchmark_data in benchmark_items])
+                # Sections are added in metadata order
+                for section in sections:
+                    self._add_section(section)
+            finally:
+                pool.terminate()
+                pool.join()
+        else:
+            for benchmark_name, benchmark_data in benchmark_items:
+                self._add_section(self.write_section(benchmark_name, benchmark_data,
+                                                     default_fields, output_dir))
 
         # Write full report
 
@@ -380,6 +401,103 @@ class Report:
 
 
 
+    def write_section(self, benchmark_name, benchmark_data, default_fields, output_dir):
+        """
+        Write session and comparison files of a benchmark.
+
+        benchmark_name: name of the benchmark
+        benchmark_data: benchmark section of report metadata
+        default_fields: default parameters dictionnaries
+        output_dir: directory where report files will be saved
+
+        Returns a dictionnary describing written files, to be added
+        to the report with _add_section.
+        """
+        # pylint: disable=too-many-locals
+        section = {'benchmark_name': benchmark_name,
+                   'sessions': [],
+                   'session_files': {}}
+
+        fields_to_find = self.required_fields.union(self.context_fields)
+
+        # For each benchmark look for report fields in context, sessions
+        # and benchmark sections
+        common_report_data, fields_not_found = \
+            self.set_fields_from_contexts_section(
+                benchmark_name,
+                fields_to_find,
+                default_fields)
+
+        self.results_filter[benchmark_name] = common_report_data['results_filter']
+
+        # Sessions compared in this benchmark section
+        self.session_list = []
+        self.date_interval_list = []
+        self.directory_list = []
+        self.runs_lists = []
+
+        # For each session add corresponding report information
+        # according to parameters retrieved from metadata
+        for session_item in self.metadata['sessions']:
+            fields_to_find_in_sessions = fields_not_found.copy()
+            session_name, session_data = _dic_to_tuple(session_item)
+
+            if session_name != 'default':
+                session_report \
+                    = self.set_fields_from_sessions(session_name,
+                                                    session_data,
+                                                    benchmark_name,
+                                                    benchmark_data,
+                                                    common_report_data,
+                                                    fields_to_find_in_sessions,
+                                                    default_fields)
+                sub_bench, sub_bench_list, context =\
+                    self.add_session_to_report(benchmark_name,
+                                               session_name,
+                                               session_report,
+                                               common_report_data['row_headers'],
+                                               common_report_data['column_headers'],
+                                               output_dir)
+                section['sessions'].append(session_name)
+                section['session_files'][session_name] \
+                    = self.report_files[session_name][benchmark_name]
+
+        # Write performance comparison across sessions
+        section['compare_file'] = \
+            self.write_comparison(benchmark_name,
+                                  sub_bench,
+                                  sub_bench_list,
+                                  context,
+                                  common_report_data['compare_threshold'],
+                                  common_report_data['compare_array'],
+                                  common_report_data['compare_graph'],
+                                  output_dir)
+
+        section['compare_comment'] = common_report_data['compare_comment']
+
+        return section
+
+    def _add_section(self, section):
+        """
+        Add a benchmark section written by write_section to the report.
+        """
+        benchmark_name = section['benchmark_name']
+        self.report_dictionnary['benchmarks'].append(benchmark_name)
+
+        for session_name in section['sessions']:
+            if not session_name in self.report_dictionnary['sessions']:
+                self.report_dictionnary['sessions'].append(session_name)
+            if not session_name in self.report_files:
+                self.report_files[session_name] = {}
+            self.report_files[session_name][benchmark_name] \
+                = section['session_files'][session_name]
+
+        self.report_dictionnary['compare_comment'][benchmark_name] =\
+            section['compare_comment']
+
+        if section['compare_file']:
+            self.report_files['compare'][benchmark_name] = section['compare_file']
+
     def write_comparison(self,
                          benchmark_name,
                          sub_bench,
@@ -393,10 +511,10 @@ class Report:
         Write performance comparison report section
         """
         dic_compare = {}
-        cwriter = comparison_writer.ComparisonWriter(compare_threshold)
+        cwriter = comparison_writer.ComparisonWriter(compare_threshold, self.workers)
         c_list = cwriter.compare(benchmark_name, self.directory_list, \
                                  self.date_interval_list, (context[0]+[context[1]], None),
-                                 self.session_list, self.results_filter)
+                                 self.session_list, self.results_filter, self.runs_lists)
         if(compare_array):
             dic_compare['dataframe_list'] = list(zip(c_list, sub_bench_list))
             dic_compare['ncols'] = len(c_list[-1].columns)
@@ -0,0 +1,282 @@
+##############################################################################
+#  This file is part of the UncleBench benchmarking tool.                    #
+#        Copyright (C) 2019 EDF SA                                           #
+#                                                                            #
+#  UncleBench is free software: you can redistribute it and/or modify        #
+#  it under the terms of the GNU General Public License as published by      #
+#  the Free Software Foundation, either version 3 of the License, or         #
+#  (at your option) any later version.                                       #
+#                                                                            #
+#  UncleBench is distributed in the hope that it will be useful,             #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the              #
+#  GNU General Public License for more details.                              #
+#                                                                            #
+#  You should have received a copy of the GNU General Public License         #
+#  along with UncleBench. If not, see <http://www.gnu.org/licenses/>.        #
+#                                                                            #
+##############################################################################
+""" Provides statistics on repeated benchmark results.
+
+Every repetition of a result (benchmark iterations, list valued results) is a
+sample of its context. Statistics are computed for all contexts at once with
+grouped operations:
+
+ - samples(panda, context_columns, value_column)
+ - describe(samples_frame, context_columns, confidence)
+ - mann_whitney(ref_samples, post_samples, context_columns)
+ - compare_sessions(pandas_list, context_columns, value_column, alpha, confidence)
+"""
+
+import functools
+import math
+import numpy
+import pandas
+
+DEFAULT_ALPHA = 0.05
+DEFAULT_CONFIDENCE = 0.95
+
+VALUE_COLUMN = 'value'
+
+# Largest session sample count for which the exact U distribution is used
+EXACT_MAX_SAMPLES = 8
+
+
+def _normal_quantile(prob):
+    """ Return the standard normal distribution quantile of prob """
+    # Acklam's rational approximation, relative error below 1.2e-9
+    coef_a = [-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+              1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00]
+    coef_b = [-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+              6.680131188771972e+01, -1.328068155288572e+01]
+    coef_c = [-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+              -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00]
+    coef_d = [7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00,
+              3.754408661907416e+00]
+
+    if prob < 0.02425 or prob > 1 - 0.02425:
+        quant = math.sqrt(-2 * math.log(min(prob, 1 - prob)))
+        value = (((((coef_c[0] * quant + coef_c[1]) * quant + coef_c[2]) * quant + coef_c[3])
+                  * quant + coef_c[4]) * quant + coef_c[5]) \
+            / ((((coef_d[0] * quant + coef_d[1]) * quant + coef_d[2]) * quant + coef_d[3])
+               * quant + 1)
+        return value if prob < 0.5 else -value
+
+    quant = prob - 0.5
+    rad = quant * quant
+    return (((((coef_a[0] * rad + coef_a[1]) * rad + coef_a[2]) * rad + coef_a[3]) * rad
+             + coef_a[4]) * rad + coef_a[5]) * quant \
+        / (((((coef_b[0] * rad + coef_b[1]) * rad + coef_b[2]) * rad + coef_b[3]) * rad
+            + coef_b[4]) * rad + 1)
+
+
+def student_quantile(prob, dof):
+    """ Return Student t distribution quantiles of prob.
+
+    Exact for 1 and 2 degrees of freedom, Cornish-Fisher expansion otherwise.
+
+    Args:
+        prob (float): probability
+        dof: array of degrees of freedom
+
+    Returns:
+        numpy array of quantiles, nan where dof < 1
+    """
+    dof = numpy.asarray(dof, dtype=float)
+    z_val = _normal_quantile(prob)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        quantiles = (z_val + (z_val ** 3 + z_val) / (4 * dof)
+                     + (5 * z_val ** 5 + 16 * z_val ** 3 + 3 * z_val) / (96 * dof ** 2)
+                     + (3 * z_val ** 7 + 19 * z_val ** 5 + 17 * z_val ** 3 - 15 * z_val)
+                     / (384 * dof ** 3))
+    quantiles = numpy.where(dof == 1, math.tan(math.pi * (prob - 0.5)), quantiles)
+    quantiles = numpy.where(dof == 2, (2 * prob - 1) / math.sqrt(2 * prob * (1 - prob)),
+                            quantiles)
+    return numpy.where(dof < 1, numpy.nan, quantiles)
+
+
+def samples(panda, context_columns, value_column='result'):
+    """ Return samples of a result column.
+
+    List valued results are split in one sample per value, non numeric
+    results are dropped.
+
+    Args:
+        panda: result dataframe
+        context_columns (list): context columns
+        value_column (str): result column
+
+    Returns:
+        dataframe with context columns and a value column holding one sample per row
+    """
+    frame = panda[list(context_columns) + [value_column]]
+    frame = frame.rename(columns={value_column: VALUE_COLUMN}).explode(VALUE_COLUMN)
+    frame[VALUE_COLUMN] = pandas.to_numeric(frame[VALUE_COLUMN], errors='coerce')
+    return frame.dropna(subset=[VALUE_COLUMN]).reset_index(drop=True)
+
+
+def describe(samples_frame, context_columns, confidence=DEFAULT_CONFIDENCE):
+    """ Describe samples of each context.
+
+    Args:
+        samples_frame: samples returned by samples()
+        context_columns (list): context columns
+        confidence (float): confidence level of mean confidence intervals
+
+    Returns:
+        dataframe with context columns and count, mean, median, std, ci_low,
+        ci_high columns. Confidence intervals of single samples are nan.
+    """
+    grouped = samples_frame.groupby(list(context_columns), dropna=False)[VALUE_COLUMN]
+    stats = grouped.agg(['count', 'mean', 'median', 'std'])
+    half_width = student_quantile(1 - (1 - confidence) / 2, stats['count'] - 1) \
+        * stats['std'] / numpy.sqrt(stats['count'])
+    stats['ci_low'] = stats['mean'] - half_width
+    stats['ci_high'] = stats['mean'] + half_width
+    return stats.reset_index()
+
+
+@functools.lru_cache(maxsize=None)
+def _u_distribution(n_ref, n_post):
+    """ Return the number of sample orderings giving each U value.
+
+    Args:
+        n_ref (int): reference sample count
+        n_post (int): compared sample count
+
+    Returns:
+        numpy array indexed by U, from 0 to n_ref * n_post
+    """
+    if n_ref == 0 or n_post == 0:
+        return numpy.ones(1)
+    # The largest sample is either a compared one (adds n_ref to U) or a reference one
+    counts = numpy.zeros(n_ref * n_post + 1)
+    with_post = _u_distribution(n_ref, n_post - 1)
+    counts[n_ref:n_ref + len(with_post)] += with_post
+    with_ref = _u_distribution(n_ref - 1, n_post)
+    counts[:len(with_ref)] += with_ref
+    return counts
+
+
+def _exact_p_value(n_ref, n_post, u_stat):
+    """ Return the exact two sided p-value of U for samples without ties """
+    counts = _u_distribution(int(n_ref), int(n_post))
+    lower = int(math.floor(min(u_stat, n_ref * n_post - u_stat)))
+    return min(1.0, 2 * counts[:lower + 1].sum() / counts.sum())
+
+
+def _min_p_value(n_ref, n_post):
+    """ Return the smallest p-value reachable with n_ref and n_post samples """
+    if n_ref == 0 or n_post == 0:
+        return 1.0
+    if max(n_ref, n_post) <= EXACT_MAX_SAMPLES:
+        return _exact_p_value(n_ref, n_post, 0)
+    z_val = (n_ref * n_post / 2. - 0.5) / math.sqrt(n_ref * n_post * (n_ref + n_post + 1) / 12.)
+    return math.erfc(z_val / math.sqrt(2))
+
+
+def mann_whitney(ref_samples, post_samples, context_columns):
+    """ Two sided Mann-Whitney U test of each context.
+
+    The exact U distribution is used when no session has more than
+    EXACT_MAX_SAMPLES samples and samples have no ties, the normal
+    approximation with tie and continuity corrections otherwise. p-values
+    are 1 when a sample set is empty or every sample is equal.
+
+    Args:
+        ref_samples: reference samples returned by samples()
+        post_samples: compared samples returned by samples()
+        context_columns (list): context columns
+
+    Returns:
+        dataframe with context columns and u, p_value columns and a p_min
+        column holding the smallest p-value reachable with the sample counts
+    """
+    context_columns = list(context_columns)
+    combined = pandas.concat([ref_samples.assign(_post=0), post_samples.assign(_post=1)],
+                             ignore_index=True)
+    grouped = combined.groupby(context_columns, dropna=False)
+    combined['_rank'] = grouped[VALUE_COLUMN].rank(method='average')
+
+    by_session = combined.groupby(context_columns + ['_post'], dropna=False)
+    counts = by_session.size().unstack('_post', fill_value=0).reindex(columns=[0, 1],
+                                                                      fill_value=0)
+    post_ranks = combined[combined['_post'] == 1].groupby(context_columns,
+                                                          dropna=False)['_rank'].sum()
+    post_ranks = post_ranks.reindex(counts.index, fill_value=0)
+
+    # Tie correction term: sum of t^3 - t over groups of equal values
+    ties = combined.groupby(context_columns + [VALUE_COLUMN], dropna=False).size()
+    ties = (ties ** 3 - ties).groupby(level=context_columns, dropna=False).sum()
+    ties = ties.reindex(counts.index, fill_value=0)
+
+    n_ref = counts[0].astype(float)
+    n_post = counts[1].astype(float)
+    total = n_ref + n_post
+    u_stat = post_ranks - n_post * (n_post + 1) / 2
+    mean_u = n_ref * n_post / 2
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        var_u = n_ref * n_post / 12 * ((total + 1) - ties / (total * (total - 1)))
+        delta = (u_stat - mean_u).abs()
+        z_val = (delta - numpy.minimum(delta, 0.5)) / numpy.sqrt(var_u)
+    p_value = z_val.map(lambda z: math.erfc(z / math.sqrt(2)) if z == z else 1.0)
+    p_value[(var_u <= 0) | (n_ref == 0) | (n_post == 0)] = 1.0
+
+    exact = (ties == 0) & (n_ref > 0) & (n_post > 0) \
+        & (numpy.maximum(n_ref, n_post) <= EXACT_MAX_SAMPLES)
+    for context in counts.index[exact]:
+        p_value.loc[context] = _exact_p_value(n_ref.loc[context], n_post.loc[context],
+                                              u_stat.loc[context])
+    p_min = [_min_p_value(int(ref), int(post)) for ref, post in zip(counts[0], counts[1])]
+
+    result = pandas.DataFrame({'u': u_stat, 'p_value': p_value.clip(upper=1.0),
+                               'p_min': p_min}, index=counts.index)
+    return result.reset_index()
+
+
+def compare_sessions(pandas_list, context_columns, value_column='result',
+                     alpha=DEFAULT_ALPHA, confidence=DEFAULT_CONFIDENCE):
+    """ Compare result samples of sessions with the first one.
+
+    Args:
+        pandas_list (list): result dataframes, the first one is the reference
+        context_columns (list): context columns
+        value_column (str): result column
+        alpha (float): significance level
+        confidence (float): confidence level of mean confidence intervals
+
+    Returns:
+        dataframe of contexts found in every session with, for each session i:
+        count_i, mean_i, median_i, ci_low_i, ci_high_i columns and, for compared
+        sessions i > 0: diff_i(%) relative difference of medians, p_value_i
+        and significant_i columns.
+    """
+    context_columns = list(context_columns)
+    samples_list = [samples(panda, context_columns, value_column) for panda in pandas_list]
+
+    compared = None
+    for idx, session_samples in enumerate(samples_list):
+        stats = describe(session_samples, context_columns, confidence)
+        stats = stats[context_columns + ['count', 'mean', 'median', 'ci_low', 'ci_high']]
+        stats.columns = context_columns + ['{}_{}'.format(name, idx) for name in
+                                           ['count', 'mean', 'median', 'ci_low', 'ci_high']]
+        if compared is None:
+            compared = stats
+            continue
+        compared = compared.merge(stats, on=context_columns, how='inner')
+
+        test = mann_whitney(samples_list[0], session_samples, context_columns)
+        unreachable = (test['p_min'] >= alpha).sum()
+        if unreachable:
+            print('!!Warning: {} of {} contexts of session {} have too few samples to reach '
+                  'significance level {}, use more repetitions'
+                  .format(unreachable, len(test), idx, alpha))
+        test = test[context_columns + ['p_value']].rename(
+            columns={'p_value': 'p_value_{}'.format(idx)})
+        compared = compared.merge(test, on=context_columns, how='left')
+        compared['diff_{}(%)'.format(idx)] = \
+            ((compared['median_{}'.format(idx)] - compared['median_0'])
+             * 100 / compared['median_0']).round(2)
+        compared['significant_{}'.format(idx)] = compared['p_value_{}'.format(idx)] < alpha
+
+    return compared
@@ -0,0 +1,274 @@
+##############################################################################
+#  This file is part of the UncleBench benchmarking tool.                    #
+#        Copyright (C) 2019 EDF SA                                           #
+#                                                                            #
+#  UncleBench is free software: you can redistribute it and/or modify        #
+#  it under the terms of the GNU General Public License as published by      #
+#  the Free Software Foundation, either version 3 of the License, or         #
+#  (at your option) any later version.                                       #
+#                                                                            #
+#  UncleBench is distributed in the hope that it will be useful,             #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the              #
+#  GNU General Public License for more details.                              #
+#                                                                            #
+#  You should have received a copy of the GNU General Public License         #
+#  along with UncleBench. If not, see <http://www.gnu.org/licenses/>.        #
+#                                                                            #
+##############################################################################
+""" Provides ResultsCache class """
+
+import atexit
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+import ubench.config
+
+CACHE_SUFFIX = '.pickle'
+STATS_FILE = 'stats.json'
+# Number of cache lookups after which hit and miss counts are saved
+STATS_SAVE_INTERVAL = 100
+
+
+class ResultsCache(object):
+    """ On disk cache of parsed result files.
+
+    Entries are pickled objects keyed by the path, mtime and size of the file
+    they were parsed from, so that a modified file is parsed again. Least
+    recently used entries are removed when the total cache size goes beyond
+    its maximum size. Cache errors are never fatal, a failing cache behaves
+    as an empty one.
+
+    Hit and miss counts are added to the cache statistics file every
+    STATS_SAVE_INTERVAL lookups and at exit, they are shared by every
+    process using the cache directory.
+
+    Methods:
+        get(path)
+        put(path, value)
+        save_stats()
+        stats()
+        clear()
+    """
+
+
+    def __init__(self, cache_dir=None, max_size=None):
+        """ Class constructor
+
+        Args:
+            cache_dir (str): cache directory, ubench.config.RESULTS_CACHE_DIR if None
+            max_size (int): maximum cache size in bytes,
+                            ubench.config.RESULTS_CACHE_MAX_SIZE if None
+        """
+        if cache_dir is None:
+            cache_dir = ubench.config.RESULTS_CACHE_DIR
+        if max_size is None:
+            max_size = ubench.config.RESULTS_CACHE_MAX_SIZE
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        # Counts not yet saved to the statistics file
+        self._unsaved_hits = 0
+        self._unsaved_misses = 0
+        self._exit_save = False
+        # Cache size estimate, computed on first write
+        self._size = None
+
+
+    @property
+    def enabled(self):
+        """ False if the cache is disabled by a null maximum size """
+        return self.max_size > 0
+
+
+    def _entry_file(self, path):
+        """ Return cache entry file of path, None if path cannot be read """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        key = '{}:{}:{}'.format(os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        return os.path.join(self.cache_dir,
+                            hashlib.sha1(key.encode('utf-8')).hexdigest() + CACHE_SUFFIX)
+
+
+    def get(self, path):
+        """ Return cached value of path, None if it is not cached
+
+        Args:
+            path (str): parsed file
+        """
+        entry_file = self._entry_file(path) if self.enabled else None
+        if entry_file is None:
+            return None
+
+        try:
+            with open(entry_file, 'rb') as entry:
+                value = pickle.load(entry)
+            # entry mtime is used as last access time for eviction
+            os.utime(entry_file, None)
+        except Exception:  # pylint: disable=broad-except
+            self._count(False)
+            return None
+
+        self._count(True)
+        return value
+
+
+    def _count(self, hit):
+        """ Count a cache hit or miss """
+        if hit:
+            self.hits += 1
+            self._unsaved_hits += 1
+        else:
+            self.misses += 1
+            self._unsaved_misses += 1
+
+        if not self._exit_save:
+            atexit.register(self.save_stats)
+            self._exit_save = True
+        if self._unsaved_hits + self._unsaved_misses >= STATS_SAVE_INTERVAL:
+            self.save_stats()
+
+
+    def _read_stats(self):
+        """ Return saved hit and miss counts """
+        try:
+            with open(os.path.join(self.cache_dir, STATS_FILE), 'r') as stats_file:
+                saved = json.load(stats_file)
+            return int(saved['hits']), int(saved['misses'])
+        except Exception:  # pylint: disable=broad-except
+            return 0, 0
+
+
+    def save_stats(self):
+        """ Add hit and miss counts of this process to the statistics file """
+        if not self._unsaved_hits and not self._unsaved_misses:
+            return
+
+        tmp_file = None
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            hits, misses = self._read_stats()
+            fdesc, tmp_file = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fdesc, 'w') as stats_file:
+                json.dump({'hits': hits + self._unsaved_hits,
+                           'misses': misses + self._unsaved_misses}, stats_file)
+            os.replace(tmp_file, os.path.join(self.cache_dir, STATS_FILE))
+            tmp_file = None
+        except Exception:  # pylint: disable=broad-except
+            if tmp_file and os.path.exists(tmp_file):
+                os.remove(tmp_file)
+        self._unsaved_hits = 0
+        self._unsaved_misses = 0
+
+
+    def put(self, path, value):
+        """ Cache value parsed from path
+
+        Args:
+            path (str): parsed file
+            value: picklable object
+        """
+        entry_file = self._entry_file(path) if self.enabled else None
+        if entry_file is None:
+            return
+
+        tmp_file = None
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            # Entries are renamed once written, concurrent readers never see partial files
+            fdesc, tmp_file = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fdesc, 'wb') as entry:
+                pickle.dump(value, entry, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, entry_file)
+            tmp_file = None
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            else:
+                self._size += os.path.getsize(entry_file)
+            if self._size > self.max_size:
+                self._evict()
+        except Exception:  # pylint: disable=broad-except
+            if tmp_file and os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+
+    def _entries(self):
+        """ Return (last access time, size, path) of cache entries """
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+
+        for fname in os.listdir(self.cache_dir):
+            if not fname.endswith(CACHE_SUFFIX):
+                continue
+            entry_file = os.path.join(self.cache_dir, fname)
+            try:
+                stat = os.stat(entry_file)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry_file))
+
+        return entries
+
+
+    def _evict(self):
+        """ Remove least recently used entries until cache size is below its maximum """
+        entries = self._entries()
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry_file in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(entry_file)
+            except OSError:
+                continue
+            total_size -= size
+        self._size = total_size
+
+
+    def stats(self):
+        """ Return cache statistics
+
+        Returns:
+            (dict) with dir, entries, size, max_size, hits and misses keys
+        """
+        entries = self._entries()
+        hits, misses = self._read_stats()
+        return {'dir': self.cache_dir,
+                'entries': len(entries),
+                'size': sum(size for _, size, _ in entries),
+                'max_size': self.max_size,
+                'hits': hits + self._unsaved_hits,
+                'misses': misses + self._unsaved_misses}
+
+
+    def clear(self):
+        """ Remove every cache entry and reset hit and miss counts
+
+        Returns:
+            (int) number of removed entries
+        """
+        try:
+            os.remove(os.path.join(self.cache_dir, STATS_FILE))
+        except OSError:
+            pass
+        self._unsaved_hits = 0
+        self._unsaved_misses = 0
+        removed = 0
+        for _, _, entry_file in self._entries():
+            try:
+                os.remove(entry_file)
+                removed += 1
+            except OSError:
+                pass
+        self._size = None
+
+        return removed
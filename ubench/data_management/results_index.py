@@ -0,0 +1,217 @@
+##############################################################################
+#  This file is part of the UncleBench benchmarking tool.                    #
+#        Copyright (C) 2019 EDF SA                                           #
+#                                                                            #
+#  UncleBench is free software: you can redistribute it and/or modify        #
+#  it under the terms of the GNU General Public License as published by      #
+#  the Free Software Foundation, either version 3 of the License, or         #
+#  (at your option) any later version.                                       #
+#                                                                            #
+#  UncleBench is distributed in the hope that it will be useful,             #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the              #
+#  GNU General Public License for more details.                              #
+#                                                                            #
+#  You should have received a copy of the GNU General Public License         #
+#  along with UncleBench. If not, see <http://www.gnu.org/licenses/>.        #
+#                                                                            #
+##############################################################################
+""" Provides ResultsIndex class """
+
+import hashlib
+import json
+import os
+import sqlite3
+
+import ubench.config
+from ubench.data_management.data_store import _read_date
+
+INDEX_SUFFIX = '.sqlite'
+# Only YAML files may be result files
+RESULT_FILE_EXTENSIONS = ('.yaml', '.yml')
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime REAL,
+    size INTEGER,
+    benchmark TEXT,
+    platform TEXT,
+    date TEXT,
+    context_fields TEXT
+);
+CREATE INDEX IF NOT EXISTS files_benchmark_date ON files (benchmark, date);
+'''
+
+
+class ResultsIndex(object):
+    """ Persistent index of the result files found in a results directory.
+
+    The index is a SQLite database kept in the index directory and named after
+    the results directory path, results directories are never written. It maps
+    each YAML file to its benchmark name, platform, date and context fields so
+    that result files can be selected without being parsed. Entries are
+    refreshed when file mtime or size change; YAML files which are not result
+    files are indexed without benchmark name so they are not parsed again.
+
+    Methods:
+        refresh()
+        select(benchmark_name, date_interval)
+        lookup(paths)
+    """
+
+
+    def __init__(self, data_dir, data_store, index_dir=None):
+        """ Class constructor
+
+        Args:
+            data_dir (str): results directory
+            data_store (DataStore): store used to read files to be indexed
+            index_dir (str): index directory, ubench.config.RESULTS_INDEX_DIR if None
+
+        Raises:
+            sqlite3.Error if the index cannot be opened
+        """
+        if index_dir is None:
+            index_dir = ubench.config.RESULTS_INDEX_DIR
+        self.data_dir = os.path.abspath(data_dir)
+        self.data_store = data_store
+        self.index_file = os.path.join(
+            index_dir, hashlib.sha1(self.data_dir.encode('utf-8')).hexdigest() + INDEX_SUFFIX)
+        try:
+            if not os.path.isdir(index_dir):
+                os.makedirs(index_dir)
+        except OSError:
+            pass  # sqlite3 fails to open the index file
+        self.connection = sqlite3.connect(self.index_file)
+        self.connection.executescript(_SCHEMA)
+
+
+    def close(self):
+        """ Close index database """
+        self.connection.close()
+
+
+    def _read_entry(self, path, stat):
+        """ Parse a result file and return its index entry """
+        benchmark = platform = date = context_fields = None
+        metadata, runs_info = self.data_store.load(path)
+        if metadata and runs_info and 'Benchmark_name' in metadata:
+            benchmark = metadata['Benchmark_name']
+            platform = metadata.get('Platform')
+            try:
+                date = _read_date(metadata['Date']).isoformat()
+            except (KeyError, TypeError, ValueError):
+                date = None
+            fields = []
+            for run in runs_info.values():
+                for field in run.get('context_fields', []):
+                    if field not in fields:
+                        fields.append(field)
+            context_fields = json.dumps(fields)
+
+        return (os.path.relpath(path, self.data_dir), stat.st_mtime, stat.st_size,
+                benchmark, platform, date, context_fields)
+
+
+    def _update(self, paths, known):
+        """ Index paths whose mtime or size differ from known entries
+
+        Args:
+            paths (list): absolute file paths
+            known (dict): relative path -> (mtime, size) of indexed files
+        """
+        new_entries = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if known.get(os.path.relpath(path, self.data_dir)) != (stat.st_mtime, stat.st_size):
+                new_entries.append(self._read_entry(path, stat))
+
+        if new_entries:
+            with self.connection:
+                self.connection.executemany('INSERT OR REPLACE INTO files VALUES (?,?,?,?,?,?,?)',
+                                            new_entries)
+
+
+    def _known_entries(self):
+        """ Return relative path -> (mtime, size) of indexed files """
+        cursor = self.connection.execute('SELECT path, mtime, size FROM files')
+        return {path: (mtime, size) for path, mtime, size in cursor}
+
+
+    def refresh(self):
+        """ Synchronize index with files found in the results directory """
+        known = self._known_entries()
+        paths = []
+        for (dirpath, dirnames, filenames) in os.walk(self.data_dir):  # pylint: disable=unused-variable
+            for fname in filenames:
+                if fname.endswith(RESULT_FILE_EXTENSIONS):
+                    paths.append(os.path.join(dirpath, fname))
+
+        self._update(paths, known)
+
+        found = set(os.path.relpath(path, self.data_dir) for path in paths)
+        removed = [(path,) for path in known if path not in found]
+        if removed:
+            with self.connection:
+                self.connection.executemany('DELETE FROM files WHERE path = ?', removed)
+
+
+    def select(self, benchmark_name=None, date_interval=None):
+        """ Return result files of a benchmark whose date lies in date_interval.
+
+        Args:
+            benchmark_name (str): name of the benchmark, every benchmark if None
+            date_interval: tuple with two datetime objects, None bounds are not checked
+                           and files without a readable date are kept
+
+        Returns:
+            (list) sorted absolute paths of matching files
+        """
+        query = 'SELECT path FROM files WHERE benchmark IS NOT NULL'
+        params = []
+        if benchmark_name:
+            query += ' AND benchmark = ?'
+            params.append(benchmark_name)
+        if date_interval and date_interval[0]:
+            query += ' AND (date IS NULL OR date >= ?)'
+            params.append(date_interval[0].isoformat())
+        if date_interval and date_interval[1]:
+            query += ' AND (date IS NULL OR date <= ?)'
+            params.append(date_interval[1].isoformat())
+        query += ' ORDER BY path'
+
+        return [os.path.join(self.data_dir, path)
+                for (path,) in self.connection.execute(query, params)]
+
+
+    def lookup(self, paths):
+        """ Return index entries of given files, refreshing them if needed.
+
+        Args:
+            paths (list): paths of files located in the results directory
+
+        Returns:
+            (dict) path -> dictionary with benchmark, platform, date
+                   and context_fields keys. Files which are not result files
+                   are not returned.
+        """
+        paths = [path for path in paths if path.endswith(RESULT_FILE_EXTENSIONS)]
+        abs_paths = [os.path.abspath(path) for path in paths]
+        self._update(abs_paths, self._known_entries())
+
+        entries = {}
+        for path, abs_path in zip(paths, abs_paths):
+            row = self.connection.execute('SELECT benchmark, platform, date, context_fields'
+                                          ' FROM files WHERE path = ?',
+                                          (os.path.relpath(abs_path, self.data_dir),)).fetchone()
+            if row and row[0]:
+                entries[path] = {'benchmark': row[0],
+                                 'platform': row[1],
+                                 'date': row[2],
+                                 'context_fields': json.loads(row[3])}
+
+        return entries
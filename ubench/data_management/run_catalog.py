@@ -0,0 +1,198 @@
+##############################################################################
+#  This file is part of the UncleBench benchmarking tool.                    #
+#        Copyright (C) 2019 EDF SA                                           #
+#                                                                            #
+#  UncleBench is free software: you can redistribute it and/or modify        #
+#  it under the terms of the GNU General Public License as published by      #
+#  the Free Software Foundation, either version 3 of the License, or         #
+#  (at your option) any later version.                                       #
+#                                                                            #
+#  UncleBench is distributed in the hope that it will be useful,             #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the              #
+#  GNU General Public License for more details.                              #
+#                                                                            #
+#  You should have received a copy of the GNU General Public License         #
+#  along with UncleBench. If not, see <http://www.gnu.org/licenses/>.        #
+#                                                                            #
+##############################################################################
+""" Provides RunCatalog class """
+
+import collections
+import json
+import os
+import re
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from ubench.data_management.data_store import _read_date
+
+RUN_CATALOG_FILENAME = 'ubench_runs.jsonl'
+RUN_FIELDS = ['id', 'date', 'platform', 'benchmark', 'cmdline', 'status', 'result_path']
+
+# ubench.log field -> catalog field
+_LOG_FIELDS = {'Benchmark_name': 'benchmark', 'Platform': 'platform', 'ID': 'id',
+               'Date': 'date', 'Run_directory': 'result_path', 'cmdline': 'cmdline'}
+
+
+class RunCatalog(object):
+    """ Append only catalog of the runs of a benchmark.
+
+    The catalog is a JSON lines file kept next to the benchmark runs
+    directory. Each line holds the id of a run and some of its fields,
+    lines written later override fields of earlier lines, so a run is
+    updated by appending a line. Runs are listed without reading run
+    directories. Lines which cannot be read, like a line partially
+    written by an interrupted process, are ignored.
+
+    Methods:
+        exists()
+        add(run)
+        update(run_id, fields)
+        get(run_id)
+        last()
+        runs(since, status, offset, limit)
+        import_logs(output_dir)
+    """
+
+
+    def __init__(self, catalog_file):
+        """ Class constructor
+
+        Args:
+            catalog_file (str): catalog file, created by the first added run
+        """
+        self.catalog_file = catalog_file
+        self._runs = collections.OrderedDict()
+        self._signature = None
+
+
+    def exists(self):
+        """ Return True if the catalog file exists """
+        return os.path.isfile(self.catalog_file)
+
+
+    def _append(self, records):
+        """ Append records to the catalog file """
+        lines = ''.join(json.dumps(record, sort_keys=True) + '\n' for record in records)
+        with open(self.catalog_file, 'a') as cfile:
+            if fcntl:
+                fcntl.flock(cfile, fcntl.LOCK_EX)
+            cfile.write(lines)
+
+
+    def _read(self):
+        """ Return run id -> run of the catalog file, read again only if it changed """
+        try:
+            stat = os.stat(self.catalog_file)
+        except OSError:
+            return self._runs
+        if (stat.st_mtime_ns, stat.st_size) == self._signature:
+            return self._runs
+
+        runs = collections.OrderedDict()
+        with open(self.catalog_file, 'r') as cfile:
+            for line in cfile:
+                try:
+                    record = json.loads(line)
+                    run_id = int(record['id'])
+                except (ValueError, TypeError, KeyError):
+                    continue
+                runs.setdefault(run_id, {}).update(record)
+                runs[run_id]['id'] = run_id
+
+        self._runs = runs
+        self._signature = (stat.st_mtime_ns, stat.st_size)
+        return self._runs
+
+
+    def add(self, run):
+        """ Add a run
+
+        Args:
+            run (dict): run fields, see RUN_FIELDS, id is required
+        """
+        self._append([dict(run, id=int(run['id']))])
+
+
+    def update(self, run_id, fields):
+        """ Update fields of a run
+
+        Args:
+            run_id (int): run id
+            fields (dict): updated fields
+        """
+        self._append([dict(fields, id=int(run_id))])
+
+
+    def get(self, run_id):
+        """ Return a run, None if it is not in the catalog """
+        return self._read().get(int(run_id))
+
+
+    def last(self):
+        """ Return the run with the highest id, None if the catalog is empty """
+        runs = self._read()
+        return runs[max(runs)] if runs else None
+
+
+    def runs(self, since=None, status=None, offset=0, limit=None):
+        """ Return runs sorted by id
+
+        Args:
+            since (datetime): only runs launched from this date
+            status (str): only runs with this status, case insensitive
+            offset (int): number of matching runs skipped
+            limit (int): maximum number of runs returned, every run if None
+
+        Returns:
+            (list) run dictionaries
+        """
+        runs = [run for _, run in sorted(self._read().items())]
+        if since:
+            runs = [run for run in runs if run.get('date') and run['date'] >= since.isoformat()]
+        if status:
+            runs = [run for run in runs if str(run.get('status', '')).upper() == status.upper()]
+
+        runs = runs[offset:]
+        return runs[:limit] if limit is not None else runs
+
+
+    def import_logs(self, output_dir):
+        """ Add runs of the ubench.log files of a benchmark runs directory
+        which are not in the catalog, used for runs launched before the catalog
+        existed.
+
+        Args:
+            output_dir (str): benchmark runs directory
+
+        Returns:
+            (int) number of imported runs
+        """
+        field_pattern = re.compile(r'(\S+).*: (.*)')
+        known = self._read()
+        records = []
+        for run_dir in sorted(os.listdir(output_dir)):
+            logfile_path = os.path.join(output_dir, run_dir, 'ubench.log')
+            if not run_dir.isdigit() or int(run_dir) in known or \
+               not os.path.isfile(logfile_path):
+                continue
+            record = {'id': int(run_dir), 'status': 'UNKNOWN'}
+            with open(logfile_path, 'r') as logfile:
+                for name, value in field_pattern.findall(logfile.read()):
+                    if name in _LOG_FIELDS:
+                        record[_LOG_FIELDS[name]] = value.strip()
+            record['id'] = int(run_dir)
+            record['result_path'] = os.path.join(output_dir, run_dir)
+            try:
+                record['date'] = _read_date(record['date']).isoformat()
+            except (KeyError, ValueError):
+                record.pop('date', None)
+            records.append(record)
+
+        if records:
+            self._append(records)
+        return len(records)
@@ -0,0 +1,85 @@
+##############################################################################
+#  This file is part of the UncleBench benchmarking tool.                    #
+#        Copyright (C) 2019 EDF SA                                           #
+#                                                                            #
+#  UncleBench is free software: you can redistribute it and/or modify        #
+#  it under the terms of the GNU General Public License as published by      #
+#  the Free Software Foundation, either version 3 of the License, or         #
+#  (at your option) any later version.                                       #
+#                                                                            #
+#  UncleBench is distributed in the hope that it will be useful,             #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the              #
+#  GNU General Public License for more details.                              #
+#                                                                            #
+#  You should have received a copy of the GNU General Public License         #
+#  along with UncleBench. If not, see <http://www.gnu.org/licenses/>.        #
+#                                                                            #
+##############################################################################
+""" Provides YAML load and dump functions.
+
+libyaml C loader and dumper are used when PyYAML is built with them, pure
+Python implementations are used otherwise. Every YAML file read or written by
+unclebench should go through this module.
+"""
+
+import collections
+import yaml
+from yaml.representer import Representer
+
+
+def _first_attr(*names):
+    """ Return the first attribute of yaml module found in names """
+    for name in names:
+        if hasattr(yaml, name):
+            return getattr(yaml, name)
+    return None
+
+
+# FullLoader is not available with PyYAML < 5.1
+LOADER = _first_attr('CFullLoader', 'FullLoader', 'CSafeLoader', 'SafeLoader')
+SAFE_LOADER = _first_attr('CSafeLoader', 'SafeLoader')
+DUMPER = _first_attr('CDumper', 'Dumper')
+LIBYAML = DUMPER is getattr(yaml, 'CDumper', None)
+
+for _dumper in set([yaml.Dumper, DUMPER]):
+    yaml.add_representer(collections.defaultdict, Representer.represent_dict, Dumper=_dumper)
+    yaml.add_representer(collections.OrderedDict, Representer.represent_dict, Dumper=_dumper)
+
+
+def load(stream):
+    """ Load a YAML document.
+
+    Args:
+        stream: string or opened file
+
+    Returns:
+        loaded python object
+    """
+    return yaml.load(stream, Loader=LOADER)
+
+
+def safe_load(stream):
+    """ Load a YAML document restricted to standard YAML tags.
+
+    Args:
+        stream: string or opened file
+
+    Returns:
+        loaded python object
+    """
+    return yaml.load(stream, Loader=SAFE_LOADER)
+
+
+def dump(data, stream=None, **kwargs):
+    """ Dump data to a YAML document.
+
+    Args:
+        data: python object
+        stream: opened file, document is returned if None
+        kwargs: yaml.dump options
+
+    Returns:
+        YAML document if stream is None
+    """
+    return yaml.dump(data, stream, Dumper=DUMPER, **kwargs)
@@ -0,0 +1,258 @@
+##############################################################################
+#  This file is part of the UncleBench benchmarking tool.                    #
+#        Copyright (C) 2019 EDF SA                                           #
+#                                                                            #
+#  UncleBench is free software: you can redistribute it and/or modify        #
+#  it under the terms of the GNU General Public License as published by      #
+#  the Free Software Foundation, either version 3 of the License, or         #
+#  (at your option) any later version.                                       #
+#                                                                            #
+#  UncleBench is distributed in the hope that it will be useful,             #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the              #
+#  GNU General Public License for more details.                              #
+#                                                                            #
+#  You should have received a copy of the GNU General Public License         #
+#  along with UncleBench. If not, see <http://www.gnu.org/licenses/>.        #
+#                                                                            #
+##############################################################################
+""" Provides JobStateCache class """
+
+import collections
+import contextlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import ubench.config
+from ubench.scheduler_interfaces.job_tracker import FINISH_STATES
+
+
+class JobStateCache(object):
+    """ Cache of scheduler job states.
+
+    Entries are kept in memory and, if a cache file is given, in a JSON file
+    shared by concurrent ubench processes. The file is locked while it is
+    read or updated and is only read again when it has been modified.
+    Job ids are prefixed by the cluster name so that clusters sharing a home
+    directory do not share job states. Terminal job states expire after
+    ubench.config.JOB_STATE_FINISHED_TTL, other states expire after a time to
+    live depending on the state. Expired then least recently used entries
+    are removed beyond max_entries. Cache file errors are never fatal, the
+    cache then only lives in memory.
+
+    Methods:
+        get(job_ids)
+        put(job_states)
+        stats()
+        clear()
+    """
+
+
+    def __init__(self, cache_file=None, max_entries=None, ttl=None, cluster=''):
+        """ Class constructor
+
+        Args:
+            cache_file (str): shared cache file, ubench.config.JOB_STATE_CACHE_FILE
+                              if None, no file is used if empty
+            max_entries (int): maximum number of entries,
+                               ubench.config.JOB_STATE_CACHE_MAX_ENTRIES if None
+            ttl (dict): state -> time to live in seconds, ubench.config.JOB_STATE_TTL
+                        if None. Other non terminal states use ubench.config.MEM_DISK_TTL
+            cluster (str): name of the cluster of the jobs
+        """
+        if cache_file is None:
+            cache_file = ubench.config.JOB_STATE_CACHE_FILE
+        if max_entries is None:
+            max_entries = ubench.config.JOB_STATE_CACHE_MAX_ENTRIES
+        if ttl is None:
+            ttl = ubench.config.JOB_STATE_TTL
+        self.cache_file = cache_file or None
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.key_prefix = cluster + ':' if cluster else ''
+        self.hits = 0
+        self.misses = 0
+        # cluster:job id -> [state, expiry time, update time], least recently used first
+        self._entries = collections.OrderedDict()
+        self._file_signature = None
+
+
+    def _expiry(self, state, now):
+        """ Return expiry time of a state """
+        if state in FINISH_STATES:
+            return now + ubench.config.JOB_STATE_FINISHED_TTL
+        return now + self.ttl.get(state, ubench.config.MEM_DISK_TTL)
+
+
+    @contextlib.contextmanager
+    def _locked(self, exclusive):
+        """ Lock cache file while reading or updating it """
+        cache_dir = os.path.dirname(os.path.abspath(self.cache_file))
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        lock_file = open(self.cache_file + '.lock', 'a')
+        try:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+        finally:
+            lock_file.close()
+
+
+    def _signature(self):
+        """ Return (mtime, size) of cache file, None if it does not exist """
+        try:
+            stat = os.stat(self.cache_file)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+
+    def _read_file(self):
+        """ Merge entries of cache file, most recently updated entries are kept """
+        signature = self._signature()
+        if signature is None or signature == self._file_signature:
+            return
+
+        self._file_signature = signature
+        try:
+            with open(self.cache_file, 'r') as cfile:
+                entries = json.load(cfile)
+            entries = [(job_id, list(entry)) for job_id, entry in entries.items()
+                       if len(entry) == 3]
+            # Terminal states used to be kept forever
+            for _, entry in entries:
+                if entry[1] is None:
+                    entry[1] = entry[2] + ubench.config.JOB_STATE_FINISHED_TTL
+        except (ValueError, TypeError, AttributeError):
+            # Unreadable content is ignored and replaced on next update
+            return
+        for job_id, entry in entries:
+            current = self._entries.get(job_id)
+            if current is None or current[2] < entry[2]:
+                self._entries[job_id] = entry
+
+
+    def _write_file(self):
+        """ Atomically write cache entries to cache file """
+        fdesc, tmp_file = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.cache_file)),
+                                           suffix='.tmp')
+        try:
+            with os.fdopen(fdesc, 'w') as cfile:
+                json.dump(self._entries, cfile)
+            os.replace(tmp_file, self.cache_file)
+        except Exception:  # pylint: disable=broad-except
+            os.remove(tmp_file)
+            raise
+        self._file_signature = self._signature()
+
+
+    def _evict(self, now):
+        """ Remove expired then least recently used entries beyond max_entries """
+        if len(self._entries) <= self.max_entries:
+            return
+        for job_id in [job_id for job_id, entry in self._entries.items() if entry[1] <= now]:
+            del self._entries[job_id]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+    def get(self, job_ids):
+        """ Return cached states of jobs
+
+        Args:
+            job_ids (list): job ids
+
+        Returns:
+            ({job id: state}, [ids of jobs missing or expired]) tuple
+        """
+        if self.cache_file:
+            try:
+                with self._locked(False):
+                    self._read_file()
+            except (OSError, IOError):
+                pass
+
+        now = time.time()
+        states = {}
+        missing = []
+        for job_id in job_ids:
+            key = self.key_prefix + job_id
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                missing.append(job_id)
+                continue
+            self._entries.move_to_end(key)
+            states[job_id] = entry[0]
+
+        self.hits += len(states)
+        self.misses += len(missing)
+        logging.debug('job state cache: %d hits, %d misses', self.hits, self.misses)
+        return states, missing
+
+
+    def put(self, job_states):
+        """ Cache job states
+
+        Args:
+            job_states (dict): job id -> state
+        """
+        now = time.time()
+
+        def update():  # pylint: disable=missing-docstring
+            for job_id, state in job_states.items():
+                key = self.key_prefix + job_id
+                self._entries[key] = [state, self._expiry(state, now), now]
+                self._entries.move_to_end(key)
+            self._evict(now)
+
+        if self.cache_file:
+            try:
+                with self._locked(True):
+                    self._read_file()
+                    update()
+                    self._write_file()
+                return
+            except (OSError, IOError):
+                pass
+        update()
+
+
+    def stats(self):
+        """ Return cache statistics
+
+        Returns:
+            (dict) with file, entries, hits and misses keys
+        """
+        self.get([])
+        return {'file': self.cache_file,
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses}
+
+
+    def clear(self):
+        """ Remove every cache entry
+
+        Returns:
+            (int) number of removed entries
+        """
+        self.get([])
+        removed = len(self._entries)
+        self._entries.clear()
+        if self.cache_file and os.path.exists(self.cache_file):
+            try:
+                with self._locked(True):
+                    os.remove(self.cache_file)
+            except OSError:
+                pass
+        self._file_signature = None
+        return removed
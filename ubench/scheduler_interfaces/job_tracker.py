@@ -0,0 +1,200 @@
+##############################################################################
+#  This file is part of the UncleBench benchmarking tool.                    #
+#        Copyright (C) 2019 EDF SA                                           #
+#                                                                            #
+#  UncleBench is free software: you can redistribute it and/or modify        #
+#  it under the terms of the GNU General Public License as published by      #
+#  the Free Software Foundation, either version 3 of the License, or         #
+#  (at your option) any later version.                                       #
+#                                                                            #
+#  UncleBench is distributed in the hope that it will be useful,             #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the              #
+#  GNU General Public License for more details.                              #
+#                                                                            #
+#  You should have received a copy of the GNU General Public License         #
+#  along with UncleBench. If not, see <http://www.gnu.org/licenses/>.        #
+#                                                                            #
+##############################################################################
+""" Provides JobTracker class """
+
+import time
+
+# Scheduler states of jobs which will not run anymore
+FINISH_STATES = ('COMPLETED', 'FAILED', 'CANCELLED', 'TIMEOUT', 'NODE_FAIL',
+                 'OUT_OF_MEMORY', 'PREEMPTED', 'BOOT_FAIL', 'DEADLINE')
+PENDING_STATES = ('PENDING', 'CONFIGURING', 'REQUEUED', 'SUSPENDED')
+
+DEFAULT_MIN_INTERVAL = 5 # seconds
+DEFAULT_MAX_INTERVAL = 120 # seconds
+
+
+class JobTracker(object):
+    """ Tracks scheduler jobs of several benchmarks with one query per tick.
+
+    States of every unfinished job are read with a single get_jobs_state call
+    per poll. The polling interval adapts to the jobs: it is shrunk when a
+    job state changes or when running jobs get close to the duration of
+    already finished jobs, and grown when every job is pending or nothing
+    changes.
+
+    Methods:
+        track(job_ids, on_finish, on_done)
+        poll()
+        wait(progress)
+        states(job_ids)
+        unfinished()
+    """
+
+
+    def __init__(self, scheduler_interface, min_interval=DEFAULT_MIN_INTERVAL,
+                 max_interval=DEFAULT_MAX_INTERVAL):
+        """ Class constructor
+
+        Args:
+            scheduler_interface: object with a get_jobs_state(job_ids) method
+            min_interval (float): minimum polling interval in seconds
+            max_interval (float): maximum polling interval in seconds
+        """
+        self.scheduler_interface = scheduler_interface
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.interval = self.min_interval
+        self.job_states = {}
+        # job id -> time the job was first seen running
+        self._started = {}
+        # durations of jobs seen running until they finished
+        self._durations = []
+        self._job_callbacks = {}
+        # [job ids, callback] of tracked groups whose jobs are not all finished
+        self._groups = []
+
+
+    def track(self, job_ids, on_finish=None, on_done=None):
+        """ Start tracking jobs.
+
+        Args:
+            job_ids (list): scheduler job ids
+            on_finish: called with (job_id, state) when each job finishes
+            on_done: called with {job_id: state} when every job of job_ids has finished
+        """
+        job_ids = [str(job_id) for job_id in job_ids]
+        for job_id in job_ids:
+            self.job_states.setdefault(job_id, 'UNKNOWN')
+            if on_finish:
+                self._job_callbacks.setdefault(job_id, []).append(on_finish)
+        if on_done:
+            self._groups.append([job_ids, on_done])
+        self._run_callbacks([job_id for job_id in job_ids
+                             if self.job_states[job_id] in FINISH_STATES])
+
+
+    def unfinished(self):
+        """ Return ids of tracked jobs which have not finished """
+        return sorted(job_id for job_id, state in self.job_states.items()
+                      if state not in FINISH_STATES)
+
+
+    def states(self, job_ids=None):
+        """ Return last known states of jobs
+
+        Args:
+            job_ids (list): job ids, every tracked job if None
+
+        Returns:
+            (dict) job id -> state, jobs whose state is not known yet are not returned
+        """
+        if job_ids is None:
+            job_ids = self.job_states.keys()
+        return {str(job_id): self.job_states[str(job_id)] for job_id in job_ids
+                if self.job_states.get(str(job_id), 'UNKNOWN') != 'UNKNOWN'}
+
+
+    def poll(self):
+        """ Read states of unfinished jobs with a single scheduler query and
+        call callbacks of finished jobs.
+
+        Returns:
+            (list) ids of jobs whose state changed
+        """
+        unfinished = self.unfinished()
+        if not unfinished:
+            return []
+
+        now = time.time()
+        new_states = self.scheduler_interface.get_jobs_state(unfinished)
+        changed = []
+        finished = []
+        for job_id in unfinished:
+            state = new_states.get(job_id)
+            if not state or state == self.job_states[job_id]:
+                continue
+            changed.append(job_id)
+            self.job_states[job_id] = state
+            if state == 'RUNNING':
+                self._started.setdefault(job_id, now)
+            elif state in FINISH_STATES:
+                finished.append(job_id)
+                if job_id in self._started:
+                    self._durations.append(now - self._started.pop(job_id))
+
+        self._run_callbacks(finished)
+        self.interval = self._next_interval(changed, now)
+        return changed
+
+
+    def _run_callbacks(self, finished):
+        """ Call callbacks of finished jobs and of groups whose jobs all finished """
+        for job_id in finished:
+            for callback in self._job_callbacks.pop(job_id, []):
+                callback(job_id, self.job_states[job_id])
+
+        if not finished:
+            return
+        done = [group for group in self._groups
+                if all(self.job_states[job_id] in FINISH_STATES for job_id in group[0])]
+        for group in done:
+            self._groups.remove(group)
+            group[1]({job_id: self.job_states[job_id] for job_id in group[0]})
+
+
+    def _next_interval(self, changed, now):
+        """ Return polling interval after a poll """
+        unfinished = self.unfinished()
+        if not unfinished:
+            return self.min_interval
+
+        if changed:
+            interval = self.interval / 2.0
+        elif self._about_to_finish(now):
+            interval = self.min_interval
+        elif all(self.job_states[job_id] in PENDING_STATES for job_id in unfinished):
+            interval = self.interval * 2
+        else:
+            interval = self.interval * 1.5
+
+        return min(self.max_interval, max(self.min_interval, interval))
+
+
+    def _about_to_finish(self, now):
+        """ True if a running job has run for 80% of the mean finished job duration """
+        if not self._durations or not self._started:
+            return False
+        mean_duration = sum(self._durations) / len(self._durations)
+        return any(now - start >= 0.8 * mean_duration for start in self._started.values())
+
+
+    def wait(self, progress=None, sleep=time.sleep):
+        """ Poll jobs until every tracked job has finished
+
+        Args:
+            progress: called with the tracker after each poll
+            sleep: function used to wait between polls
+        """
+        while True:
+            self.poll()
+            if progress:
+                progress(self)
+            if not self.unfinished():
+                break
+            sleep(self.interval)
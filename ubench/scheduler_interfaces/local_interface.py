@@ -0,0 +1,393 @@
+##############################################################################
+#  This file is part of the UncleBench benchmarking tool.                    #
+#        Copyright (C) 2019 EDF SA                                           #
+#                                                                            #
+#  UncleBench is free software: you can redistribute it and/or modify        #
+#  it under the terms of the GNU General Public License as published by      #
+#  the Free Software Foundation, either version 3 of the License, or         #
+#  (at your option) any later version.                                       #
+#                                                                            #
+#  UncleBench is distributed in the hope that it will be useful,             #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the              #
+#  GNU General Public License for more details.                              #
+#                                                                            #
+#  You should have received a copy of the GNU General Public License         #
+#  along with UncleBench. If not, see <http://www.gnu.org/licenses/>.        #
+#                                                                            #
+##############################################################################
+""" Provides LocalSchedulerInterface class and the ubench-local-submit command.
+
+Job scripts submitted with ubench-local-submit run in background on the
+current node. Each job is bound to its own slice of the CPUs ubench may
+use: a job waits in PENDING state until enough CPUs are free, so at most
+as many jobs as there are CPU slices run at the same time. Jobs are kept
+in a spool directory, one directory per job holding its description and
+state, and CPUs are reserved with one lock file per CPU.
+
+Each job is run by a runner process, leader of its own process group. Lock
+files are shared by the runner and the job script processes, so CPUs are
+only released by the system when every process of the job has ended, even
+if the runner is killed. A job whose process group is gone before its end
+was recorded is in NODE_FAIL state.
+"""
+
+import argparse
+import contextlib
+import fcntl
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from ClusterShell.NodeSet import NodeSet
+import ubench.config
+from ubench.scheduler_interfaces.scheduler_interface import SchedulerInterface
+
+JOB_FILE = 'job.json'
+
+
+def _format_elapsed(seconds):
+    """ Format a duration in seconds as sacct does: [D-]HH:MM:SS """
+    seconds = int(seconds)
+    days, seconds = divmod(seconds, 86400)
+    elapsed = '{:02d}:{:02d}:{:02d}'.format(seconds // 3600, seconds % 3600 // 60, seconds % 60)
+    return '{}-{}'.format(days, elapsed) if days else elapsed
+
+
+def _format_time(epoch):
+    """ Format a timestamp as sacct does, Unknown if not set """
+    if not epoch:
+        return 'Unknown'
+    return time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(epoch))
+
+
+def _group_alive(pgid):
+    """ True if a process of process group pgid exists """
+    try:
+        os.killpg(pgid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class LocalSchedulerInterface(SchedulerInterface):
+    """ Runs job scripts in background on the current node.
+
+    Methods:
+        submit(script, cwd, cpus, job_name)
+        get_jobs_state(job_ids)
+        get_jobs_info(job_ids)
+        get_job_info(job_id)
+        purge(max_age)
+    """
+
+
+    def __init__(self, spool_dir=None, cpus=None):
+        """ Constructor
+
+        Args:
+            spool_dir (str): directory where jobs are kept,
+                             ubench.config.LOCAL_SCHEDULER_DIR if None
+            cpus (list): CPUs jobs may use, CPUs ubench may use if None
+        """
+        super(LocalSchedulerInterface, self).__init__()
+        self.spool_dir = spool_dir or ubench.config.LOCAL_SCHEDULER_DIR
+        self.cpus = sorted(cpus if cpus is not None else os.sched_getaffinity(0))
+        if not os.path.isdir(self.spool_dir):
+            os.makedirs(self.spool_dir)
+
+
+    @contextlib.contextmanager
+    def _spool_lock(self):
+        """ Lock spool directory while allocating job ids or CPUs """
+        with open(os.path.join(self.spool_dir, 'spool.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+
+    def _job_dir(self, job_id):
+        """ Return directory of a job """
+        return os.path.join(self.spool_dir, str(job_id))
+
+
+    def _read_job(self, job_id):
+        """ Return description of a job, None if it does not exist """
+        try:
+            with open(os.path.join(self._job_dir(job_id), JOB_FILE), 'r') as jfile:
+                return json.load(jfile)
+        except (IOError, OSError, ValueError):
+            return None
+
+
+    def _write_job(self, job):
+        """ Atomically write description of a job """
+        job_dir = self._job_dir(job['id'])
+        fdesc, tmp_file = tempfile.mkstemp(dir=job_dir, suffix='.tmp')
+        with os.fdopen(fdesc, 'w') as jfile:
+            json.dump(job, jfile)
+        os.replace(tmp_file, os.path.join(job_dir, JOB_FILE))
+
+
+    def _create_job(self, script, cwd, job_name, **fields):
+        """ Allocate a job id and write a PENDING job
+
+        Args:
+            script (str): job script
+            cwd (str): job working directory, current directory if None
+            job_name (str): job name, script file name if None
+            fields: other job fields
+
+        Returns:
+            (dict) job
+        """
+        cwd = os.path.abspath(cwd or os.getcwd())
+        with self._spool_lock():
+            job_ids = [int(name) for name in os.listdir(self.spool_dir) if name.isdigit()]
+            counter_file = os.path.join(self.spool_dir, 'last_id')
+            try:
+                with open(counter_file, 'r') as cfile:
+                    job_ids.append(int(cfile.read()))
+            except (IOError, OSError, ValueError):
+                pass
+            job_id = str(max(job_ids) + 1 if job_ids else 1)
+            with open(counter_file, 'w') as cfile:
+                cfile.write(job_id)
+            os.makedirs(self._job_dir(job_id))
+
+        job = {'id': job_id, 'name': job_name or os.path.basename(script),
+               'script': os.path.join(cwd, script), 'cwd': cwd,
+               'state': 'PENDING', 'submit_time': time.time(), 'start_time': None,
+               'end_time': None, 'pid': None, 'exit_code': None}
+        job.update(fields)
+        self._write_job(job)
+        return job
+
+
+    def submit(self, script, cwd=None, cpus=1, job_name=None):
+        """ Submit a job script, it is run with bash by a background process
+
+        Args:
+            script (str): job script
+            cwd (str): job working directory, current directory if None
+            cpus (int): number of CPUs of the job, clamped with a warning to the
+                        number of CPUs ubench may use
+            job_name (str): job name, script file name if None
+
+        Returns:
+            (str) job id
+        """
+        if int(cpus) > len(self.cpus):
+            # Job output is read as sbatch one, warnings go to stderr as sbatch ones
+            print('!!Warning: job asks for {} CPUs, only {} CPUs are available: it is run on '
+                  '{} CPUs and may be oversubscribed'.format(cpus, len(self.cpus), len(self.cpus)),
+                  file=sys.stderr)
+        cpus = max(1, min(int(cpus), len(self.cpus)))
+        job = self._create_job(script, cwd, job_name, ncpus=cpus, cpus=[])
+
+        # Runner pid is recorded before the runner reads the job, so that a
+        # runner dying before it starts the job is detected
+        with open(os.devnull, 'r+') as devnull, self._spool_lock():
+            runner = subprocess.Popen([sys.executable, '-m', __name__,
+                                       '--spool-dir', self.spool_dir, '--run-job', job['id']],
+                                      cwd=job['cwd'], stdin=devnull, stdout=devnull,
+                                      stderr=devnull, start_new_session=True)
+            job['pid'] = runner.pid
+            self._write_job(job)
+        # Job file is then only updated by the runner
+        return job['id']
+
+
+    def _acquire_cpus(self, ncpus):
+        """ Lock ncpus free CPUs
+
+        Returns:
+            (list) [(cpu, lock file)] of locked CPUs, empty if not enough CPUs are free
+        """
+        locked = []
+        with self._spool_lock():
+            for cpu in self.cpus:
+                lock_file = open(os.path.join(self.spool_dir, 'cpu-{}.lock'.format(cpu)), 'a')
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except (IOError, OSError):
+                    lock_file.close()
+                    continue
+                locked.append((cpu, lock_file))
+                if len(locked) == ncpus:
+                    return locked
+
+        for _, lock_file in locked:
+            lock_file.close()
+        return []
+
+
+    def run_job(self, job_id, poll_interval=0.5, max_poll_interval=5):
+        """ Wait for free CPUs, then run a submitted job bound to these CPUs.
+        Called by the background process started by submit.
+
+        Args:
+            job_id (str): job id
+            poll_interval (float): initial delay between free CPU lookups in seconds
+            max_poll_interval (float): maximum delay between free CPU lookups in seconds
+
+        Returns:
+            (int) exit code of the job script
+        """
+        with self._spool_lock():
+            job = self._read_job(job_id)
+            job['pid'] = os.getpid()
+            self._write_job(job)
+        locked = self._acquire_cpus(job['ncpus'])
+        while not locked:
+            time.sleep(poll_interval)
+            poll_interval = min(max_poll_interval, poll_interval * 1.5)
+            locked = self._acquire_cpus(job['ncpus'])
+
+        job['cpus'] = [cpu for cpu, _ in locked]
+        job['state'] = 'RUNNING'
+        job['start_time'] = time.time()
+        self._write_job(job)
+
+        # The job script and every process it starts inherit the CPU affinity
+        # and the CPU locks
+        os.sched_setaffinity(0, job['cpus'])
+        env = dict(os.environ, UBENCH_JOB_ID=job_id, UBENCH_JOB_CPUS=str(len(job['cpus'])))
+        with open(os.path.join(self._job_dir(job_id), 'output'), 'w') as output:
+            exit_code = subprocess.call(['bash', job['script']], cwd=job['cwd'], env=env,
+                                        stdout=output, stderr=subprocess.STDOUT,
+                                        pass_fds=[lock_file.fileno() for _, lock_file in locked])
+
+        job['exit_code'] = exit_code
+        job['state'] = 'COMPLETED' if exit_code == 0 else 'FAILED'
+        job['end_time'] = time.time()
+        self._write_job(job)
+        for _, lock_file in locked:
+            lock_file.close()
+        return exit_code
+
+
+    def _state(self, job):
+        """ Return state of a job, NODE_FAIL if its processes died unexpectedly """
+        # The runner is the leader of the job process group
+        if job['state'] in ('PENDING', 'RUNNING') and job['pid'] \
+           and not _group_alive(job['pid']):
+            # The job file may have been updated since it was read
+            job = self._read_job(job['id']) or job
+            if job['state'] in ('PENDING', 'RUNNING'):
+                return 'NODE_FAIL'
+        return job['state']
+
+
+    def get_jobs_state(self, job_ids=[]):  # pylint: disable=dangerous-default-value
+        """ Return a hash with jobs status using a list of jobs ids,
+        unknown jobs are not returned """
+        states = {}
+        for job_id in job_ids:
+            job = self._read_job(job_id)
+            if job:
+                states[str(job_id)] = self._state(job)
+        return states
+
+
+    def get_jobs_info(self, job_ids):
+        """ Return job information of several jobs.
+
+        Args:
+            (list) job_ids: jobs ids
+
+        Returns:
+            (dictionary) job id -> list of job information,
+                         see SlurmInterface.get_jobs_info
+        """
+        jobs_info = {}
+        for job_id in job_ids:
+            job = self._read_job(job_id)
+            if not job:
+                continue
+            start = job['start_time']
+            end = job['end_time'] or (time.time() if start else None)
+            jobs_info[str(job_id)] = [{'job_name': job['name'],
+                                       'job_elasped': _format_elapsed(end - start if start else 0),
+                                       'job_nodelist': [socket.gethostname()],
+                                       'job_submit_time': _format_time(job['submit_time']),
+                                       'job_start_time': _format_time(start)}]
+        return jobs_info
+
+
+    def get_job_info(self, job_id):
+        """ Return job information of a job, see get_jobs_info """
+        return self.get_jobs_info([job_id]).get(str(job_id), [])
+
+
+    def purge(self, max_age):
+        """ Remove finished jobs older than max_age seconds
+
+        Returns:
+            (int) number of removed jobs
+        """
+        removed = 0
+        now = time.time()
+        for name in os.listdir(self.spool_dir):
+            job = self._read_job(name) if name.isdigit() else None
+            if job and job['end_time'] and now - job['end_time'] > max_age:
+                shutil.rmtree(self._job_dir(name), ignore_errors=True)
+                removed += 1
+        return removed
+
+
+    def get_available_nodes(self, slices_size=1):
+        """ Returns the current node """
+        return [socket.gethostname()]
+
+
+    def get_truncated_nodes_lists(self, nnodes_list, nodes_id):
+        """ From a list of nodes number and a list of nodes id returns a list of nodes_id
+        truncated according to nodes number """
+        nodeset = NodeSet(nodes_id)
+        nodes_id_list = []
+        for nnode in nnodes_list:
+            if nnode > len(nodeset):
+                raise Exception('Number of nodes is greater than the giver number of nodes id')
+            nodes_id_list.append(str(nodeset[:nnode]))
+        return nodes_id_list
+
+
+    def get_nnodes_from_string(self, nodes_id):
+        """ Returns the number of nodes of a set of nodes """
+        return len(NodeSet(nodes_id))
+
+
+def main(argv=None):
+    """ ubench-local-submit command: submit a job script to the local scheduler
+    and print its id as sbatch does """
+    parser = argparse.ArgumentParser(description='Run a job script in background on the '
+                                     'current node, bound to its own CPUs.')
+    parser.add_argument('-c', '--cpus', type=int, default=1,
+                        help='Number of CPUs of the job (default: 1)')
+    parser.add_argument('-J', '--job-name', help='Job name')
+    parser.add_argument('--spool-dir', help='Directory where jobs are kept')
+    parser.add_argument('--run-job', help=argparse.SUPPRESS)
+    parser.add_argument('script', nargs='?', help='Job script')
+    args = parser.parse_args(argv)
+
+    interface = LocalSchedulerInterface(args.spool_dir)
+    if args.run_job:
+        return interface.run_job(args.run_job)
+
+    if not args.script:
+        parser.error('a job script is required')
+    interface.purge(ubench.config.LOCAL_SCHEDULER_KEEP_TIME)
+    print('Submitted batch job {}'.format(interface.submit(args.script, cpus=args.cpus,
+                                                           job_name=args.job_name)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,361 @@
+##############################################################################
+#  This file is part of the UncleBench benchmarking tool.                    #
+#        Copyright (C) 2019 EDF SA                                           #
+#                                                                            #
+#  UncleBench is free software: you can redistribute it and/or modify        #
+#  it under the terms of the GNU General Public License as published by      #
+#  the Free Software Foundation, either version 3 of the License, or         #
+#  (at your option) any later version.                                       #
+#                                                                            #
+#  UncleBench is distributed in the hope that it will be useful,             #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the              #
+#  GNU General Public License for more details.                              #
+#                                                                            #
+#  You should have received a copy of the GNU General Public License         #
+#  along with UncleBench. If not, see <http://www.gnu.org/licenses/>.        #
+#                                                                            #
+##############################################################################
+""" Provides NodePacker class, pack_jobs and size_allocation functions.
+
+Packing runs the jobs of a campaign in a single Slurm allocation instead of
+submitting each of them to the queue. Jobs submitted with ubench-pack-submit
+are only queued in a spool directory. Once every benchmark has queued its
+jobs, one allocation sized for them is requested, and queued jobs are
+started in this allocation as soon as enough of its nodes are free.
+
+Job scripts are started by the campaign process with SLURM_JOB_ID set to the
+allocation, so srun commands of the scripts run exclusive job steps of
+SLURM_NNODES nodes of the allocation.
+"""
+
+import argparse
+import math
+import os
+import re
+import subprocess
+import sys
+import time
+
+from ubench.scheduler_interfaces.job_tracker import FINISH_STATES
+from ubench.scheduler_interfaces.local_interface import LocalSchedulerInterface
+
+DEFAULT_TIMELIMIT = 3600 # seconds
+# Allocation time limit is the packed jobs duration increased by this ratio
+ALLOCATION_MARGIN = 1.1
+
+
+def parse_timelimit(value, default=DEFAULT_TIMELIMIT):
+    """ Return seconds of a Slurm time limit
+
+    Args:
+        value (str): minutes, MM:SS, HH:MM:SS, D-HH, D-HH:MM or D-HH:MM:SS
+        default (int): returned if value is empty or not a time limit
+
+    Returns:
+        (int) seconds
+    """
+    match = re.match(r'^(?:(\d+)-)?(\d+)(?::(\d+))?(?::(\d+))?$', str(value or '').strip())
+    if not match:
+        return default
+
+    days, first, second, third = [int(val) if val else 0 for val in match.groups()]
+    if match.group(1):
+        seconds = ((days * 24 + first) * 60 + second) * 60 + third
+    elif match.group(4):
+        seconds = (first * 60 + second) * 60 + third
+    elif match.group(3):
+        seconds = first * 60 + second
+    else:
+        seconds = first * 60
+    return seconds if seconds > 0 else default
+
+
+def pack_jobs(jobs, nnodes):
+    """ Pack jobs in an allocation of nnodes nodes.
+
+    Jobs are placed largest first (nodes x time limit) at the earliest time
+    enough nodes are free, every job using its nodes for its whole time limit.
+
+    Args:
+        jobs (list): (job id, number of nodes, time limit in seconds) tuples
+        nnodes (int): number of nodes of the allocation
+
+    Returns:
+        ([(job id, start time in seconds)] sorted by start time, makespan in seconds)
+        tuple, None if a job needs more than nnodes nodes
+    """
+    if any(job_nodes > nnodes for _, job_nodes, _ in jobs):
+        return None
+
+    free_at = [0] * nnodes
+    schedule = []
+    for job_id, job_nodes, timelimit in sorted(jobs, key=lambda job: (-job[1] * job[2],
+                                                                      -job[1], str(job[0]))):
+        free_at.sort()
+        start = free_at[job_nodes - 1]
+        for idx in range(job_nodes):
+            free_at[idx] = start + timelimit
+        schedule.append((job_id, start))
+
+    schedule.sort(key=lambda item: item[1])
+    return schedule, max(free_at) if jobs else 0
+
+
+def size_allocation(jobs, max_nodes=None):
+    """ Return number of nodes of an allocation packing jobs.
+
+    The number of nodes wasting the least node time while jobs run is
+    chosen, the fastest one among equally wasteful ones.
+
+    Args:
+        jobs (list): (job id, number of nodes, time limit in seconds) tuples
+        max_nodes (int): maximum number of nodes, nodes needed to run every job
+                         at the same time if None
+
+    Returns:
+        (number of nodes, makespan in seconds) tuple
+    """
+    min_nodes = max(job_nodes for _, job_nodes, _ in jobs)
+    all_nodes = sum(job_nodes for _, job_nodes, _ in jobs)
+    max_nodes = max(min_nodes, min(max_nodes or all_nodes, all_nodes))
+
+    best = None
+    for nnodes in range(min_nodes, max_nodes + 1):
+        _, makespan = pack_jobs(jobs, nnodes)
+        cost = (nnodes * makespan, makespan)
+        if best is None or cost < best[0]:
+            best = (cost, nnodes, makespan)
+
+    return best[1], best[2]
+
+
+class NodePacker(LocalSchedulerInterface):
+    """ Runs queued jobs in a single Slurm allocation.
+
+    Methods:
+        submit(script, cwd, nnodes, timelimit, job_name)
+        submit_command()
+        allocate()
+        dispatch()
+        release()
+        get_jobs_state(job_ids)
+        get_jobs_info(job_ids)
+    """
+
+
+    def __init__(self, spool_dir, max_nodes=None, scheduler_interface=None):
+        """ Constructor
+
+        Args:
+            spool_dir (str): directory where jobs are queued
+            max_nodes (int): maximum number of nodes of the allocation
+            scheduler_interface: interface reading the allocation state, SlurmInterface if None
+        """
+        super(NodePacker, self).__init__(spool_dir, cpus=[])
+        if scheduler_interface is None:
+            from ubench.scheduler_interfaces.slurm_interface import SlurmInterface
+            scheduler_interface = SlurmInterface()
+        self.scheduler_interface = scheduler_interface
+        self.max_nodes = max_nodes
+        self.allocation_id = None
+        self.nnodes = 0
+        self._salloc = None
+        # job id -> running job script process
+        self._processes = {}
+
+
+    def submit(self, script, cwd=None, nnodes=1, timelimit=None, job_name=None):  # pylint: disable=arguments-differ,too-many-arguments
+        """ Queue a job script
+
+        Args:
+            script (str): job script
+            cwd (str): job working directory, current directory if None
+            nnodes (int): number of nodes of the job
+            timelimit (str): Slurm time limit of the job, DEFAULT_TIMELIMIT if not valid
+            job_name (str): job name, script file name if None
+
+        Returns:
+            (str) job id
+        """
+        try:
+            nnodes = max(1, int(nnodes))
+        except (TypeError, ValueError):
+            nnodes = 1
+        return self._create_job(script, cwd, job_name, nnodes=nnodes,
+                                timelimit=parse_timelimit(timelimit))['id']
+
+
+    def submit_command(self):
+        """ Return command JUBE workpackages submit their job script with """
+        return ('ubench-pack-submit --spool-dir {} -N $nodes --time="$timelimit"'
+                ' -J $jube_benchmark_name'.format(self.spool_dir))
+
+
+    def _jobs(self, states):
+        """ Return jobs in states sorted by id """
+        jobs = [self._read_job(name) for name in os.listdir(self.spool_dir) if name.isdigit()]
+        return sorted([job for job in jobs if job and job['state'] in states],
+                      key=lambda job: int(job['id']))
+
+
+    def _finish(self, job, state, exit_code=None):
+        """ Write final state of a job """
+        job['state'] = state
+        job['exit_code'] = exit_code
+        job['end_time'] = time.time()
+        self._write_job(job)
+
+
+    def allocate(self):
+        """ Request an allocation sized for queued jobs if none was requested
+
+        Returns:
+            (bool) True if an allocation was requested
+        """
+        if self._salloc or self.allocation_id:
+            return False
+
+        jobs = [(job['id'], job['nnodes'], job['timelimit']) for job in self._jobs(['PENDING'])]
+        if not jobs:
+            return False
+
+        self.nnodes, makespan = size_allocation(jobs, self.max_nodes)
+        minutes = int(math.ceil(makespan * ALLOCATION_MARGIN / 60.0))
+        print('---- Requesting {} nodes for {} minutes to run {} packed jobs'
+              .format(self.nnodes, minutes, len(jobs)))
+        self._salloc = subprocess.Popen(['salloc', '--no-shell', '--nodes={}'.format(self.nnodes),
+                                         '--time={}'.format(minutes), '--job-name=ubench-pack'],
+                                        stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                        stderr=subprocess.STDOUT, universal_newlines=True)
+        return True
+
+
+    def _allocation_state(self):
+        """ Return state of the allocation, None if it has not been granted yet """
+        if self._salloc and self._salloc.poll() is not None:
+            output = self._salloc.stdout.read()
+            self._salloc.stdout.close()
+            self._salloc = None
+            match = re.search(r'Granted job allocation (\d+)', output)
+            if not match:
+                print('!!Warning: packed jobs allocation failed: {}'.format(output.strip()))
+                for job in self._jobs(['PENDING']):
+                    self._finish(job, 'CANCELLED')
+                return None
+            self.allocation_id = match.group(1)
+
+        if not self.allocation_id:
+            return None
+        return self.scheduler_interface.get_jobs_state([self.allocation_id]).get(
+            self.allocation_id, 'RUNNING')
+
+
+    def _reap(self):
+        """ Write state of finished job scripts """
+        for job_id, process in list(self._processes.items()):
+            exit_code = process.poll()
+            if exit_code is None:
+                continue
+            del self._processes[job_id]
+            self._finish(self._read_job(job_id), 'COMPLETED' if exit_code == 0 else 'FAILED',
+                         exit_code)
+
+
+    def _start(self, job):
+        """ Start a job script in the allocation """
+        env = dict(os.environ,
+                   SLURM_JOB_ID=self.allocation_id, SLURM_JOBID=self.allocation_id,
+                   SLURM_NNODES=str(job['nnodes']), SLURM_EXCLUSIVE='1',
+                   UBENCH_JOB_ID=job['id'])
+        # Job script leads its own process group, as local scheduler jobs do
+        with open(os.path.join(self._job_dir(job['id']), 'output'), 'w') as output:
+            process = subprocess.Popen(['bash', job['script']], cwd=job['cwd'], env=env,
+                                       stdin=subprocess.DEVNULL, stdout=output,
+                                       stderr=subprocess.STDOUT, start_new_session=True)
+        self._processes[job['id']] = process
+        job['state'] = 'RUNNING'
+        job['start_time'] = time.time()
+        job['pid'] = process.pid
+        self._write_job(job)
+
+
+    def dispatch(self):
+        """ Start queued jobs which fit on free nodes of the allocation.
+
+        Jobs are started in pack_jobs order, a job which does not fit does
+        not prevent smaller jobs from starting. Queued and running jobs
+        are cancelled if the allocation ends.
+
+        Returns:
+            (list) ids of started jobs
+        """
+        self._reap()
+        state = self._allocation_state()
+        if state in FINISH_STATES:
+            self._cancel()
+            return []
+        if state != 'RUNNING':
+            return []
+
+        pending = {job['id']: job for job in self._jobs(['PENDING'])}
+        if not pending:
+            return []
+        free_nodes = self.nnodes - sum(job['nnodes'] for job in self._jobs(['RUNNING']))
+        schedule, _ = pack_jobs([(job['id'], job['nnodes'], job['timelimit'])
+                                 for job in pending.values()], self.nnodes) or ([], 0)
+        started = []
+        for job_id, _ in schedule:
+            if pending[job_id]['nnodes'] <= free_nodes:
+                self._start(pending[job_id])
+                free_nodes -= pending[job_id]['nnodes']
+                started.append(job_id)
+
+        return started
+
+
+    def _cancel(self):
+        """ Cancel queued and running jobs """
+        for job_id, process in list(self._processes.items()):
+            process.terminate()
+            process.wait()
+            del self._processes[job_id]
+        for job in self._jobs(['PENDING', 'RUNNING']):
+            self._finish(job, 'CANCELLED')
+
+
+    def release(self):
+        """ Release the allocation, queued and running jobs are cancelled """
+        if self._salloc:
+            self._salloc.terminate()
+            self._salloc.wait()
+            self._salloc.stdout.close()
+            self._salloc = None
+        self._reap()
+        self._cancel()
+        if self.allocation_id:
+            subprocess.call(['scancel', self.allocation_id])
+            self.allocation_id = None
+
+
+def main(argv=None):
+    """ ubench-pack-submit command: queue a job script to be run in the packed jobs
+    allocation of a campaign and print its id as sbatch does """
+    parser = argparse.ArgumentParser(description='Queue a job script to be run in the packed '
+                                     'jobs allocation of a campaign.')
+    parser.add_argument('--spool-dir', required=True, help='Directory where jobs are queued')
+    parser.add_argument('-N', '--nodes', default='1', help='Number of nodes of the job')
+    parser.add_argument('-t', '--time', help='Time limit of the job')
+    parser.add_argument('-J', '--job-name', help='Job name')
+    parser.add_argument('script', help='Job script')
+    args = parser.parse_args(argv)
+
+    packer = NodePacker(args.spool_dir)
+    print('Submitted batch job {}'.format(packer.submit(args.script, nnodes=args.nodes,
+                                                        timelimit=args.time,
+                                                        job_name=args.job_name)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -17,7 +17,83 @@
 #  along with UncleBench. If not, see <http://www.gnu.org/licenses/>.        #
 #                                                                            #
 ##############################################################################
-""" Provides SchedulerInterface class """
+""" Provides SchedulerInterface class and get_scheduler_interface function """
+
+import os
+from pydoc import locate
+
+import lxml.etree as ET
+import ubench.config
+
+
+def _platform_xml_files(platform, platform_dir):
+    """ Return platform XML files of a platform, nodetype ones first """
+    for dirpath, dirnames, filenames in os.walk(platform_dir):
+        dirnames.sort()
+        if os.path.basename(dirpath).lower() != platform.lower():
+            continue
+        if 'nodetype.xml' in filenames:
+            return [os.path.join(dirpath, 'nodetype.xml'),
+                    os.path.join(os.path.dirname(dirpath), 'platform.xml')]
+        if 'platform.xml' in filenames:
+            return [os.path.join(dirpath, 'platform.xml')]
+    return []
+
+
+def platform_scheduler(platform, platform_dir=None):
+    """ Return scheduler of a platform.
+
+    The scheduler is the value of the scheduler parameter found in the
+    platform XML files or in the files their sets are initialized with.
+
+    Args:
+        platform (str): platform name
+        platform_dir (str): platforms directory, UbenchConfig().platform_dir if None
+
+    Returns:
+        (str) scheduler name, ubench.config.SCHEDULER if the platform has no
+        scheduler parameter
+    """
+    if platform_dir is None:
+        from ubench.core.ubench_config import UbenchConfig
+        platform_dir = UbenchConfig().platform_dir
+
+    # Included files are appended while files are read
+    xml_files = _platform_xml_files(platform, platform_dir)
+    for xml_file in xml_files:
+        try:
+            root = ET.parse(xml_file).getroot()
+        except (ET.ParseError, IOError):
+            continue
+        for parameter in root.iter('parameter'):
+            if parameter.get('name') == 'scheduler' and parameter.text:
+                return parameter.text.strip()
+        for init_with in sorted(set(element.get('init_with') for element in root.iter()
+                                    if element.get('init_with'))):
+            for include_dir in (os.path.dirname(xml_file), platform_dir):
+                include_file = os.path.join(include_dir, init_with)
+                if os.path.isfile(include_file):
+                    if include_file not in xml_files:
+                        xml_files.append(include_file)
+                    break
+
+    return ubench.config.SCHEDULER
+
+
+def get_scheduler_interface(platform=None):
+    """ Return scheduler interface of a platform
+
+    Args:
+        platform (str): platform name, ubench.config.SCHEDULER is used if None
+
+    Returns:
+        scheduler interface object, see ubench.config.SCHEDULER_INTERFACE_CLASSES
+    """
+    name = platform_scheduler(platform) if platform else ubench.config.SCHEDULER
+    if name not in ubench.config.SCHEDULER_INTERFACE_CLASSES:
+        print('!!Warning: unknown scheduler {}, using {}'.format(name, ubench.config.SCHEDULER))
+        name = ubench.config.SCHEDULER
+    return locate(ubench.config.SCHEDULER_INTERFACE_CLASSES[name])()
 
 
 class SchedulerInterface(object):
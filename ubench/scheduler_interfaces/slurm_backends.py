@@ -0,0 +1,341 @@
+##############################################################################
+#  This file is part of the UncleBench benchmarking tool.                    #
+#        Copyright (C) 2019 EDF SA                                           #
+#                                                                            #
+#  UncleBench is free software: you can redistribute it and/or modify        #
+#  it under the terms of the GNU General Public License as published by      #
+#  the Free Software Foundation, either version 3 of the License, or         #
+#  (at your option) any later version.                                       #
+#                                                                            #
+#  UncleBench is distributed in the hope that it will be useful,             #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the              #
+#  GNU General Public License for more details.                              #
+#                                                                            #
+#  You should have received a copy of the GNU General Public License         #
+#  along with UncleBench. If not, see <http://www.gnu.org/licenses/>.        #
+#                                                                            #
+##############################################################################
+""" Provides Slurm backends reading job states and information as JSON.
+
+ - SlurmJsonBackend runs squeue --json and sacct --json
+ - SlurmRestBackend queries slurmrestd, no process is forked
+
+Backends have get_jobs_state(job_ids) and get_jobs_info(job_ids) methods
+returning None when Slurm cannot be queried, SlurmInterface then falls back
+on squeue and sacct text output.
+"""
+
+import datetime
+import json
+import os
+
+from six.moves import urllib
+from ClusterShell.NodeSet import NodeSet
+import ubench.config
+import ubench.utils as utils
+
+BACKENDS = ('cli', 'json', 'rest')
+
+
+def slurm_backend(name=None):
+    """ Return Slurm backend
+
+    Args:
+        name (str): 'cli', 'json' or 'rest', ubench.config.SLURM_BACKEND if None
+
+    Returns:
+        backend object, None for the squeue and sacct text output ('cli')
+    """
+    if name is None:
+        name = ubench.config.SLURM_BACKEND
+    if name == 'json':
+        return SlurmJsonBackend()
+    if name == 'rest':
+        return SlurmRestBackend()
+    if name != 'cli':
+        print('!!Warning: unknown Slurm backend {}, choose one of {}'
+              .format(name, ', '.join(BACKENDS)))
+    return None
+
+
+def job_id_chunks(job_ids, max_length):
+    """ Split job ids in comma separated lists not longer than max_length """
+    chunks = []
+    for job_id in job_ids:
+        if chunks and len(chunks[-1]) + len(job_id) + 1 <= max_length:
+            chunks[-1] += ',' + job_id
+        else:
+            chunks.append(job_id)
+    return chunks
+
+
+def _number(value):
+    """ Return number of a Slurm JSON number, None if it is not set.
+
+    Depending on Slurm version numbers are plain values or
+    {"set": bool, "infinite": bool, "number": value} objects.
+    """
+    if isinstance(value, dict):
+        if not value.get('set', True) or value.get('infinite'):
+            return None
+        return value.get('number')
+    return value
+
+
+def _state(value):
+    """ Return job state of a Slurm JSON state: "STATE", ["STATE", flags...]
+    or {"current": ...} """
+    if isinstance(value, dict):
+        value = value.get('current')
+    if isinstance(value, list):
+        value = value[0] if value else None
+    return value
+
+
+def _elapsed(seconds):
+    """ Format a duration in seconds as sacct does: [D-]HH:MM:SS """
+    seconds = int(_number(seconds) or 0)
+    days, seconds = divmod(seconds, 86400)
+    elapsed = '{:02d}:{:02d}:{:02d}'.format(seconds // 3600, seconds % 3600 // 60, seconds % 60)
+    return '{}-{}'.format(days, elapsed) if days else elapsed
+
+
+def _timestamp(epoch):
+    """ Format a timestamp as sacct does: YYYY-MM-DDTHH:MM:SS, Unknown if not set """
+    epoch = _number(epoch)
+    if not epoch:
+        return 'Unknown'
+    return datetime.datetime.fromtimestamp(epoch).strftime('%Y-%m-%dT%H:%M:%S')
+
+
+def _nodelist(nodes):
+    """ Return list of nodes of a Slurm JSON node range """
+    if isinstance(nodes, dict):
+        nodes = nodes.get('range') or nodes.get('nodes')
+    if isinstance(nodes, list):
+        return [str(node) for node in nodes]
+    if not nodes or nodes == 'None assigned':
+        return []
+    return [node for node in NodeSet(nodes)]
+
+
+def _step_id(step):
+    """ Return step id of a sacct JSON step: 'batch', 'extern', '0'... """
+    step_id = step.get('step', {}).get('id')
+    if isinstance(step_id, dict):
+        return str(step_id.get('step_id'))
+    return str(step_id).split('.', 1)[-1]
+
+
+def parse_squeue_json(data):
+    """ Return job states of squeue --json or slurmrestd /slurm/jobs output
+
+    Args:
+        data (dict): decoded JSON output
+
+    Returns:
+        (dict) job id -> state
+    """
+    return {str(job['job_id']): _state(job.get('job_state'))
+            for job in data.get('jobs', []) if _state(job.get('job_state'))}
+
+
+def parse_sacct_json(data):
+    """ Return job states and job information of sacct --json or slurmrestd
+    /slurmdb/jobs output.
+
+    As with sacct text output, the state of the first step of a job is
+    returned if the job has one and batch steps are not part of job information.
+
+    Args:
+        data (dict): decoded JSON output
+
+    Returns:
+        ({job id: state}, {job id: list of job and job steps information}) tuple,
+        job information dictionaries are those of SlurmInterface.get_jobs_info
+    """
+    states = {}
+    infos = {}
+    for job in data.get('jobs', []):
+        job_id = str(job['job_id'])
+        job_time = job.get('time', {})
+        state = _state(job.get('state'))
+        info = [{'job_name': job.get('name'),
+                 'job_elasped': _elapsed(job_time.get('elapsed')),
+                 'job_nodelist': _nodelist(job.get('nodes')),
+                 'job_submit_time': _timestamp(job_time.get('submission')),
+                 'job_start_time': _timestamp(job_time.get('start'))}]
+
+        for step in job.get('steps', []):
+            step_id = _step_id(step)
+            step_name = step.get('step', {}).get('name')
+            step_time = step.get('time', {})
+            if step_id == '0' and _state(step.get('state')):
+                state = _state(step.get('state'))
+            if step_name == 'batch':
+                continue
+            info.append({'job_name': step_name,
+                         'job_elasped': _elapsed(step_time.get('elapsed')),
+                         'job_nodelist': _nodelist(step.get('nodes')),
+                         'job_submit_time': _timestamp(step_time.get('start')),
+                         'job_start_time': _timestamp(step_time.get('start'))})
+
+        if state:
+            states[job_id] = state
+        infos[job_id] = info
+
+    return states, infos
+
+
+class SlurmJsonBackend(object):
+    """ Reads job states and information from squeue --json and sacct --json.
+
+    States of queued jobs are read with one squeue command, states of
+    other jobs and job information with one sacct command per chunk of
+    job ids.
+
+    Methods:
+        get_jobs_state(job_ids)
+        get_jobs_info(job_ids)
+    """
+
+
+    def __init__(self, max_length=32768):
+        """ Class constructor
+
+        Args:
+            max_length (int): maximum length of the job ids list of a command
+        """
+        self.max_length = max_length
+
+
+    def _run_json(self, cmd):
+        """ Return decoded JSON output of a command, None if it fails """
+        ret_code, stdout, _ = utils.run_cmd(cmd, os.getcwd())
+        if ret_code:
+            return None
+        try:
+            return json.loads('\n'.join(stdout))
+        except ValueError:
+            return None
+
+
+    def _sacct(self, job_ids):
+        """ Return parse_sacct_json result of jobs, None if sacct fails """
+        states = {}
+        infos = {}
+        for chunk in job_id_chunks(job_ids, self.max_length):
+            data = self._run_json('sacct --json --jobs={}'.format(chunk))
+            if data is None:
+                return None
+            chunk_states, chunk_infos = parse_sacct_json(data)
+            states.update(chunk_states)
+            infos.update(chunk_infos)
+        return states, infos
+
+
+    def get_jobs_state(self, job_ids):
+        """ Return job id -> state of jobs, None if Slurm cannot be queried """
+        states = {}
+        for chunk in job_id_chunks(job_ids, self.max_length):
+            # squeue fails when no job of the list is known by the controller anymore
+            data = self._run_json('squeue --json --jobs={}'.format(chunk))
+            if data is not None:
+                states.update(parse_squeue_json(data))
+
+        missing = [job_id for job_id in job_ids if job_id not in states]
+        if missing:
+            sacct = self._sacct(missing)
+            if sacct is None:
+                return states if states else None
+            states.update(sacct[0])
+
+        return {job_id: state for job_id, state in states.items() if job_id in job_ids}
+
+
+    def get_jobs_info(self, job_ids):
+        """ Return job id -> job information, None if Slurm cannot be queried """
+        sacct = self._sacct(job_ids)
+        return sacct[1] if sacct is not None else None
+
+
+class SlurmRestBackend(object):
+    """ Reads job states and information from slurmrestd.
+
+    Jobs are read from the slurmdbd jobs endpoint which knows queued,
+    running and finished jobs, with one request per chunk of job ids.
+    Requests are authenticated with the SLURM_JWT token.
+
+    Methods:
+        get_jobs_state(job_ids)
+        get_jobs_info(job_ids)
+    """
+
+
+    def __init__(self, url=None, api_version=None, token=None, user=None,  # pylint: disable=too-many-arguments
+                 max_length=4096, timeout=30):
+        """ Class constructor
+
+        Args:
+            url (str): slurmrestd URL, ubench.config.SLURMRESTD_URL if None
+            api_version (str): slurmrestd API version,
+                               ubench.config.SLURMRESTD_API_VERSION if None
+            token (str): JWT token, SLURM_JWT environment variable if None
+            user (str): user name, ubench.config.USER if None
+            max_length (int): maximum length of the job ids list of a request
+            timeout (float): request timeout in seconds
+        """
+        self.url = (url or ubench.config.SLURMRESTD_URL).rstrip('/')
+        self.api_version = api_version or ubench.config.SLURMRESTD_API_VERSION
+        self.token = token if token is not None else os.environ.get('SLURM_JWT', '')
+        self.user = user or ubench.config.USER
+        self.max_length = max_length
+        self.timeout = timeout
+
+
+    def _get(self, path, params):
+        """ Return decoded JSON response of a GET request, None if it fails """
+        request = urllib.request.Request(
+            '{}/{}?{}'.format(self.url, path, urllib.parse.urlencode(params)),
+            headers={'X-SLURM-USER-NAME': self.user,
+                     'X-SLURM-USER-TOKEN': self.token,
+                     'Accept': 'application/json'})
+        try:
+            response = urllib.request.urlopen(request, timeout=self.timeout)
+            with response:
+                data = json.loads(response.read().decode('utf-8'))
+        except (urllib.error.URLError, OSError, ValueError) as err:
+            print('!!Warning: unclebench was not able to query slurmrestd: {}'.format(err))
+            return None
+
+        if data.get('errors'):
+            print('!!Warning: slurmrestd errors: {}'.format(data['errors']))
+            return None
+        return data
+
+
+    def _jobs(self, job_ids):
+        """ Return parse_sacct_json result of jobs, None if slurmrestd fails """
+        states = {}
+        infos = {}
+        for chunk in job_id_chunks(job_ids, self.max_length):
+            data = self._get('slurmdb/{}/jobs'.format(self.api_version), {'step': chunk})
+            if data is None:
+                return None
+            chunk_states, chunk_infos = parse_sacct_json(data)
+            states.update(chunk_states)
+            infos.update(chunk_infos)
+        return states, infos
+
+
+    def get_jobs_state(self, job_ids):
+        """ Return job id -> state of jobs, None if Slurm cannot be queried """
+        jobs = self._jobs(job_ids)
+        return jobs[0] if jobs is not None else None
+
+
+    def get_jobs_info(self, job_ids):
+        """ Return job id -> job information, None if Slurm cannot be queried """
+        jobs = self._jobs(job_ids)
+        return jobs[1] if jobs is not None else None
@@ -23,13 +23,29 @@
 
 import os
 import re
-import json
-import time
-import hashlib
 from subprocess import Popen, PIPE
 from ClusterShell.NodeSet import NodeSet
-import ubench.config
 import ubench.utils as utils
+from ubench.scheduler_interfaces.job_state_cache import JobStateCache
+from ubench.scheduler_interfaces.slurm_backends import slurm_backend, job_id_chunks
+
+# Maximum length of the job ids list given to a single sacct command
+SACCT_MAX_JOBS_LENGTH = 32768
+SLURM_CONF = '/etc/slurm/slurm.conf'
+
+
+def slurm_cluster_name():
+    """ Return name of the Slurm cluster, read from SLURM_CLUSTER_NAME or from
+    the ClusterName parameter of slurm.conf, empty if it is not known """
+    if os.environ.get('SLURM_CLUSTER_NAME'):
+        return os.environ['SLURM_CLUSTER_NAME']
+    try:
+        with open(os.environ.get('SLURM_CONF', SLURM_CONF), 'r') as conf_file:
+            match = re.search(r'^\s*ClusterName\s*=\s*(\S+)', conf_file.read(),
+                              re.IGNORECASE | re.MULTILINE)
+    except (IOError, OSError):
+        return ''
+    return match.group(1) if match else ''
 
 
 def wlist_to_scheduler_wlist(w_list_arg):
@@ -51,76 +67,46 @@ def wlist_to_scheduler_wlist(w_list_arg):
     return w_list
 
 
-def memoize_disk(cache_file):
-    """Memoize to disk with TTL value
-    This decorator saves the return value of a method
-    into a disk file. These values will be used for
-    future calls of the method until the values expire"""
-
-
-    def decorator(original_func):
-        """Decorator
-        Format of the cache file:
-        date: timestamp
-        data: Dict {}
-        """
-
-        def new_func(cls, param):
-            """ Wrapper function"""
-            now = time.time()
-
-            params_id = hashlib.md5(''.join(param).encode('utf-8')).hexdigest()
-
-            user_c_file = "{}-{}-{}".format(cache_file,
-                                            ubench.config.USER,
-                                            params_id)
-            # we generate a hash based on parameters passed on the method
-            # like that we assure that a different cachefile will be generated for each call
-            # having different parameters values
-            cache_file_hash = hashlib.md5(user_c_file.encode('utf-8')).hexdigest()
-
-            cls.cache_files[cache_file_hash] = user_c_file
-
-            try:
-                cache = json.load(open(user_c_file, 'r'))
-
-            except (IOError, ValueError):
-                cache = {}
-
-            no_cache = True
-            if 'date' in cache:
-                if now-cache['date'] < ubench.config.MEM_DISK_TTL:
-                    no_cache = False
-
-
-            if no_cache:
-                data = {}
-                data['date'] = time.time()
-                data['data'] = original_func(cls, param)
-                json.dump(data, open(user_c_file, 'w'))
-                return data['data']
+class SlurmInterface(object):
+    """ Provides methods to execute jobs with slurm scheduler
 
-            return cache['data']
+    Job states and information are read by a backend (see slurm_backends),
+    or from squeue and sacct text output if there is none or if it fails.
+    """
 
-        return new_func
+    # Job state cache shared by every instance, created on first use
+    _job_state_cache = None
 
-    return decorator
+    def __init__(self, backend=None):
+        """ Constructor
 
-class SlurmInterface(object):
-    """ Provides methods to execute jobs with slurm scheduler """
+        Args:
+            backend: Slurm backend or backend name, see slurm_backends.slurm_backend,
+                     ubench.config.SLURM_BACKEND if None
+        """
+        if backend is None or isinstance(backend, str):
+            backend = slurm_backend(backend)
+        self.backend = backend
 
-    cache_files = {}
 
-    def __init__(self):
-        """ Constructor """
+    def _backend_call(self, method, job_ids):
+        """ Call a backend method, None if there is no backend or if it fails """
+        if self.backend is None:
+            return None
+        result = getattr(self.backend, method)(job_ids)
+        if result is None:
+            print("!!Warning: {} backend failed, falling back on squeue and sacct"
+                  .format(type(self.backend).__name__))
+            self.backend = None
+        return result
 
 
-    def __del__(self):
-        for f in self.cache_files.values():
-            try:
-                os.remove(f)
-            except OSError:
-                pass
+    @classmethod
+    def job_state_cache(cls):
+        """ Return job state cache shared by every SlurmInterface """
+        if cls._job_state_cache is None:
+            cls._job_state_cache = JobStateCache(cluster=slurm_cluster_name())
+        return cls._job_state_cache
 
 
     def get_available_nodes(self, slices_size=1):
@@ -201,38 +187,83 @@ class SlurmInterface(object):
             (dictionary) Job information
         """
 
-        job_cmd = ('sacct --jobs={0} -n -p --format=JobName,Elapsed,NodeList,Submit,Start'
-                   .format(job_id))
+        return self.get_jobs_info([job_id]).get(str(job_id), [])
 
-        ret_code, stdout, stderr = utils.run_cmd(job_cmd, os.getcwd())
 
-        if ret_code:
-            print("!!Warning: unclebech was not able to get job information")
-            print("!!Warning: {}".format(stderr))
-            return []
+    def get_jobs_info(self, job_ids):
+        """Return job information of several jobs.
 
-        job_info = []
-        for line in stdout:
-            fields = line.split("|")
+        Without backend, a single sacct command is executed for every chunk
+        of job ids not longer than SACCT_MAX_JOBS_LENGTH characters.
 
-            if not fields or len(fields) < 5:
+        Args:
+            (list) job_ids: jobs ids
+
+        Returns:
+            (dictionary) job id -> list of job and job steps information,
+                         as returned by get_job_info
+        """
+        job_ids = [str(job_id) for job_id in job_ids]
+        jobs_info = self._backend_call('get_jobs_info', job_ids)
+        if jobs_info is not None:
+            return jobs_info
+
+        jobs_info = {}
+        for chunk in job_id_chunks(job_ids, SACCT_MAX_JOBS_LENGTH):
+            job_cmd = ('sacct --jobs={0} -n -p --format=JobID,JobName,Elapsed,NodeList,Submit,Start'
+                       .format(chunk))
+
+            ret_code, stdout, stderr = utils.run_cmd(job_cmd, os.getcwd())
+
+            if ret_code:
+                print("!!Warning: unclebech was not able to get job information")
+                print("!!Warning: {}".format(stderr))
                 continue
 
-            job_name = fields[0]
-            job_info_temp = {}
-            if job_name != 'batch':
-                job_info_temp['job_name'] = job_name
-                job_info_temp['job_elasped'] = fields[1]
-                job_info_temp['job_nodelist'] = [node for node in NodeSet(fields[2])]
-                job_info_temp['job_submit_time'] = fields[3]
-                job_info_temp['job_start_time'] = fields[4]
-                job_info.append(job_info_temp)
+            for line in stdout:
+                fields = line.split("|")
 
-        return job_info
+                if not fields or len(fields) < 6:
+                    continue
+
+                # Job steps ids are <job id>.<step>
+                job_id = fields[0].split('.')[0]
+                job_name = fields[1]
+                if job_name != 'batch':
+                    jobs_info.setdefault(job_id, []).append(
+                        {'job_name': job_name,
+                         'job_elasped': fields[2],
+                         'job_nodelist': [node for node in NodeSet(fields[3])],
+                         'job_submit_time': fields[4],
+                         'job_start_time': fields[5]})
+
+        return jobs_info
 
-    @memoize_disk('/tmp/ubench_cache')
     def get_jobs_state(self, job_ids=[]):#pylint: disable=dangerous-default-value
-        """Return a hash with jobs status using a list of jobs ids"""
+        """Return a hash with jobs status using a list of jobs ids
+
+        States found in the job state cache are not queried again.
+        """
+        if not job_ids:
+            return {}
+
+        job_ids = [str(job_id) for job_id in job_ids]
+        cache = self.job_state_cache()
+        job_info, missing = cache.get(job_ids)
+        if missing:
+            queried = self._query_jobs_state(missing)
+            cache.put(queried)
+            job_info.update(queried)
+
+        return job_info
+
+
+    def _query_jobs_state(self, job_ids):
+        """Return a hash with jobs status read from the scheduler"""
+
+        job_info = self._backend_call('get_jobs_state', job_ids)
+        if job_info is not None:
+            return job_info
 
         # we get the information using two commands
 
@@ -247,9 +278,6 @@ class SlurmInterface(object):
 
         # { jobid : 'STATE' } => { 12441 : 'RUNNING', 12818 : 'COMPLETED' }
 
-        if not job_ids:
-            return {}
-
         squeue_rex = re.compile(r'^\s+(\d+)\s+(\w+)')
         sacct_rex = re.compile(r'^\s*(\d+)\s+(\w+)')
         sacct_rex_0 = re.compile(r'^\s*(\d+)\.0\s+(\w+)')
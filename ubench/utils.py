@@ -19,9 +19,12 @@
 ##############################################################################
 ''' Provides useful methods '''
 
+import io
 import os
 import re
+import threading
 from subprocess import Popen, PIPE
+from ubench.data_management import yaml_io
 
 def run_cmd(cmd_string, cwd, env=None):
     ''' Wrapper for Popen with communicate method '''
@@ -41,6 +44,31 @@ def run_cmd(cmd_string, cwd, env=None):
 
     return ret_code, stdout_stream, stderr_stream
 
+class ThreadOutput(object):
+    """ Output stream proxy which keeps what registered threads write in
+    buffers, other threads write to the proxied stream. """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffers = {}
+
+    def capture(self):
+        """ Keep output of the current thread in a new buffer """
+        self.buffers[threading.get_ident()] = io.StringIO()
+
+    def release(self):
+        """ Stop keeping output of the current thread, return its output """
+        return self.buffers.pop(threading.get_ident()).getvalue()
+
+    def write(self, text):
+        return self.buffers.get(threading.get_ident(), self.stream).write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
 def run_cmd_bg(cmd_string, cwd, env=None):
     ''' Wrapper for Popen no blocking '''
     cmd = Popen(cmd_string,
@@ -186,7 +214,7 @@ def read_attr(file_name, attr):
         read_attr(some_file, 'Name') -> 'John'
     '''
     with open(file_name, 'r') as f:
-        data = yaml.safe_load(f)
+        data = yaml_io.safe_load(f)
     return data[attr]
 
 global_msg = {